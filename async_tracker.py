@@ -0,0 +1,409 @@
+from graphql_queries import LiveCatalogLotsProfiles
+from graphql_client import GRAPHQL_URL, DEFAULT_HEADERS
+from rate_limit import default_limiter, default_retry_policy
+from metrics import request_seconds, response_bytes, json_decode_seconds, diff_seconds, save_seconds, lots_tracked, poll_lag_seconds, start_from_environment
+from main import iter_auctions, select_auctions, merge_live_catalog, select_profile
+from scheduler import PollScheduler
+from delta_log import AuctionLog
+from lot_diff import LotDiffer
+from json_codec import loads
+from auction_archive import is_finished, export_auction
+from contextlib import nullcontext
+from snapshot import TrackerState
+import asyncio
+import logging
+import time
+import sys
+import os
+
+import aiohttp
+
+
+class AsyncGraphQLClient:
+    """
+    asyncio counterpart of `GraphQLClient`, backed by a single pooled aiohttp session.
+
+    Args:
+        url (str, optional): The GraphQL endpoint URL. Defaults to GRAPHQL_URL.
+        headers (dict, optional): Extra headers merged over DEFAULT_HEADERS.
+        timeout (float, optional): Total timeout in seconds for each request. Defaults to 30.
+        max_connections (int, optional): Maximum number of open connections held by the pool. Defaults to 32.
+        limiter (RateLimiter, optional): Token buckets every request waits on. Defaults to the process-wide limiter.
+        retry_policy (RetryPolicy, optional): Backoff policy for 429/5xx responses and connection errors.
+            Defaults to the process-wide policy.
+
+    Notes:
+        - The aiohttp session is created lazily so the client can be constructed outside a running event loop.
+        - Waiting for the rate limiter or a backoff only suspends the calling task, not the event loop.
+    """
+
+    def __init__(self, url=GRAPHQL_URL, headers=None, timeout=30, max_connections=32, limiter=None,
+                 retry_policy=None):
+        self.url = url
+        self.headers = dict(DEFAULT_HEADERS)
+        self.headers["accept-encoding"] = "gzip, deflate"
+        if headers:
+            self.headers.update(headers)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_connections = max_connections
+        self.limiter = limiter or default_limiter
+        self.retry_policy = retry_policy or default_retry_policy
+        self.session = None
+
+    async def post(self, operation_name, query, variables=None, semaphore=None):
+        """
+        Sends a GraphQL operation and returns the decoded JSON body.
+
+        Args:
+            operation_name (str): The GraphQL operation name, e.g. "LiveCatalogLots".
+            query (str): The GraphQL document.
+            variables (dict, optional): Variables for the operation.
+            semaphore (asyncio.Semaphore, optional): Held only while a request is in flight, not while waiting for
+                the rate limiter or a backoff, so a throttled or failing caller does not hold up the others.
+
+        Returns:
+            dict or None: The GraphQL response, or None if the status code was not 200 after every retry.
+
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: If the last attempt failed with a connection error or timeout.
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout, connector=connector)
+
+        payload = {
+            "operationName": operation_name,
+            "query": query,
+            "variables": variables or {}
+        }
+        attempt = 0
+        while True:
+            delay = self.limiter.reserve(operation_name)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                async with semaphore if semaphore is not None else nullcontext():
+                    start = time.perf_counter()
+                    async with self.session.post(self.url, json=payload) as response:
+                        body = await response.read()
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                    request_seconds.observe(time.perf_counter() - start, operation=operation_name, status=status)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                request_seconds.observe(time.perf_counter() - start, operation=operation_name, status="error")
+                if not self.retry_policy.should_retry(attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"{operation_name} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                response_bytes.inc(len(body), operation=operation_name)
+                if status == 200:
+                    with json_decode_seconds.time(operation=operation_name):
+                        return loads(body)
+                if not self.retry_policy.should_retry(attempt, status):
+                    logging.error(f"Error running {operation_name}. Status code: {status}")
+                    return None
+                delay = self.retry_policy.delay(attempt, retry_after)
+                logging.warning(f"{operation_name} returned {status}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self):
+        """
+        Closes the underlying aiohttp session and its connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class TrackedAuction:
+    """
+    Per-auction state kept by the `AuctionEngine`.
+
+    Args:
+        auction_id (int): ID of the auction to poll with `LiveCatalogLots`.
+        file_name (str): Name of the file under `auctions/` the data is saved to.
+        sleep_time (int): Base interval in seconds between successive polls of this auction.
+            The actual delay is adapted to the closing state of the lots by a `PollScheduler`.
+        save_interval (int): Number of polls between compactions of the auction's change log.
+        bus (EventBus, optional): Bus the typed lot change events of every poll are published to.
+    """
+
+    def __init__(self, auction_id, file_name, sleep_time, save_interval, bus=None):
+        self.auction_id = auction_id
+        self.file_path = os.path.join("auctions", file_name)
+        self.scheduler = PollScheduler(base_interval=sleep_time)
+        self.log = AuctionLog(self.file_path, compact_every=save_interval)
+        self.auction_data = self.log.load()
+        self.item_ids = set(self.auction_data["lots"].keys())
+        self.differ = LotDiffer(auction_id, bus)
+        self.differ.seed(self.auction_data["lots"])
+        self.unknown_ids = set()
+        self.events = []
+        self.num_tries = 0
+        self.loop_count = 0
+
+
+class AuctionEngine:
+    """
+    Polls `LiveCatalogLots` for many auctions concurrently from a single event loop.
+
+    Each auction runs in its own task with its own schedule, while a shared semaphore caps the
+    number of requests in flight across all auctions.
+
+    Args:
+        client (AsyncGraphQLClient, optional): Client shared by every auction. One is created if omitted.
+        max_concurrency (int, optional): Maximum number of in-flight requests across all auctions. Defaults to 10.
+        max_retries (int, optional): Consecutive failed polls after which an auction is dropped. Defaults to 3.
+        save_interval (int, optional): Number of polls between compactions of an auction's change log
+            into its JSON file. Changes are appended to the log after every poll. Defaults to 15.
+        full_refresh_interval (int, optional): Number of polls between "full" profile polls. Defaults to 60.
+        history (BidHistory, optional): Time series store shared by all auctions that records every lot state change.
+        database (AuctionDatabase, optional): SQLite backend shared by all auctions that receives the changes of every poll.
+        bus (EventBus, optional): Bus shared by all auctions that the typed lot change events are published to.
+        archive_directory (str, optional): Directory finished auctions are exported to as columnar files, see
+            `auction_archive.export_auction`. None disables the export. Defaults to "archive".
+        state (TrackerState, optional): Persistent state the tracked auctions, their poll times and schedules are
+            recorded in, so a restarted engine can resume them. Auctions are forgotten once they stop for good.
+        watchlist (Watchlist, optional): Rules every incoming lot of every auction is checked against on every poll.
+        search_index (SearchIndex, optional): Full-text index shared by all auctions that new lots and their status
+            changes are written to after every poll.
+
+    Example:
+        engine = AuctionEngine(max_concurrency=20)
+        engine.add_auction(481347, "Encore_481347.json")
+        asyncio.run(engine.run())
+    """
+
+    def __init__(self, client=None, max_concurrency=10, max_retries=3, save_interval=15, full_refresh_interval=60, history=None, database=None, bus=None, archive_directory="archive", state=None, watchlist=None, search_index=None):
+        self.client = client or AsyncGraphQLClient()
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.save_interval = save_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.history = history
+        self.database = database
+        self.bus = bus
+        self.archive_directory = archive_directory
+        self.state = state
+        self.watchlist = watchlist
+        self.search_index = search_index
+        self.auctions = {}
+        self.semaphore = None
+        self._tasks = set()
+
+    def add_auction(self, auction_id, file_name, sleep_time=60):
+        """
+        Registers an auction to be tracked. Auctions added while the engine is running are picked up immediately.
+
+        Args:
+            auction_id (int): ID of the auction to track.
+            file_name (str): Name of the file under `auctions/` the data is saved to.
+            sleep_time (int, optional): Base interval in seconds between successive polls. Defaults to 60.
+        """
+        if auction_id in self.auctions:
+            return
+        os.makedirs("auctions", exist_ok=True)
+        auction = TrackedAuction(auction_id, file_name, sleep_time, self.save_interval, self.bus)
+        if self.state is not None:
+            saved = self.state.get(auction_id)
+            if saved and saved.get("schedule"):
+                auction.scheduler.restore(saved["schedule"])
+            self.state.track(auction_id, file_name)
+        self.auctions[auction_id] = auction
+        if self.semaphore is not None:
+            self._tasks.add(asyncio.create_task(self._track(auction)))
+
+    async def fetch(self, auction_id, profile="full"):
+        """
+        Fetches the live catalog of one auction. Each HTTP request waits for a free slot under the concurrency
+        limit; rate-limit waits and retry backoffs happen outside it.
+
+        Args:
+            auction_id (int): ID of the auction to fetch.
+            profile (str, optional): Name of the query profile in `LiveCatalogLotsProfiles`. Default is "full".
+
+        Returns:
+            dict or None: The GraphQL response, or None on error.
+        """
+        return await self.client.post("LiveCatalogLots", LiveCatalogLotsProfiles[profile], {"auctionId": auction_id}, semaphore=self.semaphore)
+
+    async def poll(self, auction):
+        """
+        Polls one auction once and merges the response into its stored data.
+
+        Args:
+            auction (TrackedAuction): The auction to poll.
+
+        Returns:
+            bool: True if data was fetched and merged, False otherwise.
+        """
+        profile = select_profile(auction.auction_data, auction.unknown_ids, auction.loop_count, self.full_refresh_interval)
+        auction.unknown_ids.clear()
+        try:
+            data = await self.fetch(auction.auction_id, profile)
+            if not data or data.get("errors") or not (data.get("data") or {}).get("liveCatalogLots"):
+                if data:
+                    logging.error(f"Error in response for auction {auction.auction_id}: {data.get('errors')}")
+                auction.scheduler.failed()
+                return False
+            with diff_seconds.time():
+                changed_lots = merge_live_catalog(auction.auction_data, data, auction.item_ids, profile, auction.unknown_ids, auction.events, auction.differ, self.watchlist)
+            lots_tracked.set(len(auction.auction_data["lots"]), auction=auction.auction_id)
+            auction.scheduler.observe(data["data"]["liveCatalogLots"]["liveLots"], changed_lots)
+        except Exception as e:
+            # Any failure, including a malformed response, counts against max_retries instead of killing the task
+            logging.error(f"Error polling auction {auction.auction_id}: {e}")
+            auction.scheduler.failed()
+            return False
+        return True
+
+    async def commit(self, auction):
+        """
+        Appends the pending change events of an auction to its log without blocking the event loop.
+
+        Args:
+            auction (TrackedAuction): The auction to commit.
+        """
+        events, auction.events = auction.events, []
+        try:
+            with save_seconds.time(kind="poll"):
+                await asyncio.to_thread(auction.log.commit, auction.auction_data, events)
+                if self.history is not None:
+                    self.history.record_events(auction.auction_id, events)
+                    await asyncio.to_thread(self.history.flush)
+                if self.database is not None:
+                    await asyncio.to_thread(self.database.record_poll, auction.auction_id, auction.auction_data, events)
+                if self.search_index is not None:
+                    await asyncio.to_thread(self.search_index.record_poll, auction.auction_id, auction.auction_data, events)
+        except Exception as e:
+            logging.error(f"Error saving auction {auction.auction_id} to file: {e}")
+
+    async def save(self, auction):
+        """
+        Compacts an auction's log into its JSON file without blocking the event loop.
+
+        Args:
+            auction (TrackedAuction): The auction to save.
+        """
+        try:
+            with save_seconds.time(kind="compact"):
+                await asyncio.to_thread(auction.log.compact, auction.auction_data)
+        except Exception as e:
+            logging.error(f"Error saving auction {auction.auction_id} to file: {e}")
+
+    async def archive(self, auction):
+        """
+        Exports a finished auction to a columnar file in `archive_directory` without blocking the event loop.
+
+        Args:
+            auction (TrackedAuction): The finished auction.
+        """
+        try:
+            await asyncio.to_thread(export_auction, auction.auction_data, self.archive_directory, auction.differ.closed_at)
+        except Exception as e:
+            logging.error(f"Error archiving auction {auction.auction_id}: {e}")
+
+    async def _track(self, auction):
+        scheduled_at = None
+        while True:
+            if scheduled_at is not None:
+                poll_lag_seconds.observe(max(0.0, time.time() - scheduled_at))
+            auction.loop_count += 1
+            success = await self.poll(auction)
+            if success:
+                auction.num_tries = 0
+            else:
+                auction.num_tries += 1
+                logging.warning(f"Failed to fetch auction {auction.auction_id}. Retry {auction.num_tries} of {self.max_retries}")
+                if auction.num_tries > self.max_retries:
+                    break
+
+            await self.commit(auction)
+            if success and is_finished(auction.auction_data):
+                logging.info(f"Auction {auction.auction_id} is over")
+                auction.differ.finish()
+                if self.watchlist is not None:
+                    self.watchlist.forget(auction.auction_id)
+                break
+            delay = auction.scheduler.next_delay()
+            scheduled_at = time.time() + delay
+            if self.state is not None:
+                await asyncio.to_thread(self.state.update, auction.auction_id, time.time(), scheduled_at, auction.scheduler.state())
+            await asyncio.sleep(delay)
+
+        await self.save(auction)
+        if self.archive_directory is not None and is_finished(auction.auction_data):
+            await self.archive(auction)
+        lots_tracked.remove(auction=auction.auction_id)
+        if self.state is not None:
+            self.state.remove(auction.auction_id)
+        self.auctions.pop(auction.auction_id, None)
+        logging.info(f"Stopped tracking auction {auction.auction_id}")
+
+    async def run(self):
+        """
+        Tracks every registered auction until all of them have stopped, then closes the client.
+        """
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks = {asyncio.create_task(self._track(auction)) for auction in list(self.auctions.values())}
+        try:
+            while self._tasks:
+                done, _ = await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                self._tasks -= done
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            for auction in list(self.auctions.values()):
+                await self.save(auction)
+            if self.history is not None:
+                self.history.flush()
+            if self.state is not None:
+                self.state.save()
+            await self.client.close()
+
+
+def main(auctioneer_ids, max_concurrency=10, state_path="auctions/tracker_state.json"):
+    """
+    Tracks every open auction of every given auctioneer from a single process.
+
+    Args:
+        auctioneer_ids (list): IDs of the auctioneers whose auctions are to be tracked.
+        max_concurrency (int, optional): Maximum number of in-flight requests. Defaults to 10.
+        state_path (str, optional): Path of the persistent tracker state. Defaults to "auctions/tracker_state.json".
+
+    Notes:
+        - Auctions followed before a restart are resumed from the tracker state first, soonest next poll first.
+        - Auctions are discovered across all result pages with `iter_auctions` and ordered by end time with `select_auctions`.
+    """
+    state = TrackerState(state_path)
+    engine = AuctionEngine(max_concurrency=max_concurrency, state=state)
+    for auc_id, entry in state.items():
+        logging.info(f"Resuming auction {auc_id}, last polled at {entry.get('last_poll')}")
+        engine.add_auction(auc_id, entry["file_name"])
+    for auction in select_auctions(iter_auctions(auctioneer_ids)):
+        auc_id = auction["id"]
+        auctioneer_name = auction["auctioneer"]["name"].replace(" ", "_")
+        logging.info(f"Tracking auction {auc_id} from {auctioneer_name}")
+        engine.add_auction(auc_id, f"{auctioneer_name}_{auc_id}.json")
+    asyncio.run(engine.run())
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        logging.error("Usage: python async_tracker.py <auctioneer_id> [<auctioneer_id> ...]")
+        sys.exit(1)
+
+    try:
+        auctioneer_ids = [int(arg) for arg in args]
+        start_from_environment()
+        main(auctioneer_ids)
+    except ValueError:
+        logging.error("Please provide valid integers for the auctioneer ids.")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        logging.info("Interrupted by user. Exiting...")
+        sys.exit(0)
@@ -0,0 +1,362 @@
+from array import array
+import logging
+import struct
+import mmap
+import json
+import math
+import re
+import os
+
+# Column name -> array typecode of the stdlib format. String columns are dictionary encoded as int32 codes.
+COLUMNS = {
+    "item_id": "q",
+    "lot_number": "i",
+    "category_id": "q",
+    "category": "i",
+    "estimate_low": "d",
+    "estimate_high": "d",
+    "high_bid": "d",
+    "price_realized": "d",
+    "bid_count": "q",
+    "close_time": "d"
+}
+STRING_COLUMNS = ("lot_number", "category")
+
+MAGIC = b"HIBIDCOL"
+ALIGNMENT = 8
+_numbers = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def is_finished(auction_data):
+    """
+    Decides whether an auction is over.
+
+    Args:
+        auction_data (dict): Auction data with keys "auction" and "lots".
+
+    Returns:
+        bool: True if every stored lot is closed, or the auctionState reports the auction as closed.
+    """
+    auction_state = auction_data["auction"].get("auctionState") or {}
+    status = auction_state.get("auctionStatus") or ""
+    if status.upper().startswith("CLOSED"):
+        return True
+    lots = auction_data["lots"]
+    return bool(lots) and all(lot["lotState"].get("isClosed") for lot in lots.values())
+
+
+def parse_estimate(estimate):
+    """
+    Parses an estimate such as "100-200" or "$1,000 - $1,500" into its bounds.
+
+    Returns:
+        tuple: (low, high) as floats, NaN where missing. A single amount is used for both bounds.
+    """
+    amounts = [float(value.replace(",", "")) for value in _numbers.findall(estimate or "")]
+    if not amounts:
+        return math.nan, math.nan
+    return amounts[0], amounts[-1]
+
+
+def lot_columns(auction_data, close_times=None):
+    """
+    Converts the lots of an auction into typed columns, one row per lot ordered by itemId.
+
+    Args:
+        auction_data (dict): Auction data with keys "auction" and "lots".
+        close_times (dict, optional): itemId -> Unix timestamp the lot was seen closing, e.g. `LotDiffer.closed_at`.
+
+    Returns:
+        tuple: (columns, dictionaries) where `columns` maps each name in COLUMNS to an `array`, and
+        `dictionaries` maps each string column to its list of values, indexed by code.
+    """
+    close_times = close_times or {}
+    columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+    dictionaries = {name: [] for name in STRING_COLUMNS}
+    codes = {name: {} for name in STRING_COLUMNS}
+
+    def encode(name, value):
+        value = "" if value is None else str(value)
+        code = codes[name].get(value)
+        if code is None:
+            code = codes[name][value] = len(dictionaries[name])
+            dictionaries[name].append(value)
+        return code
+
+    for item_id in sorted(auction_data["lots"]):
+        lot = auction_data["lots"][item_id]
+        lot_state = lot.get("lotState") or {}
+        category = lot.get("category") or {}
+        estimate_low, estimate_high = parse_estimate(lot.get("estimate"))
+        columns["item_id"].append(item_id)
+        columns["lot_number"].append(encode("lot_number", lot.get("lotNumber")))
+        columns["category_id"].append(category.get("id") or 0)
+        columns["category"].append(encode("category", category.get("fullCategory") or category.get("categoryName")))
+        columns["estimate_low"].append(estimate_low)
+        columns["estimate_high"].append(estimate_high)
+        columns["high_bid"].append(_float(lot_state.get("highBid")))
+        columns["price_realized"].append(_float(lot_state.get("priceRealized")))
+        columns["bid_count"].append(lot_state.get("bidCount") or 0)
+        columns["close_time"].append(_float(close_times.get(item_id)))
+    return columns, dictionaries
+
+
+def export_auction(auction_data, directory="archive", close_times=None, file_format=None):
+    """
+    Writes a finished auction to a columnar file in `directory`, named after the auction id.
+
+    Args:
+        auction_data (dict): Auction data with keys "auction" and "lots".
+        directory (str, optional): Directory of the archive. Defaults to "archive".
+        close_times (dict, optional): itemId -> close timestamp, see `lot_columns`.
+        file_format (str, optional): "parquet" (zstd-compressed Parquet, requires pyarrow) or "columns"
+            (the stdlib format read by `load_archive`). Defaults to "parquet" when pyarrow is installed.
+
+    Returns:
+        str: Path of the written file.
+
+    Notes:
+        - The "columns" format is uncompressed so that it can be memory-mapped, but it only holds the typed
+          columns and dictionary-encoded strings, typically a few percent of the auction's JSON file.
+        - The file is written under a temporary name and renamed, so a reader never sees a partial archive.
+    """
+    if file_format is None:
+        file_format = "parquet" if _pyarrow_available() else "columns"
+    columns, dictionaries = lot_columns(auction_data, close_times)
+    auction = auction_data["auction"]
+    metadata = {
+        "id": auction.get("id"),
+        "eventName": auction.get("eventName"),
+        "eventDateEnd": auction.get("eventDateEnd"),
+        "auctioneer": (auction.get("auctioneer") or {}).get("name")
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    extension = ".parquet" if file_format == "parquet" else ".columns"
+    path = os.path.join(directory, f"{metadata['id']}{extension}")
+    temp_path = path + ".tmp"
+    if file_format == "parquet":
+        _write_parquet(temp_path, columns, dictionaries, metadata)
+    else:
+        _write_columns(temp_path, columns, dictionaries, metadata)
+    os.replace(temp_path, path)
+    logging.info(f"Archived auction {metadata['id']} with {len(columns['item_id'])} lots to {path}")
+    return path
+
+
+class AuctionArchive:
+    """
+    A memory-mapped archived auction.
+
+    Numeric columns of the stdlib format are zero-copy `memoryview`s over the mapped file (numpy arrays when
+    numpy is installed); Parquet files are read through pyarrow with memory mapping.
+
+    Args:
+        path (str): Path of a ".columns" or ".parquet" file written by `export_auction`.
+
+    Example:
+        with AuctionArchive("archive/478457.columns") as archive:
+            archive["price_realized"]
+            archive.strings("category")
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.mapping = None
+        self.table = None
+        if path.endswith(".parquet"):
+            self._open_parquet()
+        else:
+            self._open_columns()
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        """
+        Returns:
+            sequence: The raw column; string columns hold dictionary codes.
+        """
+        return self.columns[name]
+
+    def strings(self, name):
+        """
+        Returns:
+            list: The decoded values of a string column.
+        """
+        dictionary = self.dictionaries[name]
+        return [dictionary[code] for code in self.columns[name]]
+
+    def close(self):
+        """
+        Releases the column views and unmaps the file.
+        """
+        for column in self.columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        self.columns = {}
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open_columns(self):
+        self.file = open(self.path, "rb")
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mapping[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not an auction archive")
+        header_length, = struct.unpack_from("<I", self.mapping, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(bytes(self.mapping[header_start:header_start + header_length]))
+
+        self.metadata = header["metadata"]
+        self.rows = header["rows"]
+        self.dictionaries = header["dictionaries"]
+        self.columns = {}
+        numpy = _numpy()
+        view = memoryview(self.mapping)
+        for column in header["columns"]:
+            data = view[column["offset"]:column["offset"] + column["length"]]
+            if numpy is not None:
+                self.columns[column["name"]] = numpy.frombuffer(data, dtype=numpy.dtype(column["typecode"]).newbyteorder("<"))
+            else:
+                self.columns[column["name"]] = data.cast(column["typecode"])
+        view.release()
+
+    def _open_parquet(self):
+        import pyarrow.parquet as pq
+
+        self.table = pq.read_table(self.path, memory_map=True)
+        schema_metadata = self.table.schema.metadata or {}
+        self.metadata = json.loads(schema_metadata.get(b"hibid", b"{}"))
+        self.rows = self.table.num_rows
+        self.columns = {name: self.table.column(name).to_pylist() if name in STRING_COLUMNS else self.table.column(name)
+                        for name in self.table.column_names}
+        # Parquet stores the strings themselves; expose them through an identity dictionary for `strings`
+        self.dictionaries = {}
+        for name in STRING_COLUMNS:
+            values = self.columns[name]
+            self.dictionaries[name] = values
+            self.columns[name] = range(len(values))
+
+
+def load_archive(path):
+    """
+    Opens an archived auction, see `AuctionArchive`.
+    """
+    return AuctionArchive(path)
+
+
+def scan_archives(directory="archive", columns=None):
+    """
+    Concatenates columns across every archived auction in a directory, for analysis across auctions.
+
+    Args:
+        directory (str, optional): Directory of the archive. Defaults to "archive".
+        columns (iterable, optional): Columns to read. Defaults to every column; string columns are decoded.
+
+    Returns:
+        dict: Column name -> list of values, plus an "auction_id" column.
+    """
+    columns = list(columns or COLUMNS)
+    result = {name: [] for name in ["auction_id"] + columns}
+    if not os.path.isdir(directory):
+        return result
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith((".columns", ".parquet")):
+            continue
+        with AuctionArchive(os.path.join(directory, file_name)) as archive:
+            result["auction_id"].extend([archive.metadata.get("id")] * len(archive))
+            for name in columns:
+                if name in STRING_COLUMNS:
+                    result[name].extend(archive.strings(name))
+                else:
+                    column = archive[name]
+                    result[name].extend(column.to_pylist() if hasattr(column, "to_pylist") else column.tolist())
+    return result
+
+
+def _write_columns(path, columns, dictionaries, metadata):
+    rows = len(columns["item_id"])
+    layout = []
+    header = {"metadata": metadata, "rows": rows, "dictionaries": dictionaries, "columns": layout}
+
+    # Column offsets depend on the header size, which depends on the offsets; the header is padded to a fixed
+    # size computed with generously sized placeholder offsets so one pass is enough
+    for name, column in columns.items():
+        layout.append({"name": name, "typecode": column.typecode, "offset": 0, "length": len(column) * column.itemsize})
+    placeholder = json.dumps({**header, "columns": [{**entry, "offset": 10 ** 15} for entry in layout]}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 4 + len(placeholder))
+
+    offset = data_start
+    for entry in layout:
+        entry["offset"] = offset
+        offset = _align(offset + entry["length"])
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (data_start - len(MAGIC) - 4 - len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for entry, column in zip(layout, columns.values()):
+            f.seek(entry["offset"])
+            data = column.tobytes() if struct.pack("=i", 1) == struct.pack("<i", 1) else _little_endian(column)
+            f.write(data)
+        f.truncate(offset)
+
+
+def _write_parquet(path, columns, dictionaries, metadata):
+    import pyarrow.parquet as pq
+    import pyarrow as pa
+
+    data = {}
+    for name, column in columns.items():
+        if name in STRING_COLUMNS:
+            data[name] = pa.DictionaryArray.from_arrays(pa.array(column, pa.int32()), pa.array(dictionaries[name], pa.string()))
+        else:
+            data[name] = pa.array(column, pa.float64() if column.typecode == "d" else pa.int64())
+    table = pa.table(data).replace_schema_metadata({"hibid": json.dumps(metadata)})
+    pq.write_table(table, path, compression="zstd")
+
+
+def _little_endian(column):
+    column = array(column.typecode, column)
+    column.byteswap()
+    return column.tobytes()
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _float(value):
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
@@ -0,0 +1,288 @@
+from main import update_auction_data, merge_live_catalog
+from snapshot import load_auction_data, save_auction_data
+from mock_server import SyntheticAuction
+from graphql_client import GraphQLClient
+from rate_limit import RateLimiter
+from delta_log import AuctionLog
+from lot_diff import LotDiffer
+from contextlib import redirect_stdout
+import statistics
+import subprocess
+import tracemalloc
+import argparse
+import platform
+import tempfile
+import random
+import json
+import time
+import sys
+import os
+import io
+
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Whether a larger value of a result is an improvement; used to tell regressions from speedups
+HIGHER_IS_BETTER = {
+    "merge_lots_per_second": True,
+    "update_lots_per_second": True,
+    "poll_latency_p50_ms": False,
+    "poll_latency_p95_ms": False,
+    "commit_ms": False,
+    "compact_ms": False,
+    "memory_bytes_per_lot": False
+}
+
+
+def empty_auction_data():
+    return {"auction": {}, "lots": {}}
+
+
+def bench_merge(lot_count, change_rate, polls):
+    """
+    Measures `merge_live_catalog` alone on pre-built "state-only" responses, without any network or JSON cost.
+
+    Returns:
+        dict: "merge_lots_per_second".
+    """
+    auction = SyntheticAuction(1000, 1, lot_count, change_rate, random.Random(0))
+    auction_data = empty_auction_data()
+    item_ids = set()
+    differ = LotDiffer(auction.auction_id)
+    merge_live_catalog(auction_data, auction.response(full=True), item_ids, "full", differ=differ)
+
+    responses = [auction.response(full=False) for _ in range(polls)]
+    start = time.perf_counter()
+    for response in responses:
+        merge_live_catalog(auction_data, response, item_ids, "state-only", set(), [], differ)
+    elapsed = time.perf_counter() - start
+    return {"merge_lots_per_second": round(lot_count * polls / elapsed)}
+
+
+def start_mock_server(lot_count, change_rate):
+    """
+    Starts `mock_server.py` in a child process, so serving responses does not compete with the tracker for the GIL.
+
+    Returns:
+        tuple: (process, url) of the running server.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_server.py")
+    process = subprocess.Popen(
+        [sys.executable, script, "--lots", str(lot_count), "--change-rate", str(change_rate)],
+        stdout=subprocess.PIPE, text=True)
+    return process, process.stdout.readline().strip()
+
+
+def bench_update(url, lot_count, polls):
+    """
+    Measures end-to-end `update_auction_data` polls against the mock server: request, download, JSON decode and merge.
+
+    Returns:
+        dict: "update_lots_per_second", "poll_latency_p50_ms" and "poll_latency_p95_ms", plus the auction data
+        after the last poll for the save benchmark.
+    """
+    # A private limiter so the benchmark measures the tracker, not the politeness budget for hibid.com
+    client = GraphQLClient(url, limiter=RateLimiter(rate=1e9, burst=1e9))
+    auction_id = 1000
+    auction_data = empty_auction_data()
+    item_ids = set()
+    differ = LotDiffer(auction_id)
+
+    latencies = []
+    with client, redirect_stdout(io.StringIO()):
+        update_auction_data(auction_id, auction_data, item_ids, profile="full", differ=differ, client=client)
+        for _ in range(polls):
+            start = time.perf_counter()
+            update_auction_data(auction_id, auction_data, item_ids, profile="state-only", unknown_ids=set(), events=[], differ=differ, client=client)
+            latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "update_lots_per_second": round(lot_count * polls / sum(latencies)),
+        "poll_latency_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "poll_latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 3)
+    }, auction_data
+
+
+def bench_save(lot_count, change_rate, polls, directory, compactions=7):
+    """
+    Measures appending one poll's events to the `AuctionLog` and compacting the log into the JSON file.
+
+    A single compaction is dominated by its fsyncs, which vary a lot from run to run, so several compactions,
+    each after one more poll, are timed and their median is reported.
+
+    Returns:
+        dict: "commit_ms" (median per poll) and "compact_ms" (median of `compactions` compactions).
+    """
+    auction = SyntheticAuction(1000, 1, lot_count, change_rate, random.Random(0))
+    auction_data = empty_auction_data()
+    item_ids = set()
+    differ = LotDiffer(auction.auction_id)
+    log = AuctionLog(os.path.join(directory, "save_benchmark.json"), compact_every=polls + 1)
+
+    events = []
+    merge_live_catalog(auction_data, auction.response(full=True), item_ids, "full", events=events, differ=differ)
+    log.commit(auction_data, events)
+
+    commit_times = []
+    for _ in range(polls):
+        events = []
+        merge_live_catalog(auction_data, auction.response(full=False), item_ids, "state-only", set(), events, differ)
+        start = time.perf_counter()
+        log.commit(auction_data, events)
+        commit_times.append(time.perf_counter() - start)
+
+    compact_times = []
+    for _ in range(compactions):
+        events = []
+        merge_live_catalog(auction_data, auction.response(full=False), item_ids, "state-only", set(), events, differ)
+        log.commit(auction_data, events)
+        start = time.perf_counter()
+        log.compact(auction_data)
+        compact_times.append(time.perf_counter() - start)
+    log.close()
+    return {
+        "commit_ms": round(statistics.median(commit_times) * 1000, 3),
+        "compact_ms": round(statistics.median(compact_times) * 1000, 3)
+    }
+
+
+def bench_memory(auction_data, directory):
+    """
+    Measures the memory held per lot by auction data loaded from its JSON file, as a restarted tracker holds it.
+
+    Returns:
+        dict: "memory_bytes_per_lot".
+    """
+    file_path = os.path.join(directory, "memory_benchmark.json")
+    save_auction_data(file_path, auction_data)
+    tracemalloc.start()
+    loaded = load_auction_data(file_path)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"memory_bytes_per_lot": round(current / max(len(loaded["lots"]), 1))}
+
+
+def run(lot_count=2000, change_rate=0.05, polls=30):
+    """
+    Runs every benchmark.
+
+    Args:
+        lot_count (int, optional): Lots in the synthetic auction. Defaults to 2000.
+        change_rate (float, optional): Fraction of lots that receive a new bid per poll. Defaults to 0.05.
+        polls (int, optional): Polls measured per benchmark. Defaults to 30.
+
+    Returns:
+        dict: Result name -> value.
+    """
+    results = {}
+    results.update(bench_merge(lot_count, change_rate, polls))
+    process, url = start_mock_server(lot_count, change_rate)
+    try:
+        update_results, auction_data = bench_update(url, lot_count, polls)
+    finally:
+        process.terminate()
+        process.wait()
+    results.update(update_results)
+    with tempfile.TemporaryDirectory() as directory:
+        results.update(bench_save(lot_count, change_rate, polls, directory))
+        results.update(bench_memory(auction_data, directory))
+    return results
+
+
+def best_of(runs):
+    """
+    Keeps the best value of each result across repeated runs, which filters out runs slowed by unrelated load.
+
+    Args:
+        runs (list): Result dicts returned by `run`.
+
+    Returns:
+        dict: Result name -> best value.
+    """
+    return {
+        name: (max if HIGHER_IS_BETTER[name] else min)(results[name] for results in runs)
+        for name in runs[0]
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with a recorded baseline.
+
+    Args:
+        results (dict): Results of this run.
+        baseline (dict): Results of the baseline run.
+        tolerance (float): Relative change allowed before a result counts as a regression, e.g. 0.25.
+
+    Returns:
+        list: Names of the regressed results.
+    """
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old:
+            print(f"{name:<26} {value:>14}")
+            continue
+        change = (value - old) / old
+        regressed = -change > tolerance if HIGHER_IS_BETTER[name] else change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<26} {value:>14} baseline {old:>14} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    """
+    Command line entry point. Compares a run with the recorded baseline, or records a new baseline with --record.
+
+    Example:
+        python benchmark.py --record      # before a change
+        python benchmark.py               # after it; exits with 1 on a regression
+
+    Returns:
+        int: Exit status, 1 if any result regressed beyond the tolerance.
+    """
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock of hibid.com/graphql.")
+    parser.add_argument("--lots", type=int, default=2000, help="lots in the synthetic auction")
+    parser.add_argument("--change-rate", type=float, default=0.05, help="fraction of lots that change per poll")
+    parser.add_argument("--polls", type=int, default=30, help="polls measured per benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs whose best results are reported")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with or record to")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative change counted as a regression")
+    parser.add_argument("--record", action="store_true", help="record this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    config = {"lots": args.lots, "change_rate": args.change_rate, "polls": args.polls}
+    results = best_of([run(args.lots, args.change_rate, args.polls) for _ in range(args.repeat)])
+
+    if args.record:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "config": config,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "results": results
+            }, f, indent=4)
+        for name, value in results.items():
+            print(f"{name:<26} {value:>14}")
+        print(f"Recorded baseline in {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            recorded = json.load(f)
+        if recorded["config"] != config:
+            print(f"Baseline was recorded with {recorded['config']}, not comparing")
+        else:
+            baseline = recorded["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+from graphql_client import default_client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from html.parser import HTMLParser
+import logging
+import re
+
+# Pick the fastest installed HTML parser: selectolax, then lxml, then the standard library
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+    BACKEND = "selectolax"
+except ImportError:
+    SelectolaxParser = None
+    try:
+        import lxml.html
+        BACKEND = "lxml"
+    except ImportError:
+        BACKEND = "html.parser"
+
+# Selectors of the fields of an `app-lot-tile`. Each field lists the selector used by the Selenium scraper
+# first, then the one used by the BeautifulSoup scraper, which matches the server-rendered markup.
+TILE_SELECTOR = "app-lot-tile"
+FIELD_SELECTORS = {
+    "link": (".lot-link.lot-preview-link.link", ".lot-lead-heading a.lot-title-ellipsis"),
+    "title": ("h2.lot-title",),
+    "lot_number": (".text-primary.fw-bold", ".lot-lead-heading span.text-primary"),
+    "number_of_bids": (".lot-bid-history.btn-link", "a.lot-bid-history"),
+    "max_bid": (".lot-high-bid.font-weight-bold", "span.lot-high-bid span.d-sm-inline", ".lot-high-bid")
+}
+PAGINATION_SELECTOR = "ul.pagination li"
+PAGE_PARAMETER = "apage"
+
+_void_elements = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"))
+_selector_part = re.compile(r"^([\w-]*)((?:\.[\w-]+)*)$")
+
+
+def parse_selector(selector):
+    """
+    Parses the small CSS subset used here: descendant combinators of `tag.class.class` compounds.
+
+    Returns:
+        list: (tag or None, frozenset of classes) per compound.
+    """
+    parts = []
+    for compound in selector.split():
+        match = _selector_part.match(compound)
+        if match is None:
+            raise ValueError(f"Unsupported selector: {selector}")
+        tag, classes = match.groups()
+        parts.append((tag.lower() or None, frozenset(filter(None, classes.split(".")))))
+    return parts
+
+
+class Node:
+    """
+    Element of the minimal DOM built by the standard library fallback parser.
+    """
+
+    __slots__ = ("tag", "attrs", "classes", "children", "parent")
+
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.classes = frozenset((attrs.get("class") or "").split())
+        self.children = []
+        self.parent = parent
+
+    def matches(self, tag, classes):
+        return (tag is None or self.tag == tag) and classes <= self.classes
+
+    def iter(self):
+        """
+        Yields the element nodes below this one in document order.
+        """
+        stack = [child for child in reversed(self.children) if isinstance(child, Node)]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(child for child in reversed(node.children) if isinstance(child, Node))
+
+    def select(self, selector):
+        """
+        Returns:
+            list: Nodes below this one matching the selector, in document order.
+        """
+        parts = parse_selector(selector) if isinstance(selector, str) else selector
+        tag, classes = parts[-1]
+        matches = []
+        for node in self.iter():
+            if node.matches(tag, classes) and node._has_ancestors(parts[:-1]):
+                matches.append(node)
+        return matches
+
+    def _has_ancestors(self, parts):
+        node = self.parent
+        for tag, classes in reversed(parts):
+            while node is not None and not node.matches(tag, classes):
+                node = node.parent
+            if node is None:
+                return False
+            node = node.parent
+        return True
+
+    def text(self):
+        pieces = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                pieces.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return "".join(pieces)
+
+
+class _TreeBuilder(HTMLParser):
+    # Builds a `Node` tree, closing unclosed elements the way browsers do for the markup on catalog pages
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = self.current = Node("#document", {})
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, dict(attrs), self.current)
+        self.current.children.append(node)
+        if tag not in _void_elements:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, dict(attrs), self.current))
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_html(html):
+    """
+    Parses a page with the fastest available backend.
+
+    Args:
+        html (bytes or str): The page.
+
+    Returns:
+        object: The backend's document.
+    """
+    if BACKEND == "selectolax":
+        return SelectolaxParser(html)
+    if BACKEND == "lxml":
+        return lxml.html.fromstring(html)
+    builder = _TreeBuilder()
+    builder.feed(html.decode("utf-8", errors="replace") if isinstance(html, bytes) else html)
+    builder.close()
+    return builder.root
+
+
+def select(node, selector):
+    """
+    Returns:
+        list: Elements below `node` matching the selector, in document order, with any backend.
+    """
+    if BACKEND == "selectolax":
+        return node.css(selector)
+    if BACKEND == "lxml":
+        return node.xpath(_xpath(selector))
+    return node.select(selector)
+
+
+def select_first(node, selectors):
+    """
+    Returns:
+        object or None: The first element matching the first selector that matches anything.
+    """
+    for selector in selectors:
+        matches = select(node, selector)
+        if matches:
+            return matches[0]
+    return None
+
+
+def element_text(node):
+    """
+    Returns:
+        str: The text of an element with whitespace collapsed, like Selenium's `.text`.
+    """
+    if BACKEND == "selectolax":
+        text = node.text(deep=True)
+    elif BACKEND == "lxml":
+        text = node.text_content()
+    else:
+        text = node.text()
+    return " ".join(text.split())
+
+
+def element_attribute(node, name):
+    if BACKEND == "selectolax":
+        return node.attributes.get(name)
+    return node.get(name) if BACKEND == "lxml" else node.attrs.get(name)
+
+
+def _xpath(selector):
+    steps = []
+    for tag, classes in parse_selector(selector):
+        conditions = "".join(f"[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]" for name in sorted(classes))
+        steps.append(f"descendant::{tag or '*'}{conditions}")
+    return "/".join(steps)
+
+
+def parse_lot_tiles(html, base_url=None):
+    """
+    Extracts the lots of a catalog page from its `app-lot-tile` elements.
+
+    Args:
+        html (bytes or str): The catalog page.
+        base_url (str, optional): URL of the page, used to make lot links absolute as a browser reports them.
+
+    Returns:
+        list[dict]: One dict per tile with the keys of `scrape_detailed_auction_data`:
+        "link", "title", "lot_number", "number_of_bids", "currency" and "max_bid". As there, a tile whose
+        fields cannot all be read is logged and returned with the fields read before the error.
+    """
+    document = parse_html(html)
+    lots = []
+    for tile in select(document, TILE_SELECTOR):
+        lot = {}
+        try:
+            link = element_attribute(select_first(tile, FIELD_SELECTORS["link"]), "href")
+            lot["link"] = urljoin(base_url, link) if base_url and link else link
+            lot["title"] = element_text(select_first(tile, FIELD_SELECTORS["title"]))
+            lot["lot_number"] = element_text(select_first(tile, FIELD_SELECTORS["lot_number"])).split(" ")[1]
+            lot["number_of_bids"] = int(element_text(select_first(tile, FIELD_SELECTORS["number_of_bids"])).split(" ")[0])
+            max_bid = element_text(select_first(tile, FIELD_SELECTORS["max_bid"])).split(":")[1].strip().split()
+            lot["currency"] = max_bid[1]
+            lot["max_bid"] = float(max_bid[0].replace(",", ""))
+        except Exception as e:
+            logging.warning(f"Error extracting data for one of the lots: {e}")
+        lots.append(lot)
+    return lots
+
+
+def parse_last_page_num(html):
+    """
+    Returns:
+        int: The number of catalog pages, read from the pagination list like `get_last_page_num`; 1 without one.
+    """
+    items = select(parse_html(html), PAGINATION_SELECTOR)
+    numbers = [element_text(item) for item in items]
+    numbers = [int(number) for number in numbers if number.isdigit()]
+    return max(numbers) if numbers else 1
+
+
+def page_url(url, page_number):
+    """
+    Returns:
+        str: URL of a page of a catalog.
+    """
+    separator = "&" if "?" in url else "?"
+    return url if page_number == 1 else f"{url}{separator}{PAGE_PARAMETER}={page_number}"
+
+
+def scrape_catalog(url, max_workers=8, client=None):
+    """
+    Scrapes every page of an auction catalog without a browser.
+
+    The first page is fetched to read the number of pages, then the remaining pages are fetched concurrently
+    over the client's pooled keep-alive connections and parsed with the fastest installed parser.
+
+    Args:
+        url (str): URL of the catalog, e.g. "https://hibid.com/catalog/481347/...".
+        max_workers (int, optional): Number of pages fetched concurrently. Defaults to 8.
+        client (GraphQLClient, optional): Client whose session, rate limiter and retry policy are used. Defaults to
+            the shared pooled client, so page fetches share the request budget with GraphQL polls.
+
+    Returns:
+        list[dict]: The lots of every page in page order, as returned by `parse_lot_tiles`.
+
+    Notes:
+        - A fallback data source for when the GraphQL endpoint is unavailable; the records match those of
+          `scrape_detailed_auction_data` in `extra_code/selenium_functions_test.ipynb`.
+        - Pages that fail to load are logged and skipped.
+    """
+    client = client or default_client
+
+    def fetch(page_number):
+        address = page_url(url, page_number)
+        try:
+            response = client.get(address)
+        except Exception as e:
+            logging.error(f"Error fetching catalog page {address}: {e}")
+            return None
+        if response.status_code != 200:
+            logging.error(f"Error fetching catalog page {address}. Status code: {response.status_code}")
+            return None
+        return response.content
+
+    first_page = fetch(1)
+    if first_page is None:
+        return []
+    last_page_num = parse_last_page_num(first_page)
+    lots = parse_lot_tiles(first_page, url)
+
+    def fetch_and_parse(page_number):
+        html = fetch(page_number)
+        return parse_lot_tiles(html, page_url(url, page_number)) if html is not None else []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for page_lots in executor.map(fetch_and_parse, range(2, last_page_num + 1)):
+            lots.extend(page_lots)
+    logging.info(f"Scraped {len(lots)} lots from {last_page_num} pages of {url}")
+    return lots
@@ -0,0 +1,297 @@
+from concurrent.futures import ThreadPoolExecutor
+from snapshot import atomic_write, load_snapshot
+from graphql_client import default_client
+from json_codec import loads, dumps
+import threading
+import logging
+
+# Two levels per request: the requested nodes plus their direct children, so a lazily expanded
+# node's children arrive together with their own hasChildren/lotCount flags.
+CategorySearch = """query CategorySearch($auctionId: Int = null, $category: CategoryId = null, $searchText: String = null, $hideGoogle: Boolean = false, $zip: String = null, $miles: Int = null, $status: AuctionLotStatus = null, $filter: AuctionLotFilter = null, $isArchive: Boolean = false, $dateStart: DateTime, $dateEnd: DateTime, $returnEmptyCategories: Boolean = false) {
+  categoryTree(
+    input: {auctionId: $auctionId, category: $category, searchText: $searchText, hideGoogle: $hideGoogle, zip: $zip, miles: $miles, status: $status, filter: $filter, isArchive: $isArchive, dateStart: $dateStart, dateEnd: $dateEnd, returnEmptyCategories: $returnEmptyCategories}
+  ) {
+    ...categoryNode
+    children {
+      ...categoryNode
+      __typename
+    }
+    __typename
+  }
+}
+
+fragment categoryNode on CategoryTree {
+  id
+  parentCategoryId
+  baseCategoryId
+  categoryName
+  fullCategory
+  hasChildren
+  lotCount
+  description
+  uRLPath
+  __typename
+}
+"""
+
+DEFAULT_FILTERS = {
+    "auctionId": None,
+    "searchText": None,
+    "hideGoogle": False,
+    "zip": None,
+    "miles": 50,
+    "status": "OPEN",
+    "filter": "ALL",
+    "isArchive": False,
+    "returnEmptyCategories": False,
+    "dateStart": None,
+    "dateEnd": None
+}
+
+
+class CategoryIndex:
+    """
+    Flat, id-keyed index of the hibid.com category tree, built by lazily crawling `CategorySearch`.
+
+    Every node is stored once in `nodes` with a parent pointer and a precomputed full path, so a lookup
+    for a lot's category is a dict hit instead of a tree walk. Nodes with `hasChildren` are only expanded
+    when asked for, and `refresh` re-crawls only the subtrees whose `lotCount` changed.
+
+    Args:
+        filters (dict, optional): `CategorySearch` variables merged over DEFAULT_FILTERS, e.g. {"auctionId": 478457}.
+        client (GraphQLClient, optional): Client used for the requests. Defaults to the shared pooled client.
+        max_workers (int, optional): Number of nodes expanded concurrently by `crawl`. Defaults to 4.
+
+    Example:
+        index = CategoryIndex()
+        index.crawl()
+        index.path(category_id)  # "Antiques > Furniture > Chairs"
+    """
+
+    def __init__(self, filters=None, client=None, max_workers=4):
+        self.filters = {**DEFAULT_FILTERS, **(filters or {})}
+        self.client = client or default_client
+        self.max_workers = max_workers
+        self.nodes = {}
+        self.roots = []
+        self.lock = threading.Lock()
+
+    def __contains__(self, category_id):
+        return category_id in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get(self, category_id):
+        """
+        Returns:
+            dict or None: The indexed node, with keys "id", "parent_id", "name", "path", "lot_count",
+            "has_children", "url_path", "children" and "expanded", or None if the category is unknown.
+        """
+        return self.nodes.get(category_id)
+
+    def path(self, category_id, separator=" > "):
+        """
+        Returns the full path of a category, from its root down to the category itself.
+
+        Args:
+            category_id (int): ID of the category.
+            separator (str, optional): String placed between path components. Defaults to " > ".
+
+        Returns:
+            str or None: The joined path, or None if the category is unknown.
+        """
+        node = self.nodes.get(category_id)
+        return separator.join(node["path"]) if node else None
+
+    def ancestors(self, category_id):
+        """
+        Returns:
+            list: IDs of the category's ancestors, nearest parent first.
+        """
+        ancestors = []
+        node = self.nodes.get(category_id)
+        while node and node["parent_id"] in self.nodes:
+            ancestors.append(node["parent_id"])
+            node = self.nodes[node["parent_id"]]
+        return ancestors
+
+    def children(self, category_id):
+        """
+        Returns the children of a category, fetching them first if the node has not been expanded yet.
+
+        Args:
+            category_id (int): ID of the category.
+
+        Returns:
+            list: The child nodes.
+        """
+        node = self.nodes.get(category_id)
+        if node is None:
+            return []
+        if node["has_children"] and not node["expanded"]:
+            self.expand(category_id)
+        return [self.nodes[child_id] for child_id in node["children"]]
+
+    def fetch_level(self, category_id=None):
+        """
+        Fetches the direct children of a category, or the root categories if `category_id` is None.
+
+        Args:
+            category_id (int, optional): ID of the parent category.
+
+        Returns:
+            list or None: Raw `categoryTree` nodes, or None if the request failed.
+        """
+        variables = {**self.filters, "category": category_id}
+        response = self.client.post("CategorySearch", CategorySearch, variables)
+        if response.status_code != 200:
+            logging.error(f"Error fetching category {category_id}. Status code: {response.status_code}")
+            return None
+        tree = loads(response.content)["data"]["categoryTree"] or []
+        if category_id is None:
+            return tree
+        # Depending on the filter, the API returns either the requested node itself or its children
+        for node in tree:
+            if node["id"] == category_id:
+                return node.get("children") or []
+        return tree
+
+    def expand(self, category_id):
+        """
+        Fetches and indexes the direct children of a category.
+
+        Args:
+            category_id (int): ID of the category to expand.
+
+        Returns:
+            list: IDs of the children that have children of their own and are not expanded yet.
+        """
+        level = self.fetch_level(category_id)
+        if level is None:
+            return []
+        with self.lock:
+            return self._index_level(category_id, level)
+
+    def crawl(self, max_depth=None):
+        """
+        Builds the index from the root categories down, expanding every node with children.
+
+        Args:
+            max_depth (int, optional): Number of levels to expand below the roots. None crawls the whole tree.
+        """
+        level = self.fetch_level()
+        if level is None:
+            return
+        with self.lock:
+            frontier = self._index_level(None, level)
+        depth = 1
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while frontier and (max_depth is None or depth <= max_depth):
+                next_frontier = []
+                for pending in executor.map(self.expand, frontier):
+                    next_frontier.extend(pending)
+                frontier = next_frontier
+                depth += 1
+        logging.info(f"Indexed {len(self.nodes)} categories")
+
+    def refresh(self):
+        """
+        Re-fetches the root categories and re-crawls only the expanded subtrees whose lotCount changed.
+
+        Returns:
+            int: Number of nodes whose lotCount changed, including new nodes.
+        """
+        old_counts = {category_id: node["lot_count"] for category_id, node in self.nodes.items()}
+        changed = 0
+        frontier = [None]
+
+        while frontier:
+            parent_id = frontier.pop()
+            level = self.fetch_level(parent_id)
+            if level is None:
+                continue
+            with self.lock:
+                self._index_level(parent_id, level)
+
+            stack = list(level)
+            while stack:
+                raw = stack.pop()
+                if old_counts.get(raw["id"]) == raw.get("lotCount"):
+                    continue
+                changed += 1
+                if raw.get("children"):
+                    stack.extend(raw["children"])
+                elif self.nodes[raw["id"]]["expanded"]:
+                    # Deeper than this response reaches; re-crawl the subtree from this node
+                    frontier.append(raw["id"])
+        return changed
+
+    def save(self, path):
+        """
+        Writes the index to a JSON file, replaced atomically with a checksum like the other persisted state.
+
+        Args:
+            path (str): Path of the JSON file.
+        """
+        atomic_write(path, dumps({"roots": self.roots, "nodes": list(self.nodes.values())}))
+
+    def load(self, path):
+        """
+        Loads an index written by `save`.
+
+        Args:
+            path (str): Path of the JSON file.
+        """
+        data = load_snapshot(path)
+        if data is None:
+            return
+        self.roots = data["roots"]
+        self.nodes = {node["id"]: {**node, "path": tuple(node["path"])} for node in data["nodes"]}
+
+    def _index_level(self, parent_id, level):
+        parent = self.nodes.get(parent_id)
+        parent_path = parent["path"] if parent else ()
+        child_ids = []
+        pending = []
+
+        for raw in level:
+            category_id = raw["id"]
+            child_ids.append(category_id)
+            old = self.nodes.get(category_id)
+            node = {
+                "id": category_id,
+                "parent_id": parent_id,
+                "name": raw["categoryName"],
+                "path": parent_path + (raw["categoryName"],),
+                "lot_count": raw.get("lotCount"),
+                "has_children": bool(raw.get("hasChildren")),
+                "url_path": raw.get("uRLPath"),
+                "children": old["children"] if old else [],
+                "expanded": old["expanded"] if old else False
+            }
+            self.nodes[category_id] = node
+
+            # Children that came with this response are indexed right away
+            if raw.get("children"):
+                pending.extend(self._index_level(category_id, raw["children"]))
+            elif node["has_children"] and not node["expanded"]:
+                pending.append(category_id)
+
+        # Drop subtrees of categories that no longer exist under this parent
+        old_ids = self.roots if parent_id is None else (parent["children"] if parent else [])
+        for removed_id in set(old_ids) - set(child_ids):
+            self._remove(removed_id)
+
+        if parent_id is None:
+            self.roots = child_ids
+        elif parent:
+            parent["children"] = child_ids
+            parent["expanded"] = True
+        return pending
+
+    def _remove(self, category_id):
+        node = self.nodes.pop(category_id, None)
+        if node:
+            for child_id in node["children"]:
+                self._remove(child_id)
@@ -0,0 +1,235 @@
+from snapshot import atomic_write
+import threading
+import logging
+import atexit
+import csv
+import io
+import os
+
+# Columns of the rows scraped by `catalog_scraper` and the Selenium notebook
+SCRAPED_COLUMNS = ("link", "title", "lot_number", "number_of_bids", "currency", "max_bid")
+
+# Columns of `lot_rows`, built from tracked GraphQL lots
+LOT_COLUMNS = ("itemId", "lotNumber", "lead", "bidCount", "highBid", "minBid", "status", "isClosed")
+
+
+class CsvUpsertSink:
+    """
+    CSV file kept up to date by upserting batches of rows keyed by one column, e.g. the lot link or itemId.
+
+    Rows are held in memory in a dict keyed by the key column, so a batch costs one lookup and one tuple
+    comparison per row. Only new and changed rows are written, appended to `<name>.changes.csv`; the log is
+    folded into the CSV itself every `compact_every` batches and by `close`. The CSV is a plain file any
+    reader can open, holding every row as of the last compaction:
+
+        auctions.csv            snapshot, one row per key
+        auctions.changes.csv    rows upserted since, in order; the last row of a key wins
+
+    Args:
+        path (str): Path of the CSV file.
+        columns (iterable, optional): Column names, used when the file does not exist yet. Defaults to SCRAPED_COLUMNS.
+        key (str, optional): Column the rows are keyed by. Defaults to "link".
+        compact_every (int, optional): Number of upserted batches between compactions. Defaults to 50.
+
+    Example:
+        sink = CsvUpsertSink("auctions.csv")
+        sink.upsert(scrape_catalog(url))
+    """
+
+    def __init__(self, path, columns=SCRAPED_COLUMNS, key="link", compact_every=50):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".changes.csv"
+        self.columns = tuple(columns)
+        self.key = key
+        self.compact_every = compact_every
+        self.rows = {}
+        self.batches = 0
+        self.log_file = None
+        self.lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def load(self):
+        """
+        Reads the CSV and replays the change log into the in-memory index.
+        """
+        self.rows = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header:
+                    self.columns = tuple(header)
+                self._read_rows(reader)
+        if self.key not in self.columns:
+            raise ValueError(f"Key column {self.key} is not one of {self.columns}")
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", newline="", encoding="utf-8") as f:
+                self._read_rows(csv.reader(f))
+
+    def upsert(self, records):
+        """
+        Inserts new rows and updates changed ones.
+
+        Args:
+            records (iterable): Dicts with the sink's columns; missing columns are written empty and other keys are ignored.
+                Records without a key are skipped.
+
+        Returns:
+            tuple: (inserted, updated) row counts.
+        """
+        columns = self.columns
+        key_index = columns.index(self.key)
+        changed = []
+        inserted = 0
+        with self.lock:
+            rows = self.rows
+            for record in records:
+                row = tuple(_format(record.get(column)) for column in columns)
+                key = row[key_index]
+                if not key:
+                    continue
+                old = rows.get(key)
+                if old == row:
+                    continue
+                if old is None:
+                    inserted += 1
+                rows[key] = row
+                changed.append(row)
+            if changed:
+                self._append(changed)
+            self.batches += 1
+            if self.batches % self.compact_every == 0:
+                self._compact()
+        return inserted, len(changed) - inserted
+
+    def get(self, key):
+        """
+        Returns:
+            dict or None: The stored row of a key.
+        """
+        with self.lock:
+            row = self.rows.get(str(key))
+        return dict(zip(self.columns, row)) if row is not None else None
+
+    def compact(self):
+        """
+        Rewrites the CSV with every row and truncates the change log.
+        """
+        with self.lock:
+            self._compact()
+
+    def to_dataframe(self):
+        """
+        Returns:
+            pandas.DataFrame: Every row, with values as strings. Requires pandas.
+        """
+        import pandas as pd
+
+        with self.lock:
+            return pd.DataFrame(list(self.rows.values()), columns=list(self.columns))
+
+    def close(self):
+        """
+        Compacts the sink and closes the change log.
+        """
+        self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _read_rows(self, reader):
+        key_index = self.columns.index(self.key) if self.key in self.columns else 0
+        width = len(self.columns)
+        for row in reader:
+            # A torn final row from a crash mid-append has fewer fields; it is dropped
+            if len(row) != width:
+                logging.warning(f"Skipping incomplete row in {self.path}")
+                continue
+            self.rows[row[key_index]] = tuple(row)
+
+    def _append(self, rows):
+        if self.log_file is None:
+            self.log_file = open(self.log_path, "a", newline="", encoding="utf-8")
+        csv.writer(self.log_file).writerows(rows)
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+
+    def _compact(self):
+        buffer = io.StringIO(newline="")
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        writer.writerows(self.rows.values())
+        atomic_write(self.path, buffer.getvalue().encode("utf-8"))
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+
+def lot_rows(auction_data):
+    """
+    Flattens tracked GraphQL lots into rows with LOT_COLUMNS, for a sink keyed by "itemId".
+
+    Args:
+        auction_data (dict): Auction data with keys "auction" and "lots".
+
+    Yields:
+        dict: One row per lot.
+    """
+    for item_id, lot in auction_data["lots"].items():
+        lot_state = lot.get("lotState") or {}
+        yield {
+            "itemId": item_id,
+            "lotNumber": lot.get("lotNumber"),
+            "lead": lot.get("lead"),
+            "bidCount": lot_state.get("bidCount"),
+            "highBid": lot_state.get("highBid"),
+            "minBid": lot_state.get("minBid"),
+            "status": lot_state.get("status"),
+            "isClosed": lot_state.get("isClosed")
+        }
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def update_csv_with_data(filename, data):
+    """
+    Drop-in replacement for the notebook's `update_csv_with_data`: upserts scraped rows keyed by link.
+
+    The sink of each file is kept open between calls, so the CSV is read once rather than on every cycle.
+
+    Args:
+        filename (str): Path of the CSV file.
+        data (list): Rows as returned by `catalog_scraper.scrape_catalog`.
+
+    Returns:
+        tuple: (inserted, updated) row counts.
+    """
+    with _sinks_lock:
+        sink = _sinks.get(filename)
+        if sink is None:
+            sink = _sinks[filename] = CsvUpsertSink(filename)
+    return sink.upsert(data)
+
+
+def _close_sinks():
+    with _sinks_lock:
+        for sink in _sinks.values():
+            sink.close()
+
+
+atexit.register(_close_sinks)
+
+
+def _format(value):
+    # The string a value takes in the CSV, so fresh values compare equal to ones read back from the file
+    return "" if value is None else str(value)
@@ -0,0 +1,147 @@
+from snapshot import load_auction_data, save_auction_data
+from json_codec import loads, dumps
+from records import Lot, Auction
+import logging
+import time
+import os
+
+
+class AuctionLog:
+    """
+    Append-only JSON-lines log of changes to one auction, compacted periodically into a JSON snapshot.
+
+    The snapshot is the usual `auctions/<name>_<id>.json` file; the log lives next to it as
+    `auctions/<name>_<id>.log.jsonl`. Each line is one event:
+
+        {"t": 1693500000.0, "type": "auction", "auction": {...}}
+        {"t": 1693500000.0, "type": "lot", "lot": {...}}
+        {"t": 1693500060.0, "type": "state", "itemId": 123, "lotState": {...}}
+
+    "state" events are merged into the stored lotState, so replaying an event twice is harmless. This
+    makes compaction crash-safe: if the process dies after the snapshot was written but before the log
+    was rolled, the next load simply replays events that are already in the snapshot.
+
+    Compaction rolls the log to `<name>_<id>.log.jsonl.prev` instead of deleting it. The previous segment holds
+    the events between the snapshot kept as `.bak` and the current one, so if the current snapshot fails its
+    checksum and `.bak` is loaded instead, replaying both segments still restores every event.
+
+    Args:
+        file_path (str): Path of the snapshot JSON file.
+        compact_every (int, optional): Number of appended batches (polls) between compactions. Defaults to 15.
+    """
+
+    def __init__(self, file_path, compact_every=15):
+        self.file_path = file_path
+        self.log_path = os.path.splitext(file_path)[0] + ".log.jsonl"
+        self.previous_log_path = self.log_path + ".prev"
+        self.compact_every = compact_every
+        self.batches = 0
+        self.log_file = None
+
+    def load(self):
+        """
+        Rebuilds the auction data from the snapshot plus a replay of the previous and current log segments.
+
+        Returns:
+            dict: Auction data with keys "auction" and "lots".
+        """
+        auction_data = load_auction_data(self.file_path)
+        # The previous segment is already in a verified snapshot; replaying it again is harmless and
+        # recovers its events when the snapshot was corrupt and its backup was loaded instead
+        for log_path in (self.previous_log_path, self.log_path):
+            if not os.path.exists(log_path):
+                continue
+            replayed = 0
+            with open(log_path, "rb") as f:
+                for line in f:
+                    try:
+                        event = loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append; everything before it is intact
+                        logging.warning(f"Skipping unreadable line in {log_path}")
+                        continue
+                    apply_event(auction_data, event)
+                    replayed += 1
+            logging.info(f"Replayed {replayed} events from {log_path}")
+        return auction_data
+
+    def append(self, events):
+        """
+        Appends the events of one poll to the log and fsyncs it.
+
+        Args:
+            events (list): Event dicts as collected by `merge_live_catalog`.
+        """
+        if not events:
+            return
+        if self.log_file is None:
+            self.log_file = open(self.log_path, "ab")
+
+        t = time.time()
+        lines = []
+        for event in events:
+            lines.append(dumps({"t": t, **event}))
+        self.log_file.write(b"\n".join(lines) + b"\n")
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+
+    def commit(self, auction_data, events):
+        """
+        Appends the events of one poll and compacts the log every `compact_every` polls.
+
+        Args:
+            auction_data (dict): The current auction data, written as the snapshot on compaction.
+            events (list): Event dicts of this poll.
+        """
+        self.append(events)
+        self.batches += 1
+        if self.batches % self.compact_every == 0:
+            self.compact(auction_data)
+
+    def compact(self, auction_data):
+        """
+        Writes the auction data as the new snapshot and rolls the log to the previous segment.
+
+        The segment it replaces only held events older than the snapshot now kept as `.bak`.
+
+        Args:
+            auction_data (dict): The current auction data.
+        """
+        save_auction_data(self.file_path, auction_data)
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        if os.path.exists(self.log_path):
+            os.replace(self.log_path, self.previous_log_path)
+
+    def close(self):
+        """
+        Closes the log file handle.
+        """
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+
+def apply_event(auction_data, event):
+    """
+    Applies a single log event to the auction data.
+
+    Args:
+        auction_data (dict): Auction data with keys "auction" and "lots".
+        event (dict): An event as written by `AuctionLog.append`.
+    """
+    event_type = event["type"]
+    if event_type == "auction":
+        auction_data["auction"] = Auction.from_dict(event["auction"])
+    elif event_type == "auctionState":
+        auction_data["auction"]["auctionState"] = {**auction_data["auction"].get("auctionState", {}), **event["auctionState"]}
+    elif event_type == "lot":
+        lot = event["lot"]
+        auction_data["lots"][lot["itemId"]] = Lot.from_dict(lot)
+    elif event_type == "state":
+        stored_lot = auction_data["lots"].get(event["itemId"])
+        if stored_lot is not None:
+            stored_lot["lotState"].update(event["lotState"])
+    else:
+        logging.warning(f"Unknown event type in auction log: {event_type}")
@@ -0,0 +1,324 @@
+from lot_diff import BID, EXTENSION, CLOSED, AUCTION_FINISHED, WATCH_MATCH
+from json_codec import dumps
+from collections import deque
+import threading
+import requests
+import logging
+import socket
+import random
+import time
+import os
+
+# Event kinds forwarded by default: price moves, soft-close extensions, closed lots, finished auctions and watchlist matches
+NOTIFY_KINDS = (BID, EXTENSION, CLOSED, AUCTION_FINISHED, WATCH_MATCH)
+
+# lotState fields copied into every notification
+STATE_FIELDS = ("highBid", "bidCount", "minBid", "status", "isClosed", "timeLeftSeconds", "priceRealized")
+
+
+def event_to_dict(event):
+    """
+    Converts a `ChangeEvent` into the JSON-ready notification sent to sinks.
+
+    The lot is reduced to a few identifying fields, read from the stored record since the received lot of a
+    "state-only" poll lacks them, and the lotState values received with the event. Both are copied at conversion
+    time so later polls updating the stored lot in place cannot change a queued notification.
+
+    Returns:
+        dict: "kind", "auction_id", "item_id", "timestamp", "changes" (field -> [old, new]) and, for lot events,
+        "lot" with "lotNumber", "lead" and the STATE_FIELDS values.
+    """
+    notification = {
+        "kind": event.kind,
+        "auction_id": event.auction_id,
+        "item_id": event.item_id,
+        "timestamp": event.timestamp,
+        "changes": {field: [old, new] for field, (old, new) in event.changes.items()}
+    }
+    lot = event.lot
+    if lot is not None:
+        record = event.record if event.record is not None else lot
+        lot_state = lot.get("lotState") or {}
+        notification["lot"] = {
+            "lotNumber": record.get("lotNumber"),
+            "lead": record.get("lead"),
+            **{field: lot_state.get(field) for field in STATE_FIELDS}
+        }
+    return notification
+
+
+class WebhookSink:
+    """
+    POSTs each batch as a JSON array to an HTTP endpoint, e.g. a local webhook receiver.
+
+    Args:
+        url (str): The endpoint.
+        timeout (float, optional): Request timeout in seconds. Defaults to 5.
+        headers (dict, optional): Extra request headers.
+    """
+
+    def __init__(self, url, timeout=5, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["content-type"] = "application/json"
+        if headers:
+            self.session.headers.update(headers)
+
+    def send(self, batch):
+        response = self.session.post(self.url, data=dumps(batch), timeout=self.timeout)
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+    def __repr__(self):
+        return f"WebhookSink({self.url})"
+
+
+class UnixSocketSink:
+    """
+    Streams notifications as JSON lines to a Unix domain socket, reconnecting after errors.
+
+    Args:
+        path (str): Path of the socket the consumer listens on.
+        timeout (float, optional): Connect and send timeout in seconds. Defaults to 5.
+    """
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self.socket = None
+
+    def send(self, batch):
+        if self.socket is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self.socket = sock
+        try:
+            self.socket.sendall(b"".join(dumps(notification) + b"\n" for notification in batch))
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def __repr__(self):
+        return f"UnixSocketSink({self.path})"
+
+
+class FileSink:
+    """
+    Appends notifications as JSON lines to a file.
+
+    Args:
+        path (str): Path of the file.
+        fsync (bool, optional): Fsync after every batch. Defaults to False.
+    """
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.file = None
+
+    def send(self, batch):
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, "ab")
+        self.file.write(b"".join(dumps(notification) + b"\n" for notification in batch))
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __repr__(self):
+        return f"FileSink({self.path})"
+
+
+class SinkWorker:
+    """
+    Bounded queue and delivery thread of one sink.
+
+    Notifications are sent in batches of up to `batch_size`, as soon as a batch is full or `flush_interval`
+    seconds after its first notification was queued. When the sink falls behind and the queue is full, the
+    oldest notifications are dropped, so a slow consumer never blocks the tracker.
+
+    Args:
+        sink (object): Object with `send(batch)` and `close()`, e.g. `WebhookSink`.
+        kinds (iterable, optional): Event kinds forwarded to the sink; None forwards every kind. Defaults to NOTIFY_KINDS.
+        batch_size (int, optional): Maximum notifications per `send`. Defaults to 100.
+        flush_interval (float, optional): Maximum seconds a notification waits for its batch to fill. Defaults to 0.2.
+        max_queue (int, optional): Maximum queued notifications. Defaults to 10000.
+        max_retries (int, optional): Retries of a failed batch, with jittered backoff, before it is dropped. Defaults to 3.
+    """
+
+    def __init__(self, sink, kinds=NOTIFY_KINDS, batch_size=100, flush_interval=0.2, max_queue=10000, max_retries=3):
+        self.sink = sink
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.queue = deque(maxlen=max_queue)
+        self.condition = threading.Condition()
+        self.first_queued_at = None
+        self.closing = False
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name=f"sink-{sink!r}", daemon=True)
+        self.thread.start()
+
+    def accepts(self, kind):
+        return self.kinds is None or kind in self.kinds
+
+    def put(self, notifications):
+        """
+        Queues notifications without blocking. Returns immediately even if the sink is stalled.
+        """
+        with self.condition:
+            overflow = len(self.queue) + len(notifications) - self.queue.maxlen
+            if overflow > 0:
+                self.dropped += min(overflow, len(self.queue) + len(notifications))
+            self.queue.extend(notifications)
+            if self.first_queued_at is None:
+                self.first_queued_at = time.monotonic()
+            self.condition.notify()
+
+    def close(self, timeout=10):
+        """
+        Delivers what is queued, waiting at most `timeout` seconds, then closes the sink.
+        """
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join(timeout)
+        try:
+            self.sink.close()
+        except Exception as e:
+            logging.error(f"Error closing {self.sink!r}: {e}")
+
+    def stats(self):
+        with self.condition:
+            return {"queued": len(self.queue), "sent": self.sent, "dropped": self.dropped, "failed": self.failed}
+
+    def _next_batch(self):
+        with self.condition:
+            while True:
+                if self.queue:
+                    waited = time.monotonic() - self.first_queued_at
+                    if len(self.queue) >= self.batch_size or waited >= self.flush_interval or self.closing:
+                        break
+                    self.condition.wait(self.flush_interval - waited)
+                elif self.closing:
+                    return None
+                else:
+                    self.condition.wait()
+            batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            self.first_queued_at = time.monotonic() if self.queue else None
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.sink.send(batch)
+                except Exception as e:
+                    if attempt == self.max_retries or self.closing:
+                        logging.error(f"Dropping {len(batch)} notifications for {self.sink!r}: {e}")
+                        with self.condition:
+                            self.failed += len(batch)
+                        break
+                    time.sleep(random.uniform(0, min(5, 0.1 * 2 ** attempt)))
+                else:
+                    with self.condition:
+                        self.sent += len(batch)
+                    break
+
+
+class Dispatcher:
+    """
+    Forwards tracker events from an `EventBus` to pluggable sinks, each with its own queue and thread.
+
+    The bus calls `dispatch` in the polling thread. It only converts the events and appends them to the sinks'
+    bounded queues, so neither a slow webhook nor a full queue delays a poll.
+
+    Example:
+        bus = EventBus()
+        dispatcher = Dispatcher(bus)
+        dispatcher.add_sink(WebhookSink("http://127.0.0.1:8000/hibid"), kinds=(BID, AUCTION_FINISHED))
+        dispatcher.add_sink(FileSink("events.jsonl"), kinds=None)
+        track_and_update_data(auction_id, file_name, bus=bus)
+    """
+
+    def __init__(self, bus=None):
+        self.workers = []
+        self.bus = None
+        if bus is not None:
+            self.attach(bus)
+
+    def attach(self, bus):
+        """
+        Subscribes the dispatcher to every event kind of a bus.
+        """
+        self.bus = bus
+        bus.subscribe(self.dispatch)
+
+    def add_sink(self, sink, kinds=NOTIFY_KINDS, batch_size=100, flush_interval=0.2, max_queue=10000, max_retries=3):
+        """
+        Adds a sink. The arguments are those of `SinkWorker`.
+
+        Returns:
+            SinkWorker: The sink's worker, whose `stats()` report delivered and dropped notifications.
+        """
+        worker = SinkWorker(sink, kinds, batch_size, flush_interval, max_queue, max_retries)
+        self.workers.append(worker)
+        return worker
+
+    def dispatch(self, event):
+        """
+        Queues one event for every sink that accepts its kind.
+        """
+        notification = None
+        for worker in self.workers:
+            if worker.accepts(event.kind):
+                if notification is None:
+                    notification = event_to_dict(event)
+                worker.put((notification,))
+
+    def stats(self):
+        """
+        Returns:
+            dict: Queued, sent, dropped and failed notifications summed over every sink.
+        """
+        totals = {"queued": 0, "sent": 0, "dropped": 0, "failed": 0}
+        for worker in self.workers:
+            for key, value in worker.stats().items():
+                totals[key] += value
+        return totals
+
+    def close(self, timeout=10):
+        """
+        Unsubscribes from the bus, delivers the queued notifications and closes every sink.
+        """
+        if self.bus is not None:
+            self.bus.unsubscribe(self.dispatch)
+            self.bus = None
+        for worker in self.workers:
+            worker.close(timeout)
@@ -0,0 +1,189 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import default_limiter, default_retry_policy
+from metrics import request_seconds, response_bytes, register_stats
+
+GRAPHQL_URL = "https://hibid.com/graphql"
+
+DEFAULT_HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-encoding": "gzip, deflate, br",
+    "accept-language": "en-US,en;q=0.9",
+    "content-type": "application/json",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "site_subdomain": "hibid.com"
+}
+
+
+class GraphQLClient:
+    """
+    Small GraphQL client that keeps a pooled, keep-alive HTTP session to the hibid.com endpoint.
+
+    A single instance should be shared by every fetch function so that polls reuse already
+    established TCP+TLS connections instead of opening a new one per request.
+
+    Args:
+        url (str, optional): The GraphQL endpoint URL. Defaults to GRAPHQL_URL.
+        headers (dict, optional): Extra headers merged over DEFAULT_HEADERS.
+        timeout (float or tuple, optional): Default (connect, read) timeout in seconds for every request.
+        pool_connections (int, optional): Number of host pools kept by the HTTP adapter.
+        pool_maxsize (int, optional): Maximum number of keep-alive connections kept per host.
+        limiter (RateLimiter, optional): Token buckets every request waits on. Defaults to the process-wide limiter.
+        retry_policy (RetryPolicy, optional): Backoff policy for 429/5xx responses and connection errors.
+            Defaults to the process-wide policy.
+
+    Notes:
+        - gzip and deflate responses are decoded by urllib3; br (brotli) is only advertised when
+          a brotli decoder is installed, otherwise it is dropped from the accept-encoding header.
+        - Sharing one limiter between clients shares the request budget; the defaults are shared by every
+          client in the process, including the asyncio one.
+    """
+
+    def __init__(self, url=GRAPHQL_URL, headers=None, timeout=(5, 30), pool_connections=4, pool_maxsize=32,
+                 limiter=None, retry_policy=None):
+        self.url = url
+        self.timeout = timeout
+        self.limiter = limiter or default_limiter
+        self.retry_policy = retry_policy or default_retry_policy
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if not _brotli_available():
+            self.session.headers["accept-encoding"] = "gzip, deflate"
+        if headers:
+            self.session.headers.update(headers)
+
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, operation_name, query, variables=None, timeout=None, stream=False):
+        """
+        Sends a GraphQL operation to the endpoint over the pooled session.
+
+        Every attempt first waits for the rate limiter. 429/5xx responses, connection errors and timeouts
+        are retried with jittered exponential backoff, or after the server's Retry-After if it sent one.
+
+        Args:
+            operation_name (str): The GraphQL operation name, e.g. "LiveCatalogLots".
+            query (str): The GraphQL document.
+            variables (dict, optional): Variables for the operation.
+            timeout (float or tuple, optional): Overrides the client's default timeout for this request.
+            stream (bool, optional): Leave the body unread so it can be consumed incrementally with
+                `iter_content`, e.g. by `json_codec.iter_live_lots`. Only a 200 response is left unread;
+                close it, e.g. with `with response:`. Defaults to False.
+
+        Returns:
+            requests.Response: The raw HTTP response of the last attempt. Content encoding has already been decoded.
+
+        Raises:
+            requests.RequestException: If the last attempt failed with a connection error or timeout.
+        """
+        payload = {
+            "operationName": operation_name,
+            "query": query,
+            "variables": variables or {}
+        }
+        return self._request(operation_name, "POST", self.url, timeout, stream, json=payload)
+
+    def get(self, url, operation_name="CatalogPage", timeout=None):
+        """
+        Fetches an HTML page of the site over the pooled session, e.g. a catalog page for `catalog_scraper`.
+
+        Pages are rate limited and retried exactly like GraphQL operations, and count toward the same budget.
+
+        Args:
+            url (str): The page URL.
+            operation_name (str, optional): Name the request is limited and recorded under. Defaults to "CatalogPage".
+            timeout (float or tuple, optional): Overrides the client's default timeout for this request.
+
+        Returns:
+            requests.Response: The raw HTTP response of the last attempt.
+
+        Raises:
+            requests.RequestException: If the last attempt failed with a connection error or timeout.
+        """
+        headers = {"accept": "text/html,application/xhtml+xml", "sec-fetch-dest": "document", "sec-fetch-mode": "navigate"}
+        return self._request(operation_name, "GET", url, timeout, False, headers=headers)
+
+    def _request(self, operation_name, method, url, timeout, stream, **kwargs):
+        attempt = 0
+        while True:
+            self.limiter.acquire(operation_name)
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, stream=stream, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                request_seconds.observe(time.perf_counter() - start, operation=operation_name, status="error")
+                if not self.retry_policy.should_retry(attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"{operation_name} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                request_seconds.observe(time.perf_counter() - start, operation=operation_name, status=response.status_code)
+                if not stream:
+                    response_bytes.inc(len(response.content), operation=operation_name)
+                if not self.retry_policy.should_retry(attempt, response.status_code):
+                    if stream and response.status_code != 200:
+                        # Error bodies are small; reading one now releases the connection even if the caller never closes it
+                        response_bytes.inc(len(response.content), operation=operation_name)
+                    return response
+                delay = self.retry_policy.delay(attempt, response.headers.get("Retry-After"))
+                logging.warning(f"{operation_name} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        """
+        Closes every pooled connection held by the session.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_content(response, operation_name, chunk_size=65536):
+    """
+    Yields the body of a streamed response chunk by chunk, counting the bytes read in `response_bytes` like the
+    client does for responses it reads whole.
+
+    Args:
+        response (requests.Response): A 200 response of `GraphQLClient.post(..., stream=True)`.
+        operation_name (str): Operation the bytes are counted under, e.g. "LiveCatalogLots".
+        chunk_size (int, optional): Bytes per chunk. Defaults to 64 KB.
+
+    Yields:
+        bytes: Decoded chunks of the body, e.g. for `json_codec.iter_live_lots`.
+    """
+    for chunk in response.iter_content(chunk_size):
+        response_bytes.inc(len(chunk), operation=operation_name)
+        yield chunk
+
+
+def _brotli_available():
+    try:
+        import brotli  # noqa: F401
+        return True
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+
+default_client = GraphQLClient()
+
+register_stats("hibid_rate_limiter", default_limiter.stats, "Requests seen by the shared rate limiter.")
+register_stats("hibid_retry_policy", default_retry_policy.stats, "Retries made by the shared retry policy.")
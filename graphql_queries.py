@@ -358,6 +358,50 @@ LiveCatalogLots = """query LiveCatalogLots($auctionId: Int!) {
         }
     """
 
+LiveCatalogLotsState = """query LiveCatalogLots($auctionId: Int!) {
+            liveCatalogLots(id: $auctionId) {
+                auction {
+                    id
+                    lotCount
+                    auctionState {
+                        auctionStatus
+                        openLotCount
+                        timeToOpen
+                        __typename
+                    }
+                    __typename
+                }
+                liveLots {
+                    itemId
+                    lotState {
+                        ...lotState
+                        __typename
+                    }
+                    __typename
+                }
+                __typename
+            }
+        }
+
+        fragment lotState on LotState {
+            bidCount
+            biddingExtended
+            highBid
+            isClosed
+            isLive
+            isNotYetLive
+            minBid
+            priceRealized
+            quantitySold
+            reserveSatisfied
+            softCloseSeconds
+            status
+            timeLeftSeconds
+            timeLeftWithLimboSeconds
+            __typename
+        }
+    """
+
 GetLotDetails = """query GetLotDetails($lotId: ID!, $countAsView: Boolean = true) {
   lot(input: $lotId, countAsView: $countAsView) {
     accessability
@@ -615,4 +659,25 @@ fragment lotState on LotState {
   timeLeftWithLimboSeconds
   watchNotes
   __typename
-}"""
\ No newline at end of file
+}"""
+
+GetLotDescription = """query GetLotDescription($lotId: ID!, $countAsView: Boolean = false) {
+  lot(input: $lotId, countAsView: $countAsView) {
+    lot {
+      id
+      itemId
+      lead
+      description
+      __typename
+    }
+    __typename
+  }
+}"""
+
+# Named query profiles for LiveCatalogLots. "full" fetches the whole auction and every lot field and is used
+# for the first fetch and for newly listed lots; "state-only" fetches just itemId plus the bidding fields of
+# lotState and is used for the polls in between.
+LiveCatalogLotsProfiles = {
+    "full": LiveCatalogLots,
+    "state-only": LiveCatalogLotsState
+}
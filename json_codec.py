@@ -0,0 +1,174 @@
+import json
+import re
+
+# Pick the fastest installed backend: orjson, then msgspec, then the standard library
+try:
+    import orjson
+    BACKEND = "orjson"
+except ImportError:
+    orjson = None
+    try:
+        import msgspec
+        BACKEND = "msgspec"
+    except ImportError:
+        msgspec = None
+        BACKEND = "json"
+
+
+def _default(value):
+    # Objects such as records.Record that know their own JSON form
+    to_dict = getattr(value, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_dict()
+
+
+if BACKEND == "msgspec":
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_default)
+    _msgspec_decoder = msgspec.json.Decoder()
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[\s,]*")
+
+
+def loads(data):
+    """
+    Decodes a JSON document with the fastest available backend.
+
+    Args:
+        data (bytes or str): The JSON document.
+
+    Returns:
+        object: The decoded value.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+    """
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        try:
+            return _msgspec_decoder.decode(data.encode("utf-8") if isinstance(data, str) else data)
+        except msgspec.DecodeError as e:
+            # Callers catch ValueError for malformed documents, as with the other backends
+            raise ValueError(str(e)) from e
+    return json.loads(data)
+
+
+def dumps(value, pretty=False):
+    """
+    Encodes a value as JSON with the fastest available backend.
+
+    Args:
+        value (object): The value to encode. Dicts may have int keys, which are written as strings, and objects
+            with a `to_dict` method, such as records, are encoded as the dict it returns.
+        pretty (bool, optional): Indent and sort keys for human reading instead of writing compact JSON. Defaults to False.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if BACKEND == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        return orjson.dumps(value, default=_default, option=option)
+    if BACKEND == "msgspec" and not pretty:
+        return _msgspec_encoder.encode(value)
+    if pretty:
+        return json.dumps(value, default=_default, indent=2, sort_keys=True).encode("utf-8")
+    return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def load(file):
+    """
+    Decodes a JSON document from a file opened in binary mode.
+    """
+    return loads(file.read())
+
+
+def dump(value, file, pretty=False):
+    """
+    Encodes a value as JSON into a file opened in binary mode.
+    """
+    file.write(dumps(value, pretty))
+
+
+def iter_live_lots(chunks, auction=None, chunk_size=65536):
+    """
+    Incrementally parses a `LiveCatalogLots` response and yields its `liveLots` entries one at a time.
+
+    Only the lot currently being decoded and the unread part of the current chunk are held in memory,
+    never the whole response tree.
+
+    Args:
+        chunks (iterable or file): Bytes chunks of the response body, e.g. `graphql_client.iter_content(response, ...)`,
+            or a file-like object opened in binary mode.
+        auction (dict, optional): If given, filled with the response's `auction` object, which precedes `liveLots`.
+        chunk_size (int, optional): Read size when `chunks` is a file-like object. Defaults to 64 KB.
+
+    Yields:
+        dict: One `liveLots` entry.
+
+    Example:
+        response = client.post("LiveCatalogLots", query, variables, stream=True)
+        for lot in iter_live_lots(graphql_client.iter_content(response, "LiveCatalogLots")):
+            ...
+    """
+    if hasattr(chunks, "read"):
+        chunks = iter(lambda file=chunks: file.read(chunk_size), b"")
+    chunks = iter(chunks)
+    buffer = ""
+    pending = b""
+
+    def read_more():
+        nonlocal buffer, pending
+        for chunk in chunks:
+            if not chunk:
+                continue
+            # Keep a multi-byte UTF-8 sequence split across chunks for the next decode
+            data = pending + chunk
+            text = data.decode("utf-8", errors="ignore")
+            cut = len(text.encode("utf-8"))
+            pending = data[cut:]
+            buffer += text
+            return True
+        return False
+
+    # Skip to the liveLots array. A quoted key cannot occur inside a JSON string, where quotes are escaped.
+    array_start = re.compile(r'"liveLots"\s*:\s*\[')
+    match = array_start.search(buffer)
+    while match is None:
+        if not read_more():
+            return
+        match = array_start.search(buffer)
+
+    if auction is not None:
+        auction_match = re.search(r'"auction"\s*:\s*', buffer[:match.start()])
+        if auction_match is not None:
+            try:
+                auction.update(_decoder.raw_decode(buffer, auction_match.end())[0] or {})
+            except ValueError:
+                pass
+
+    position = match.end()
+    while True:
+        position = _whitespace.match(buffer, position).end()
+        if position >= len(buffer):
+            buffer = buffer[position:]
+            position = 0
+            if not read_more():
+                raise ValueError("Truncated liveLots array")
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            lot, end = _decoder.raw_decode(buffer, position)
+        except ValueError:
+            # The entry continues in the next chunk
+            buffer = buffer[position:]
+            position = 0
+            if not read_more():
+                raise
+            continue
+        yield lot
+        position = end
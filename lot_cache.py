@@ -0,0 +1,176 @@
+from snapshot import atomic_write, load_snapshot
+from collections import OrderedDict
+from metrics import register_stats
+from json_codec import dumps
+import threading
+import logging
+import atexit
+import time
+import os
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by the total byte size of its values, with a per-entry TTL.
+
+    Entries can optionally be persisted to a JSON file so a restarted process starts warm. Hit, miss,
+    eviction and expiry counters are kept for monitoring.
+
+    Args:
+        max_bytes (int, optional): Upper bound for the summed size of all cached values. Defaults to 32 MB.
+        ttl (float, optional): Seconds an entry stays valid. None keeps entries until evicted. Defaults to 30 days.
+        path (str, optional): JSON file the cache is loaded from on creation and written to by `save`. Defaults to None.
+
+    Example:
+        cache = LRUCache(max_bytes=8 * 1024 * 1024, path="cache/lot_descriptions.json")
+        cache.set(lot_id, description)
+        cache.get(lot_id)
+        cache.stats()  # {"hits": 1, "misses": 0, ...}
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=30 * 86400, path=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    def get(self, key, count=True):
+        """
+        Returns a cached value and marks it as most recently used.
+
+        Args:
+            key (str): The cache key.
+            count (bool, optional): Whether the lookup counts towards the hit/miss counters. Defaults to True.
+
+        Returns:
+            object or None: The cached value, or None if it is missing or expired.
+        """
+        key = str(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, stored_at=None):
+        """
+        Stores a value, evicting least recently used entries until the cache fits in `max_bytes`.
+
+        Args:
+            key (str): The cache key.
+            value (object): A JSON-serialisable value.
+            stored_at (float, optional): Unix timestamp the TTL counts from. Defaults to now.
+        """
+        key = str(key)
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, stored_at if stored_at is not None else time.time(), size)
+            self.size += size
+            while self.size > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit, miss, eviction and expiry counters plus the current number of entries and bytes.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self.entries),
+                "bytes": self.size
+            }
+
+    def save(self):
+        """
+        Writes the cache to `path`, oldest entry first, with `atomic_write` so a crash never leaves a truncated cache.
+        """
+        if not self.path:
+            return
+        with self.lock:
+            data = [[key, value, stored_at] for key, (value, stored_at, _) in self.entries.items()]
+        try:
+            atomic_write(self.path, dumps(data))
+        except OSError as e:
+            logging.error(f"Error saving cache to {self.path}: {e}")
+
+    def load(self):
+        """
+        Loads the entries saved in `path`, skipping those that have already expired.
+        """
+        try:
+            data = load_snapshot(self.path) or []
+        except (OSError, ValueError) as e:
+            logging.error(f"Error loading cache from {self.path}: {e}")
+            return
+        now = time.time()
+        for key, value, stored_at in data:
+            if self.ttl is None or now - stored_at <= self.ttl:
+                self.set(key, value, stored_at)
+
+    def _remove(self, key):
+        _, _, size = self.entries.pop(key)
+        self.size -= size
+
+
+def _size_of(value):
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return len(dumps(value))
+
+
+# Process-wide cache of lot descriptions used by `get_lot_description`. `persist_description_cache` makes it persistent.
+description_cache = LRUCache()
+register_stats("hibid_description_cache", description_cache.stats, "Counters of the lot description cache.")
+
+
+def persist_description_cache(path):
+    """
+    Makes the process-wide `description_cache` persistent: loads the descriptions saved in `path`, so a restarted
+    process does not fetch them again, and saves the cache there when the process exits.
+
+    Args:
+        path (str): JSON file of the cache, e.g. "cache/lot_descriptions.json".
+    """
+    first = description_cache.path is None
+    description_cache.path = path
+    if os.path.exists(path):
+        description_cache.load()
+        logging.info(f"Loaded {len(description_cache)} lot descriptions from {path}")
+    if first:
+        atexit.register(description_cache.save)
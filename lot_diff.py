@@ -0,0 +1,221 @@
+from collections import namedtuple
+import logging
+import time
+
+# Event kinds emitted by `LotDiffer`
+NEW_LOT = "new_lot"
+BID = "bid"
+EXTENSION = "extension"
+CLOSED = "closed"
+REMOVED = "removed"
+STATE = "state"
+AUCTION_FINISHED = "auction_finished"
+
+# Event kind emitted by `watchlist.Watchlist` when the rules a lot matches change
+WATCH_MATCH = "watch_match"
+
+# lotState fields whose changes are detected. timeLeftSeconds is deliberately absent since it changes on every
+# poll; extensions are detected separately by comparing it with the time left expected from the previous poll.
+DIFF_FIELDS = ("highBid", "bidCount", "status", "isClosed", "priceRealized", "reserveSatisfied", "biddingExtended")
+
+# Slack in seconds before an increase in timeLeftSeconds counts as a soft-close extension
+EXTENSION_TOLERANCE = 5
+
+ChangeEvent = namedtuple("ChangeEvent", ["kind", "auction_id", "item_id", "lot", "changes", "timestamp", "record"], defaults=(None,))
+ChangeEvent.__doc__ = """
+A typed change of one lot.
+
+Attributes:
+    kind (str): One of NEW_LOT, BID, EXTENSION, CLOSED, REMOVED, STATE, AUCTION_FINISHED or WATCH_MATCH.
+    auction_id (int): ID of the auction the lot belongs to.
+    item_id (int): The lot's itemId, or None for AUCTION_FINISHED.
+    lot (dict): The lot as received, or None for REMOVED and AUCTION_FINISHED.
+    changes (dict): Changed lotState field -> (old value, new value). Empty for NEW_LOT and REMOVED; for WATCH_MATCH,
+        "rules" -> (names of the previously matched rules, names of the matched rules).
+    timestamp (float): Poll time as a Unix timestamp.
+    record (Lot): The stored lot record after the merge, attached by `merge_live_catalog` before publishing. Unlike
+        `lot`, which may come from a trimmed "state-only" response, it has the descriptive fields such as lotNumber and lead.
+"""
+
+
+class EventBus:
+    """
+    Minimal synchronous publish/subscribe hub for `ChangeEvent`s.
+
+    Subscribers are called in the polling thread, so they must be cheap; anything slow should hand
+    the event off to its own queue.
+
+    Example:
+        bus = EventBus()
+        bus.subscribe(lambda event: print(event.item_id, event.changes), kind=BID)
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+
+    def subscribe(self, callback, kind=None):
+        """
+        Registers a callback for one event kind, or for every kind if `kind` is None.
+
+        Args:
+            callback (callable): Called with each matching `ChangeEvent`.
+            kind (str, optional): Event kind to subscribe to. Defaults to None (all kinds).
+        """
+        self.subscribers.setdefault(kind, []).append(callback)
+
+    def unsubscribe(self, callback, kind=None):
+        """
+        Removes a callback registered with `subscribe`.
+        """
+        callbacks = self.subscribers.get(kind, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, events):
+        """
+        Delivers events to their subscribers. A failing subscriber is logged and does not stop delivery.
+
+        Args:
+            events (list): `ChangeEvent`s to deliver.
+        """
+        catch_all = self.subscribers.get(None, ())
+        for event in events:
+            for callback in (*self.subscribers.get(event.kind, ()), *catch_all):
+                try:
+                    callback(event)
+                except Exception as e:
+                    logging.error(f"Error in {event.kind} event subscriber: {e}")
+
+
+class LotDiffer:
+    """
+    Field-level diff engine for the lots of one auction.
+
+    For every lot it keeps a tuple of the `DIFF_FIELDS` of its last lotState, so an unchanged lot costs a
+    single tuple comparison. Only lots whose tuple differs are compared field by field. The tuples are compared
+    rather than their hashes, which collide for ordinary values, e.g. hash((5, -1)) == hash((5, -2)).
+
+    Args:
+        auction_id (int): ID of the auction being diffed.
+        bus (EventBus, optional): Bus the events of every `diff` call are published to by `merge_live_catalog`.
+    """
+
+    def __init__(self, auction_id, bus=None):
+        self.auction_id = auction_id
+        self.bus = bus
+        self.states = {}
+        self.expected_close = {}
+        self.closed_at = {}
+        self.removed = set()
+
+    def seed(self, lots):
+        """
+        Records the current state of already stored lots without emitting events.
+
+        Args:
+            lots (dict): itemId -> lot, e.g. `auction_data["lots"]`.
+        """
+        for item_id, lot in lots.items():
+            self._remember(item_id, lot["lotState"])
+
+    def known(self, item_id):
+        """
+        Returns:
+            bool: True if the lot has been seen before.
+        """
+        return item_id in self.states
+
+    def diff(self, live_lots, timestamp=None, complete=True):
+        """
+        Compares incoming lots with the remembered state and returns their change events.
+
+        Args:
+            live_lots (list): The `liveLots` entries of a `LiveCatalogLots` response.
+            timestamp (float, optional): Poll time as a Unix timestamp. Defaults to now.
+            complete (bool, optional): Whether lots not present in `live_lots` should be reported as REMOVED. Defaults to True.
+
+        Returns:
+            list: `ChangeEvent`s, at most a few per lot.
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        auction_id = self.auction_id
+        events = []
+        seen = set()
+
+        for lot in live_lots:
+            item_id = lot["itemId"]
+            seen.add(item_id)
+            state = lot["lotState"]
+            old_state = self.states.get(item_id)
+
+            if old_state is None:
+                events.append(ChangeEvent(NEW_LOT, auction_id, item_id, lot, {}, timestamp))
+                self._remember(item_id, state, timestamp)
+                continue
+
+            self.removed.discard(item_id)
+            values = tuple(state.get(field) for field in DIFF_FIELDS)
+            expected = self.expected_close.get(item_id)
+            time_left = state.get("timeLeftSeconds")
+            extended = (
+                expected is not None and time_left is not None and time_left > 0
+                and timestamp + time_left > expected + EXTENSION_TOLERANCE
+            )
+
+            if values == old_state and not extended:
+                continue
+
+            changes = {}
+            for field, old_value, value in zip(DIFF_FIELDS, old_state, values):
+                if value != old_value:
+                    changes[field] = (old_value, value)
+            if extended:
+                changes["timeLeftSeconds"] = (int(expected - timestamp), time_left)
+
+            kinds = []
+            if "highBid" in changes or "bidCount" in changes:
+                kinds.append(BID)
+            if extended:
+                kinds.append(EXTENSION)
+            if "isClosed" in changes and state.get("isClosed"):
+                kinds.append(CLOSED)
+                self.closed_at[item_id] = timestamp
+            if not kinds and changes:
+                kinds.append(STATE)
+            for kind in kinds:
+                events.append(ChangeEvent(kind, auction_id, item_id, lot, changes, timestamp))
+
+            self._remember(item_id, state, timestamp)
+
+        if complete:
+            for item_id in self.states.keys() - seen - self.removed:
+                self.removed.add(item_id)
+                events.append(ChangeEvent(REMOVED, auction_id, item_id, None, {}, timestamp))
+
+        return events
+
+    def finish(self, timestamp=None):
+        """
+        Publishes an AUCTION_FINISHED event once the tracker has found the auction over.
+
+        Args:
+            timestamp (float, optional): Time the auction was found over. Defaults to now.
+
+        Returns:
+            ChangeEvent: The event.
+        """
+        event = ChangeEvent(AUCTION_FINISHED, self.auction_id, None, None, {}, timestamp if timestamp is not None else time.time())
+        if self.bus is not None:
+            self.bus.publish([event])
+        return event
+
+    def _remember(self, item_id, state, timestamp=None):
+        self.states[item_id] = tuple(state.get(field) for field in DIFF_FIELDS)
+        if timestamp is None:
+            # Stored timeLeftSeconds values are stale, so seeded lots get no expected close time
+            return
+        time_left = state.get("timeLeftSeconds")
+        if time_left is not None and time_left > 0:
+            self.expected_close[item_id] = timestamp + time_left
+        else:
+            self.expected_close.pop(item_id, None)
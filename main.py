@@ -1,42 +1,57 @@
-from graphql_queries import AuctionsByAuctioneerSearch, LiveCatalogLots, GetLotDetails
-import requests
-import logging
+from graphql_queries import AuctionsByAuctioneerSearch, LiveCatalogLotsProfiles, GetLotDescription
+from graphql_client import default_client, iter_content
+from scheduler import PollScheduler
+from delta_log import AuctionLog
+from lot_diff import LotDiffer, NEW_LOT, BID, REMOVED
+from lot_cache import description_cache, persist_description_cache
+from json_codec import loads, iter_live_lots
+from records import Lot, Auction
+from auction_archive import is_finished, export_auction
+from snapshot import load_auction_data, save_auction_data, TrackerState
+from metrics import json_decode_seconds, diff_seconds, save_seconds, lots_tracked, poll_lag_seconds, start_from_environment
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
 import logging
 import time
-import json
 import sys
 import os
 
 logging.basicConfig(filename='app.log', level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-def get_lot_description(lot_id):
+def get_lot_description(lot_id, client=None, cache=None, search_index=None):
     """
     Retrieves the description of a lot from a live auction using GraphQL.
 
     Args:
         lot_id (str or int): The ID of the auction lot to retrieve description for.
+        client (GraphQLClient, optional): Client used for the request. Defaults to the shared pooled client.
+        cache (LRUCache, optional): Cache of descriptions keyed by lot id. Defaults to the process-wide `description_cache`.
+        search_index (SearchIndex, optional): Full-text index the fetched description is stored in.
 
     Returns:
         str or "Error fetching lot description.": The description of the lot if the request was successful.
 
+    Notes:
+        - Descriptions do not change once published, so cached descriptions are returned without a request.
+        - The trimmed `GetLotDescription` query is used, with countAsView set to false.
     """
-    graphql_url = "https://hibid.com/graphql"
-
-    query = GetLotDetails
-    payload = {
-        "operationName": "GetLotDetails",
-        "query": query,
-        "variables": {
-            "lotId": lot_id
-        }
-    }
+    client = client or default_client
+    cache = cache if cache is not None else description_cache
 
-    response = requests.post(graphql_url, json=payload)
+    description = cache.get(lot_id)
+    if description is not None:
+        return description
+
+    response = client.post("GetLotDescription", GetLotDescription, {"lotId": lot_id, "countAsView": False})
 
     if response.status_code == 200:
-        result = response.json()
+        result = loads(response.content)
         description = result["data"]["lot"]["lot"]["description"]
+        if description is not None:
+            cache.set(lot_id, description)
+            if search_index is not None:
+                search_index.index_descriptions({lot_id: description})
         return description
     else:
         # Print an error message and return None in case of an error
@@ -44,6 +59,104 @@ def get_lot_description(lot_id):
         return "Error fetching lot description."
 
 
+def build_bulk_description_query(count):
+    """
+    Builds a GraphQL document that fetches the descriptions of `count` lots in one request.
+
+    Each lot is requested through its own aliased `lot(input: ...)` field, `l0` to `l<count - 1>`,
+    whose lot id is passed in the variable of the same name.
+
+    Args:
+        count (int): Number of lots in the batch.
+
+    Returns:
+        str: The GraphQL document, with operation name "BulkLotDescriptions".
+    """
+    variables = ", ".join(f"$l{i}: ID!" for i in range(count))
+    fields = "\n".join(
+        f"  l{i}: lot(input: $l{i}, countAsView: false) {{ lot {{ id itemId lead description __typename }} __typename }}"
+        for i in range(count)
+    )
+    return f"query BulkLotDescriptions({variables}) {{\n{fields}\n}}"
+
+
+def get_lot_descriptions(lot_ids, batch_size=50, max_workers=4, client=None, cache=None, search_index=None):
+    """
+    Retrieves the descriptions of many lots, packing each batch of lots into a single GraphQL request.
+
+    Args:
+        lot_ids (iterable): IDs of the lots to retrieve descriptions for.
+        batch_size (int, optional): Number of lots per request. Defaults to 50.
+        max_workers (int, optional): Number of batches fetched concurrently. Defaults to 4.
+        client (GraphQLClient, optional): Client used for the requests. Defaults to the shared pooled client.
+        cache (LRUCache, optional): Cache of descriptions keyed by lot id. Defaults to the process-wide `description_cache`.
+        search_index (SearchIndex, optional): Full-text index the fetched descriptions are stored in.
+
+    Returns:
+        tuple: (descriptions, errors) where `descriptions` maps each successfully fetched lot id to its description
+        and `errors` maps each failed lot id to an error message.
+
+    Notes:
+        - Cached descriptions are returned without a request, and fetched ones are added to the cache.
+        - A failed request fails every lot of its batch; GraphQL errors with a path fail only the lot they point to.
+    """
+    client = client or default_client
+    cache = cache if cache is not None else description_cache
+
+    descriptions = {}
+    missing = []
+    for lot_id in dict.fromkeys(lot_ids):
+        description = cache.get(lot_id)
+        if description is not None:
+            descriptions[lot_id] = description
+        else:
+            missing.append(lot_id)
+
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    errors = {}
+
+    def fetch_batch(batch):
+        variables = {f"l{i}": str(lot_id) for i, lot_id in enumerate(batch)}
+        try:
+            response = client.post("BulkLotDescriptions", build_bulk_description_query(len(batch)), variables)
+        except Exception as e:
+            return {}, {lot_id: f"Request failed: {e}" for lot_id in batch}
+        if response.status_code != 200:
+            return {}, {lot_id: f"Status code: {response.status_code}" for lot_id in batch}
+
+        result = loads(response.content)
+        data = result.get("data") or {}
+        batch_descriptions = {}
+        batch_errors = {}
+        for error in result.get("errors") or []:
+            path = error.get("path") or []
+            if path and path[0] in variables:
+                batch_errors[batch[int(path[0][1:])]] = error.get("message", "GraphQL error")
+        for i, lot_id in enumerate(batch):
+            if lot_id in batch_errors:
+                continue
+            lot = (data.get(f"l{i}") or {}).get("lot")
+            if lot is None:
+                batch_errors[lot_id] = "Lot not found"
+            else:
+                batch_descriptions[lot_id] = lot["description"]
+        return batch_descriptions, batch_errors
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch_descriptions, batch_errors in executor.map(fetch_batch, batches):
+            for lot_id, description in batch_descriptions.items():
+                if description is not None:
+                    cache.set(lot_id, description)
+            descriptions.update(batch_descriptions)
+            errors.update(batch_errors)
+            if search_index is not None and batch_descriptions:
+                search_index.index_descriptions(batch_descriptions)
+
+    if errors:
+        logging.warning(f"Failed to fetch descriptions for {len(errors)} of {len(missing)} lots")
+    return descriptions, errors
+
+
 def countdown(total_seconds):
 
     """
@@ -83,7 +196,7 @@ def countdown(total_seconds):
     print(" " * len(time_remaining), end="\r")
 
 
-def get_lots_from_live_auction(lot_id, get_time_left=False):
+def get_lots_from_live_auction(lot_id, get_time_left=False, client=None, profile="full"):
 
     """
     Retrieves lots from a live auction using GraphQL.
@@ -91,50 +204,45 @@ def get_lots_from_live_auction(lot_id, get_time_left=False):
     Args:
         lot_id (str): The ID of the auction to retrieve lots from.
         get_time_left (bool, optional): Whether to fetch and return the minimum time left for lots. Default is False.
+        client (GraphQLClient, optional): Client used for the request. Defaults to the shared pooled client.
+        profile (str, optional): Name of the query profile in `LiveCatalogLotsProfiles`. "full" returns every auction
+            and lot field, "state-only" returns only itemId and lotState for each lot. Default is "full".
 
     Returns:
         dict or int or None: If `get_time_left` is False, returns the GraphQL response as a dictionary.
-        If `get_time_left` is True, returns the minimum time left in seconds as an integer.
+        If `get_time_left` is True, returns the minimum time left in seconds as an integer, or 0 if no lot has time left.
         Returns None if there was an error in the request.
 
     """
-    graphql_url = "https://hibid.com/graphql"
-
-    query = LiveCatalogLots
-    payload = {
-        "operationName": "LiveCatalogLots",
-        "query": query,
-        "variables": {
-            "auctionId": lot_id
-        }
-    }
+    client = client or default_client
 
-    response = requests.post(graphql_url, json=payload)
-
-
-    if response.status_code == 200:
-        result = response.json()
+    response = client.post("LiveCatalogLots", LiveCatalogLotsProfiles[profile], {"auctionId": lot_id}, stream=get_time_left)
 
+    # A streamed response holds its connection until closed, whatever its status
+    with response:
+        if response.status_code != 200:
+            # Print an error message and return None in case of an error
+            logging.error(f"Error fetching lots from live auction. Status code: {response.status_code}")
+            return None
 
         if get_time_left:
-            # Extract the relevant data from the GraphQL response
-            lot = result["data"]["liveCatalogLots"]["liveLots"]
-            # Find the minimum time left among lots that have positive time left
-            min_time = min([i["lotState"]["timeLeftSeconds"] for i in lot if i["lotState"]["timeLeftSeconds"] > 0])
+            # Only the lot states are needed, so lots are parsed one at a time instead of building the whole response tree
+            time_left = [lot["lotState"]["timeLeftSeconds"] for lot in iter_live_lots(iter_content(response, "LiveCatalogLots"))]
+            # Find the minimum time left among lots that have positive time left; 0 if none has, e.g. no lots yet
+            min_time = min([seconds for seconds in time_left if seconds and seconds > 0], default=0)
             return int(min_time)
 
-        # print open lots
-        open_lots = result["data"]["liveCatalogLots"]["auction"]["auctionState"]["openLotCount"]
-        print(f"Open lots: {open_lots}")
-        # Return the entire GraphQL response
-        return result
-    else:
-        # Print an error message and return None in case of an error
-        logging.error(f"Error fetching lots from live auction. Status code: {response.status_code}")
-        return None
+        with json_decode_seconds.time(operation="LiveCatalogLots"):
+            result = loads(response.content)
+
+    # print open lots
+    open_lots = result["data"]["liveCatalogLots"]["auction"]["auctionState"]["openLotCount"]
+    print(f"Open lots: {open_lots}")
+    # Return the entire GraphQL response
+    return result
 
 
-def get_scheduled_auctions(auctioneer_id, closest_auction_only=True):
+def get_scheduled_auctions(auctioneer_id, closest_auction_only=True, client=None):
     """
     Retrieves scheduled auctions for a given auctioneer using GraphQL.
 
@@ -143,80 +251,169 @@ def get_scheduled_auctions(auctioneer_id, closest_auction_only=True):
         closest_auction_only (bool, optional): Whether to return information about the closest auction only.
             If True, returns a tuple containing the ID and name of the closest auctioneer.
             If False, returns the entire GraphQL response. Default is True.
+        client (GraphQLClient, optional): Client used for the request. Defaults to the shared pooled client.
 
     Returns:
         tuple or dict or None: If `closest_auction_only` is True, returns a tuple (auc_id, auctioneer_name).
         If `closest_auction_only` is False, returns the GraphQL response as a dictionary.
         Returns None if there was an error in the request.
 
+    Notes:
+        - The closest auction is the open auction that ends soonest, chosen across every page of results
+          by `select_auctions`.
     """
-    graphql_url = "https://hibid.com/graphql"
+    if closest_auction_only:
+        auctions = select_auctions(iter_auctions([auctioneer_id], client=client))
+        if not auctions:
+            logging.error(f"No open auctions found for auctioneer {auctioneer_id}")
+            return None
+        closest_auction = auctions[0]
+        return closest_auction["id"], closest_auction["auctioneer"]["name"]
 
-    # Replace "<>" with your actual GraphQL query
-    query = AuctionsByAuctioneerSearch
-    
-    payload = {
-        "operationName": "AuctionsByAuctioneerSearch",
-        "query": query,
-        "variables": {
-            "auctioneerId": auctioneer_id,
-            "pageLength": 25,
-            "pageNumber": 1,
-            "status": "OPEN"
-        }
-    }
+    return fetch_auction_page(auctioneer_id, 1, client=client)
+
+
+def fetch_auction_page(auctioneer_id, page_number, page_length=25, status="OPEN", client=None):
     """
-    Retrieves scheduled auctions for a given auctioneer using GraphQL.
+    Fetches one page of `AuctionsByAuctioneerSearch` results.
 
     Args:
-        auctioneer_id (str): The ID of the auctioneer to retrieve auctions for.
-        closest_auction_only (bool, optional): Whether to return information about the closest auction only.
-            If True, returns a tuple containing the ID and name of the closest auctioneer.
-            If False, returns the entire GraphQL response. Default is True.
+        auctioneer_id (str or int): The ID of the auctioneer to retrieve auctions for.
+        page_number (int): Page to fetch, starting at 1.
+        page_length (int, optional): Number of auctions per page. Defaults to 25.
+        status (str, optional): Auction status filter. Defaults to "OPEN".
+        client (GraphQLClient, optional): Client used for the request. Defaults to the shared pooled client.
 
     Returns:
-        tuple or dict or None: If `closest_auction_only` is True, returns a tuple (auc_id, auctioneer_name).
-        If `closest_auction_only` is False, returns the GraphQL response as a dictionary.
-        Returns None if there was an error in the request.
-
+        dict or None: The GraphQL response, or None if there was an error in the request.
     """
-    graphql_url = "https://hibid.com/graphql"
+    client = client or default_client
 
-    # Replace "<>" with your actual GraphQL query
-    query = AuctionsByAuctioneerSearch
-    
-    payload = {
-        "operationName": "AuctionsByAuctioneerSearch",
-        "query": query,
-        "variables": {
-            "auctioneerId": auctioneer_id,
-            "pageLength": 25,
-            "pageNumber": 1,
-            "status": "OPEN"
-        }
+    variables = {
+        "auctioneerId": auctioneer_id,
+        "pageLength": page_length,
+        "pageNumber": page_number,
+        "status": status
     }
 
-    response = requests.post(graphql_url, json=payload)
+    response = client.post("AuctionsByAuctioneerSearch", AuctionsByAuctioneerSearch, variables)
 
     if response.status_code == 200:
-        result = response.json()
-
-        if closest_auction_only:
-            # Extract information about the closest auction
-            closest_auction = result["data"]["auctionSearch"]["pagedResults"]["results"][0]["auction"]
-            auc_id = closest_auction["id"]
-            auctioneer_name = closest_auction["auctioneer"]["name"]
-            return auc_id, auctioneer_name
-        else:
-            # Return the entire GraphQL response
-            return result
+        with json_decode_seconds.time(operation="AuctionsByAuctioneerSearch"):
+            return loads(response.content)
     else:
         # Print an error message and return None in case of an error
         logging.error(f"Error fetching scheduled auctions. Status code: {response.status_code}")
         return None
+
+
+def iter_auctions(auctioneer_ids, page_length=25, status="OPEN", max_workers=4, client=None):
+    """
+    Streams every auction of every given auctioneer, across all pages of `AuctionsByAuctioneerSearch`.
+
+    The first page of every auctioneer is requested concurrently. As soon as a first page reports its
+    `totalCount`, the remaining pages of that auctioneer are requested concurrently as well.
+
+    Args:
+        auctioneer_ids (iterable): IDs of the auctioneers on the watch list.
+        page_length (int, optional): Number of auctions per page. Defaults to 25.
+        status (str, optional): Auction status filter. Defaults to "OPEN".
+        max_workers (int, optional): Number of pages fetched concurrently. Defaults to 4.
+        client (GraphQLClient, optional): Client used for the requests. Defaults to the shared pooled client.
+
+    Yields:
+        dict: The `auction` object of each search result, in the order pages arrive.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(fetch_auction_page, auctioneer_id, 1, page_length, status, client): (auctioneer_id, 1)
+            for auctioneer_id in dict.fromkeys(auctioneer_ids)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                auctioneer_id, page_number = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"Error fetching page {page_number} of auctioneer {auctioneer_id}: {e}")
+                    continue
+                if not result:
+                    continue
+
+                paged_results = result["data"]["auctionSearch"]["pagedResults"]
+                if page_number == 1:
+                    total_count = paged_results.get("totalCount") or 0
+                    for next_page in range(2, -(-total_count // page_length) + 1):
+                        future = executor.submit(fetch_auction_page, auctioneer_id, next_page, page_length, status, client)
+                        pending[future] = (auctioneer_id, next_page)
+
+                for search_result in paged_results["results"]:
+                    yield search_result["auction"]
+
+
+def parse_event_date(value):
+    """
+    Parses an `eventDateBegin`/`eventDateEnd` value into an aware UTC datetime.
+
+    Args:
+        value (str): ISO 8601 date string, with or without a trailing "Z" or offset.
+
+    Returns:
+        datetime or None: The parsed datetime, or None if the value is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def select_auctions(auctions, now=None, starts_before=None):
+    """
+    Selects auctions that have not ended yet, ordered by their real end time.
+
+    Args:
+        auctions (iterable): Auction objects as yielded by `iter_auctions`.
+        now (datetime, optional): Reference time. Defaults to the current UTC time.
+        starts_before (datetime, optional): Only keep auctions that start before this time.
+
+    Returns:
+        list: The matching auctions, soonest ending first. Auctions without a parsable end date come last.
+    """
+    now = now or datetime.now(timezone.utc)
+    selected = []
+    for auction in auctions:
+        begin = parse_event_date(auction.get("eventDateBegin"))
+        end = parse_event_date(auction.get("eventDateEnd"))
+        if end is not None and end < now:
+            continue
+        if starts_before is not None and begin is not None and begin > starts_before:
+            continue
+        selected.append((end is None, end or now, auction))
+    selected.sort(key=lambda item: (item[0], item[1]))
+    return [auction for _, _, auction in selected]
   
 
-def update_auction_data(lot_id, auction_data, item_ids):
+# auction id -> (auction_data, LotDiffer) for callers of `update_auction_data` that do not keep a differ themselves
+_differs = {}
+
+
+def _differ_for(lot_id, auction_data):
+    # The differ is reused while the caller keeps updating the same auction_data, so it is seeded only once
+    entry = _differs.get(lot_id)
+    if entry is None or entry[0] is not auction_data:
+        differ = LotDiffer(lot_id)
+        differ.seed(auction_data["lots"])
+        entry = _differs[lot_id] = (auction_data, differ)
+    return entry[1]
+
+
+def update_auction_data(lot_id, auction_data, item_ids, scheduler=None, profile="full", unknown_ids=None, events=None, differ=None, client=None, watchlist=None):
     """
     Updates the provided auction data based on live lots fetched from a live auction.
     
@@ -224,39 +421,151 @@ def update_auction_data(lot_id, auction_data, item_ids):
         lot_id (str or int): The ID of the auction lot to fetch data for.
         auction_data (dict): The existing auction data to be updated. Should have keys "auction" and "lots".
         item_ids (set): A set containing the IDs of items already recorded in auction_data. This set will be updated with new item IDs if they are found.
+        scheduler (PollScheduler, optional): Scheduler to feed with the lot states of this poll.
+        profile (str, optional): Query profile to poll with, see `get_lots_from_live_auction`. Default is "full".
+        unknown_ids (set, optional): With the "state-only" profile, collects the IDs of lots that are not yet recorded
+            and therefore need a "full" poll.
+        events (list, optional): Collects the change events of this poll, see `merge_live_catalog`.
+        differ (LotDiffer, optional): Diff engine that remembers the lot states of this auction across polls. Defaults to
+            one kept per auction by this module, seeded from auction_data on the first call and dropped once the auction
+            is over.
+        client (GraphQLClient, optional): Client used for the request. Defaults to the shared pooled client.
+        watchlist (Watchlist, optional): Rules every incoming lot is checked against, see `merge_live_catalog`.
     
     Returns:
         bool: True if live auction data was successfully fetched and processed, False otherwise.
     
     Notes:
         - The function fetches the live auction data using the `get_lots_from_live_auction` function.
-        - New lots are added to the auction_data's "lots" dictionary and their IDs are added to the item_ids set.
-        - For lots already present in auction_data, their high bid information is updated if it has changed.
-        - If there's a new high bid for a lot, a message will be printed to the console.
+        - New lots are added to the auction_data's "lots" dictionary as `Lot` records and their IDs are added to the item_ids set.
+        - For lots already present in auction_data, their lotState is updated if any field diffed by `LotDiffer` changed.
+        - If there's a new high bid for a lot, a message will be written to the log.
     """
-    data = get_lots_from_live_auction(lot_id)
+    data = get_lots_from_live_auction(lot_id, client=client, profile=profile)
     
     if not data:
+        if scheduler:
+            scheduler.failed()
         return False
 
-    auction_data["auction"] = data["data"]["liveCatalogLots"]["auction"]
+    kept = differ is None
+    if kept:
+        differ = _differ_for(lot_id, auction_data)
+    with diff_seconds.time():
+        changed_lots = merge_live_catalog(auction_data, data, item_ids, profile=profile, unknown_ids=unknown_ids, events=events, differ=differ, watchlist=watchlist)
+    if kept and is_finished(auction_data):
+        _differs.pop(lot_id, None)
+    lots_tracked.set(len(auction_data["lots"]), auction=lot_id)
+    if scheduler:
+        scheduler.observe(data["data"]["liveCatalogLots"]["liveLots"], changed_lots)
+    return True
+
+
+def merge_live_catalog(auction_data, data, item_ids, profile="full", unknown_ids=None, events=None, differ=None, watchlist=None):
+    """
+    Merges a `LiveCatalogLots` GraphQL response into the stored auction data.
+
+    Args:
+        auction_data (dict): The existing auction data to be updated. Should have keys "auction" and "lots".
+        data (dict): The GraphQL response returned by `get_lots_from_live_auction`.
+        item_ids (set): A set containing the IDs of items already recorded in auction_data. Updated in place.
+        profile (str, optional): Query profile the response was fetched with. Default is "full".
+        unknown_ids (set, optional): With the "state-only" profile, collects the IDs of lots that are not yet recorded.
+            Those lots are skipped, since the trimmed response lacks their descriptive fields.
+        events (list, optional): Collects one event dict per change, in the format written by `AuctionLog`:
+            "auction" or "auctionState" for auction updates, "lot" for new lots and "state" for lotState changes.
+        differ (LotDiffer, optional): Diff engine holding the remembered state of this auction's lots. Its typed
+            change events are published to its bus, if it has one. Without it, a temporary differ is seeded from
+            auction_data, which costs a pass over every stored lot and never reports EXTENSION events; pollers should
+            keep one differ per auction, as `update_auction_data` does.
+        watchlist (Watchlist, optional): Rules every incoming lot is checked against once it is merged. Lots whose
+            matched rules changed are logged and published to the differ's bus as WATCH_MATCH events.
+
+    Returns:
+        int: The number of lots that were added or had a lotState change.
+
+    Notes:
+        - This is the network-free half of `update_auction_data`, shared by the synchronous tracker and the asyncio engine.
+    """
+    auction = data["data"]["liveCatalogLots"]["auction"]
+    if profile == "full":
+        if events is not None and auction != auction_data["auction"]:
+            events.append({"type": "auction", "auction": auction})
+        auction_data["auction"] = Auction.from_dict(auction)
+    else:
+        auction_state = {**auction_data["auction"].get("auctionState", {}), **auction["auctionState"]}
+        if events is not None and auction_state != auction_data["auction"].get("auctionState"):
+            events.append({"type": "auctionState", "auctionState": auction["auctionState"]})
+        auction_data["auction"]["auctionState"] = auction_state
     live_lots = data["data"]["liveCatalogLots"]["liveLots"]
 
-    for lot in live_lots:
-        lot_id = lot["itemId"]
-        if lot_id not in item_ids:
-            auction_data["lots"][lot_id] = lot
+    if differ is None:
+        differ = LotDiffer(auction.get("id"))
+        differ.seed(auction_data["lots"])
+
+    if profile != "full":
+        # Lots missing from the store cannot be added from a trimmed response; leave them for the next full poll
+        unrecorded = [lot["itemId"] for lot in live_lots if lot["itemId"] not in item_ids]
+        if unrecorded:
+            if unknown_ids is not None:
+                unknown_ids.update(unrecorded)
+            live_lots = [lot for lot in live_lots if lot["itemId"] in item_ids]
+
+    change_events = differ.diff(live_lots)
+    changed_ids = set()
+
+    for change in change_events:
+        lot_id = change.item_id
+        if change.kind == REMOVED or lot_id in changed_ids:
+            continue
+        changed_ids.add(lot_id)
+        lot = change.lot
+        if change.kind == NEW_LOT:
+            auction_data["lots"][lot_id] = Lot.from_dict(lot)
             item_ids.add(lot_id)
+            if events is not None:
+                events.append({"type": "lot", "lot": lot})
         else:
-            stored_lot = auction_data["lots"][lot_id]
-            if stored_lot["lotState"]["highBid"] != lot["lotState"]["highBid"]:
-                stored_lot["lotState"] = lot["lotState"]
+            # Merge rather than replace so fields missing from a trimmed profile are kept
+            auction_data["lots"][lot_id]["lotState"].update(lot["lotState"])
+            if events is not None:
+                events.append({"type": "state", "itemId": lot_id, "lotState": lot["lotState"]})
+            if change.kind == BID:
                 logging.info(f"Lot {lot_id} has a new high bid: {lot['lotState']['highBid']}")
 
-    return True
+    if watchlist is not None:
+        change_events.extend(watchlist.evaluate(differ.auction_id, live_lots, auction_data["lots"]))
+
+    if differ.bus is not None:
+        stored_lots = auction_data["lots"]
+        differ.bus.publish([
+            change._replace(record=stored_lots.get(change.item_id)) if change.item_id is not None else change
+            for change in change_events
+        ])
+
+    return len(changed_ids)
+
+
+def select_profile(auction_data, unknown_ids, loop_count, full_refresh_interval=60):
+    """
+    Chooses the `LiveCatalogLots` query profile for the next poll of an auction.
 
+    Args:
+        auction_data (dict): The stored auction data.
+        unknown_ids (set): IDs of lots seen by the last "state-only" poll that are not recorded yet.
+        loop_count (int): Number of the upcoming poll, starting at 1.
+        full_refresh_interval (int, optional): Number of polls between "full" polls. Defaults to 60.
+
+    Returns:
+        str: "full" if the auction has not been fetched in full yet, new lots appeared, or a periodic refresh is due;
+        "state-only" otherwise.
+    """
+    if not auction_data["auction"] or unknown_ids or loop_count % full_refresh_interval == 0:
+        return "full"
+    return "state-only"
 
-def track_and_update_data(lot_id, file_name, sleep_time=60, max_retries=3, save_interval=15):
+
+def track_and_update_data(lot_id, file_name, sleep_time=60, max_retries=3, save_interval=15, adaptive=True, full_refresh_interval=60, history=None, database=None, bus=None, archive_directory="archive", stop_event=None, state=None, watchlist=None, search_index=None):
     """
     Continuously tracks and updates auction data, saving to a JSON file.
     
@@ -265,73 +574,168 @@ def track_and_update_data(lot_id, file_name, sleep_time=60, max_retries=3, save_
         file_name (str): Name of the file to which the auction data will be saved.
         sleep_time (int, optional): Time interval (in seconds) between successive data fetches. Defaults to 60 seconds.
         max_retries (int, optional): Maximum number of consecutive failed data fetch attempts before stopping. Defaults to 3.
+        save_interval (int, optional): Number of polls between compactions of the change log into the JSON file. Defaults to 15.
+        adaptive (bool, optional): Whether to schedule polls with a `PollScheduler` instead of a fixed sleep_time. Defaults to True.
+        full_refresh_interval (int, optional): Number of polls between "full" profile polls. Defaults to 60.
+        history (BidHistory, optional): Time series store that records every lot state change of this auction.
+        database (AuctionDatabase, optional): SQLite backend that receives the changes of every poll in one transaction.
+        bus (EventBus, optional): Bus the typed lot change events of every poll are published to.
+        archive_directory (str, optional): Directory the auction is exported to as a columnar file once it is over,
+            see `auction_archive.export_auction`. None disables the export. Defaults to "archive".
+        stop_event (threading.Event, optional): Stops tracking when set, e.g. by a `supervisor` worker handing the
+            auction to another process. Polls then wait on the event instead of printing a countdown.
+        state (TrackerState, optional): Persistent tracker state the auction, its poll times and schedule are recorded in.
+            A schedule saved by an earlier run is restored, and the auction is forgotten once tracking ends for good.
+        watchlist (Watchlist, optional): Rules every incoming lot is checked against on every poll.
+        search_index (SearchIndex, optional): Full-text index new lots and their status changes are written to after every poll.
+
+    Returns:
+        bool: True if tracking stopped because the auction is over.
 
     Notes:
         - The function fetches live auction data using the `update_auction_data` function.
-        - If data fetching fails, the function will retry up to max_retries times before stopping.
-        - After each data update, the function will pause for the duration specified by sleep_time.
+        - Requests are rate limited and retried with backoff by the GraphQL client. A poll that still fails, whether it
+          returned no data or raised, counts toward max_retries; the function stops after more than max_retries
+          consecutive failed polls.
+        - After each data update, the function will pause for the duration specified by sleep_time, or, when adaptive,
+          for the delay computed by the scheduler: fast inside a lot's closing window, backing off while lots are idle.
+        - The first poll, polls that follow the appearance of unrecorded lots and every full_refresh_interval-th poll use
+          the "full" query profile; all others use the much smaller "state-only" profile.
+        - The changes of every poll are appended and fsynced to an `AuctionLog` next to the JSON file, which is
+          rewritten only on compaction. On startup the data is rebuilt from the JSON file plus a replay of the log.
         - The function logs any errors encountered during data fetching or file saving.
+        - Save time, lots tracked and the lag of each poll behind its scheduled time are recorded in `metrics`.
+        - Tracking stops once every lot is closed. The data is then compacted into the JSON file and exported to archive_directory.
     """
     num_tries = 0
     loop_count = 0
     file_path = os.path.join("auctions", file_name)
+    scheduler = PollScheduler(base_interval=sleep_time) if adaptive else None
+    if state is not None:
+        saved = state.get(lot_id)
+        if saved and saved.get("schedule") and scheduler:
+            scheduler.restore(saved["schedule"])
+        state.track(lot_id, file_name)
 
     # Load existing data if file exists, else initialize
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            auction_data = json.load(f)
-    else:
-        auction_data = {
-            "auction": {},
-            "lots": {}
-        }
-
-    while True:
+    auction_log = AuctionLog(file_path, compact_every=save_interval)
+    auction_data = auction_log.load()
+
+    item_ids = set(auction_data["lots"].keys())
+    unknown_ids = set()
+    differ = LotDiffer(lot_id, bus)
+    differ.seed(auction_data["lots"])
+    scheduled_at = None
+
+    while stop_event is None or not stop_event.is_set():
+        if scheduled_at is not None:
+            poll_lag_seconds.observe(max(0.0, time.time() - scheduled_at))
         loop_count += 1
-        item_ids = set(auction_data["lots"].keys())
+        profile = select_profile(auction_data, unknown_ids, loop_count, full_refresh_interval)
+        unknown_ids.clear()
+        events = []
         try:
-            success = update_auction_data(lot_id, auction_data, item_ids)
-            if not success:
-                num_tries += 1
-                logging.warning(f"Failed to fetch data. Retry {num_tries} of {max_retries}")
-                print(f"Failed to fetch data. Retry {num_tries} of {max_retries}")
-                if num_tries > max_retries:
-                    break
+            success = update_auction_data(lot_id, auction_data, item_ids, scheduler=scheduler, profile=profile, unknown_ids=unknown_ids, events=events, differ=differ, watchlist=watchlist)
         except Exception as e:
+            # Raised errors (e.g. a connection error that outlasted the client's retries) count as failed polls too
             logging.error(f"Error fetching data: {e}")
+            if scheduler:
+                scheduler.failed()
+            success = False
+
+        if success:
+            num_tries = 0
+        else:
+            num_tries += 1
+            logging.warning(f"Failed to fetch data. Retry {num_tries} of {max_retries}")
+            print(f"Failed to fetch data. Retry {num_tries} of {max_retries}")
+            if num_tries > max_retries:
+                break
 
-        # Save to json file every save_interval iterations
-        if loop_count % save_interval == 0:
-            try:
-                with open(file_path, "w") as f:
-                    json.dump(auction_data, f, indent=4, sort_keys=True)
-            except Exception as e:
-                logging.error(f"Error saving to file: {e}")
+        # Append this poll's changes to the log, compacting into the json file every save_interval polls
+        try:
+            with save_seconds.time(kind="poll"):
+                auction_log.commit(auction_data, events)
+                if history is not None:
+                    history.record_events(lot_id, events)
+                    history.flush()
+                if database is not None:
+                    database.record_poll(lot_id, auction_data, events)
+                if search_index is not None:
+                    search_index.record_poll(lot_id, auction_data, events)
+        except Exception as e:
+            logging.error(f"Error saving to file: {e}")
+
+        if success and is_finished(auction_data):
+            logging.info(f"Auction {lot_id} is over")
+            differ.finish()
+            if watchlist is not None:
+                watchlist.forget(lot_id)
+            break
         
-        countdown(sleep_time)
+        delay = scheduler.next_delay() if scheduler else sleep_time
+        scheduled_at = time.time() + delay
+        if state is not None:
+            state.update(lot_id, time.time(), scheduled_at, scheduler.state() if scheduler else None)
+        if stop_event is not None:
+            stop_event.wait(delay)
+        else:
+            countdown(delay)
 
+    try:
+        with save_seconds.time(kind="compact"):
+            auction_log.compact(auction_data)
+    except Exception as e:
+        logging.error(f"Error saving to file: {e}")
+    finished = is_finished(auction_data)
+    if archive_directory is not None and finished:
+        try:
+            export_auction(auction_data, archive_directory, differ.closed_at)
+        except Exception as e:
+            logging.error(f"Error archiving auction {lot_id}: {e}")
+    lots_tracked.remove(auction=lot_id)
+    # A stopped auction is handed on or resumed later; one that is over or failed for good is forgotten
+    if state is not None:
+        if stop_event is not None and stop_event.is_set():
+            state.save()
+        else:
+            state.remove(lot_id)
+    return finished
 
-def main(auctioneer_id):
+
+def main(auctioneer_id, state_path=None):
     """
     Main entry point for the auction tracking application. Continuously tracks scheduled auctions based on an auctioneer ID.
     
     Args:
         auctioneer_id (str or int): ID of the auctioneer whose auctions are to be tracked.
+        state_path (str, optional): Path of the persistent tracker state. Defaults to "auctions/tracker_state_<auctioneer_id>.json".
     
     Notes:
         - Uses the `get_scheduled_auctions` function to fetch details of the next scheduled auction.
         - Waits until the start of the auction, then begins tracking and updating data using `track_and_update_data`.
+        - The followed auction is recorded in a `TrackerState`. After a restart it is resumed right away, without
+          re-discovering it or waiting for the countdown.
         - If any errors are encountered, logs the error and pauses for 60 seconds before retrying.
     """
+    state = TrackerState(state_path or os.path.join("auctions", f"tracker_state_{auctioneer_id}.json"))
     while True:
         try:
+            resumed = state.items()
+            if resumed:
+                auc_id, entry = resumed[0]
+                logging.info(f"Resuming auction {auc_id}, last polled at {entry.get('last_poll')}")
+                track_and_update_data(auc_id, entry["file_name"], sleep_time=60, state=state)
+                continue
+
             auc_id, auctioneer_name = get_scheduled_auctions(auctioneer_id, closest_auction_only=True)
             auctioneer_name = auctioneer_name.replace(" ", "_")
-            time_to_auction = get_lots_from_live_auction(auc_id, get_time_left=True)
+            time_to_auction = get_lots_from_live_auction(auc_id, get_time_left=True, profile="state-only")
             file_name = f"{auctioneer_name}_{auc_id}.json"
+            state.track(auc_id, file_name)
             logging.info(f"Tracking auction {auc_id} from {auctioneer_name} in:")
             countdown(int(time_to_auction) - 60 if time_to_auction > 60 else time_to_auction)
-            track_and_update_data(auc_id, file_name, sleep_time=60)
+            track_and_update_data(auc_id, file_name, sleep_time=60, state=state)
         except Exception as e:
             logging.error(e)
             time.sleep(60)
@@ -340,13 +744,30 @@ def main(auctioneer_id):
   
 if __name__ == "__main__":
     args = sys.argv[1:]
+    workers = None
+    description_cache_path = None
+    while args[:1] in (["--workers"], ["--description-cache"]) and len(args) > 1:
+        if args[0] == "--workers":
+            # Supervisor mode: the auctions are sharded across this many worker processes, see `supervisor`
+            workers = args[1]
+        else:
+            # Keeps fetched lot descriptions across restarts
+            description_cache_path = args[1]
+        args = args[2:]
     if len(args) != 1:
-        logging.error("Usage: python script_name.py <auctioneer_id>")
+        logging.error("Usage: python script_name.py [--workers N] [--description-cache PATH] <auctioneer_id>")
         sys.exit(1)
 
     try:
         auctioneer_id = int(args[0])
-        main(auctioneer_id)
+        if description_cache_path:
+            persist_description_cache(description_cache_path)
+        start_from_environment()
+        if workers is not None:
+            import supervisor
+            supervisor.main([auctioneer_id], int(workers))
+        else:
+            main(auctioneer_id)
     except ValueError:
         logging.error("Please provide a valid integer for the auctioneer_id.")
         sys.exit(1)
@@ -0,0 +1,393 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import contextmanager
+from bisect import bisect_left
+import threading
+import logging
+import time
+import os
+
+# Upper bounds in seconds of the default histogram buckets, from sub-millisecond hot-path timings up to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def samples(self, remote=()):
+        return [(self.name, key, value) for key, value in self.merged(remote).items()]
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Label values -> value, a copy that can be sent to another process.
+        """
+        with self.lock:
+            return {key: self._copy(value) for key, value in self.values.items()}
+
+    def merged(self, remote=()):
+        """
+        Returns:
+            dict: Label values -> this process's value plus the values of the same metric in `remote` snapshots.
+        """
+        values = self.snapshot()
+        for snapshot in remote:
+            for key, value in snapshot.items():
+                values[key] = self._add(values[key], value) if key in values else self._copy(value)
+        return values
+
+    def _copy(self, value):
+        return value
+
+    def _add(self, value, other):
+        return value + other
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, optionally split by label values.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, optionally split by label values.
+    """
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def remove(self, **labels):
+        with self.lock:
+            self.values.pop(self._key(labels), None)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, optionally split by label values.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # One slot per bucket plus +Inf, then the running sum
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the wall time spent in the `with` block.
+
+        Example:
+            with diff_seconds.time():
+                events = differ.diff(live_lots)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self, remote=()):
+        samples = []
+        for key, counts in self.merged(remote).items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", key + (_format_value(bound),), cumulative))
+            samples.append((self.name + "_count", key, cumulative))
+            samples.append((self.name + "_sum", key, counts[-1]))
+        return samples
+
+    def _copy(self, counts):
+        return list(counts)
+
+    def _add(self, counts, other):
+        return [count + other_count for count, other_count in zip(counts, other)]
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+
+    Besides its own metrics the registry calls every registered collector on each render, which lets
+    objects that already keep counters (rate limiter, retry policy, caches) be exported without
+    touching their hot paths.
+
+    Metrics recorded in other processes, e.g. `supervisor` workers, are exported by sending their `snapshot`
+    to the process serving the metrics and passing it to `merge` there. Counters, gauges, histograms and
+    collector values of the same name and labels are summed across processes.
+
+    Example:
+        registry = MetricsRegistry()
+        requests_total = registry.counter("requests_total", "Requests sent.", ["operation"])
+        requests_total.inc(operation="LiveCatalogLots")
+        registry.serve(9108)
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.remote = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def register_collector(self, collector):
+        """
+        Registers a callable that returns extra samples at render time.
+
+        Args:
+            collector (callable): Returns a list of (name, kind, documentation, value) tuples.
+        """
+        with self.lock:
+            self.collectors.append(collector)
+
+    def snapshot(self):
+        """
+        Returns the values of this process's metrics and collectors, to be merged into another process's registry.
+
+        Returns:
+            dict: {"metrics": {name: {label values: value}}, "collected": [(name, kind, documentation, value), ...]}
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {"metrics": {metric.name: metric.snapshot() for metric in metrics}, "collected": self._collect()}
+
+    def merge(self, source, snapshot):
+        """
+        Adds the latest snapshot of another process to every render, replacing its previous one.
+
+        Args:
+            source (str): Name of the process, e.g. a worker name.
+            snapshot (dict): Its registry's `snapshot`.
+        """
+        with self.lock:
+            self.remote[source] = snapshot
+
+    def retire(self, source):
+        """
+        Keeps the counters and histograms of a process that has exited, so totals do not drop, but drops its gauges.
+
+        Args:
+            source (str): Name the process's snapshots were merged under.
+        """
+        with self.lock:
+            snapshot = self.remote.get(source)
+            if snapshot is not None:
+                metrics = {name: values for name, values in snapshot["metrics"].items()
+                           if name not in self.metrics or self.metrics[name].kind != "gauge"}
+                self.remote[source] = {"metrics": metrics, "collected": snapshot["collected"]}
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format, including those merged from other processes.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+            remote = list(self.remote.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            label_names = metric.labels + ("le",) if metric.kind == "histogram" else metric.labels
+            remote_values = [snapshot["metrics"][metric.name] for snapshot in remote if metric.name in snapshot["metrics"]]
+            for name, key, value in metric.samples(remote_values):
+                lines.append(f"{name}{_format_labels(label_names, key)} {_format_value(value)}")
+        collected = {}
+        for samples in [self._collect()] + [snapshot["collected"] for snapshot in remote]:
+            for name, kind, documentation, value in samples:
+                if name in collected:
+                    collected[name] = (kind, documentation, collected[name][2] + value)
+                else:
+                    collected[name] = (kind, documentation, value)
+        for name, (kind, documentation, value) in collected.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _collect(self):
+        with self.lock:
+            collectors = list(self.collectors)
+        samples = []
+        for collector in collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                logging.error(f"Error in metrics collector: {e}")
+        return samples
+
+    def dump(self, path):
+        """
+        Writes the rendered metrics to a file via a temporary file, so readers never see a partial dump.
+
+        Args:
+            path (str): Path of the metrics file, e.g. for node_exporter's textfile collector.
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """
+        Serves the metrics on http://<host>:<port>/metrics from a daemon thread.
+
+        Args:
+            port (int, optional): Port to listen on. Defaults to 9108.
+            host (str, optional): Address to bind. Defaults to localhost only.
+
+        Returns:
+            ThreadingHTTPServer: The running server; call `shutdown` on it to stop serving.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        logging.info(f"Serving metrics on http://{host}:{self.server.server_port}/metrics")
+        return self.server
+
+    def dump_periodically(self, path, interval=15):
+        """
+        Dumps the metrics to a file every `interval` seconds from a daemon thread.
+
+        Args:
+            path (str): Path of the metrics file.
+            interval (float, optional): Seconds between dumps. Defaults to 15.
+        """
+        def loop():
+            while True:
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    logging.error(f"Error dumping metrics to {path}: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name="metrics-dump", daemon=True).start()
+
+    def _register(self, cls, name, documentation, labels, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, labels, **kwargs)
+            return metric
+
+
+def _format_labels(names, values):
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def register_stats(prefix, stats, documentation):
+    """
+    Exports the counters of an object with a `stats()` method, e.g. a RateLimiter, RetryPolicy or LRUCache.
+
+    Args:
+        prefix (str): Metric name prefix; each stats key becomes `<prefix>_<key>`.
+        stats (callable): Returns a dict of numeric values.
+        documentation (str): Help text shared by the exported values.
+    """
+    registry.register_collector(
+        lambda: [(f"{prefix}_{key}", "untyped", documentation, value) for key, value in stats().items()])
+
+
+def start_from_environment():
+    """
+    Starts the metrics endpoint and/or file dump configured by environment variables.
+
+    Notes:
+        - HIBID_METRICS_PORT: port of the local /metrics endpoint; unset disables it.
+        - HIBID_METRICS_FILE: file the metrics are dumped to every HIBID_METRICS_INTERVAL seconds (default 15).
+    """
+    port = os.environ.get("HIBID_METRICS_PORT")
+    if port:
+        registry.serve(int(port))
+    path = os.environ.get("HIBID_METRICS_FILE")
+    if path:
+        registry.dump_periodically(path, float(os.environ.get("HIBID_METRICS_INTERVAL", 15)))
+
+
+# Process-wide registry and the metrics recorded by the tracker's hot paths
+registry = MetricsRegistry()
+
+request_seconds = registry.histogram(
+    "hibid_graphql_request_seconds", "Latency of GraphQL requests, including the response download.", ["operation", "status"])
+response_bytes = registry.counter(
+    "hibid_graphql_response_bytes_total", "Decoded bytes downloaded from the GraphQL endpoint.", ["operation"])
+json_decode_seconds = registry.histogram(
+    "hibid_json_decode_seconds", "Time spent decoding GraphQL responses.", ["operation"])
+diff_seconds = registry.histogram(
+    "hibid_diff_seconds", "Time spent diffing and merging a LiveCatalogLots response into the stored data.")
+save_seconds = registry.histogram(
+    "hibid_save_seconds", "Time spent persisting one poll or compaction.", ["kind"])
+lots_tracked = registry.gauge(
+    "hibid_lots_tracked", "Number of lots stored per tracked auction.", ["auction"])
+poll_lag_seconds = registry.histogram(
+    "hibid_poll_lag_seconds", "Delay between a poll's scheduled time and its actual start.")
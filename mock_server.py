@@ -0,0 +1,286 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta, timezone
+import threading
+import logging
+import random
+import json
+import time
+
+
+class SyntheticAuction:
+    """
+    Synthetic live auction whose lots change a little on every `LiveCatalogLots` request.
+
+    Args:
+        auction_id (int): ID of the auction.
+        auctioneer_id (int): ID of the auctioneer running it.
+        lot_count (int): Number of lots.
+        change_rate (float): Fraction of lots that receive a new bid per poll.
+        rng (random.Random): Random source, so runs with the same seed serve the same data.
+    """
+
+    def __init__(self, auction_id, auctioneer_id, lot_count, change_rate, rng):
+        self.auction_id = auction_id
+        self.auctioneer_id = auctioneer_id
+        self.change_rate = change_rate
+        self.rng = rng
+        self.started_at = time.time()
+        self.lots = [self._lot(index) for index in range(lot_count)]
+        self.lock = threading.Lock()
+
+    def auction(self, full=True):
+        open_lots = sum(1 for lot in self.lots if not lot["lotState"]["isClosed"])
+        auction_state = {"auctionStatus": "OPEN", "openLotCount": open_lots, "timeToOpen": 0, "__typename": "AuctionState"}
+        if not full:
+            return {"id": self.auction_id, "lotCount": len(self.lots), "auctionState": auction_state, "__typename": "Auction"}
+        end = datetime.now(timezone.utc) + timedelta(hours=2)
+        return {
+            "id": self.auction_id,
+            "eventName": f"Synthetic auction {self.auction_id}",
+            "eventDateBegin": (end - timedelta(days=7)).isoformat(),
+            "eventDateEnd": end.isoformat(),
+            "lotCount": len(self.lots),
+            "auctioneer": {"id": self.auctioneer_id, "name": f"Auctioneer {self.auctioneer_id}", "__typename": "Auctioneer"},
+            "auctionState": auction_state,
+            "description": "Synthetic auction served by mock_server.",
+            "__typename": "Auction"
+        }
+
+    def poll(self):
+        """
+        Advances the auction by one poll: time passes and `change_rate` of the open lots get a new bid.
+        """
+        with self.lock:
+            elapsed = int(time.time() - self.started_at)
+            for lot in self.lots:
+                state = lot["lotState"]
+                state["timeLeftSeconds"] = max(0, state["closesAt"] - elapsed)
+                if state["timeLeftSeconds"] == 0 and not state["isClosed"]:
+                    state["isClosed"] = True
+                    state["status"] = "CLOSED"
+                    state["priceRealized"] = state["highBid"]
+            changes = int(len(self.lots) * self.change_rate)
+            for lot in self.rng.sample(self.lots, changes):
+                state = lot["lotState"]
+                if not state["isClosed"]:
+                    state["highBid"] = state["minBid"]
+                    state["bidCount"] += 1
+                    state["minBid"] += 5
+
+    def response(self, full=True):
+        """
+        Returns:
+            dict: A `LiveCatalogLots` response in the "full" or "state-only" profile.
+        """
+        self.poll()
+        with self.lock:
+            if full:
+                live_lots = [{**lot, "lotState": _public_state(lot["lotState"])} for lot in self.lots]
+            else:
+                live_lots = [{"itemId": lot["itemId"], "lotState": _public_state(lot["lotState"]), "__typename": "Lot"} for lot in self.lots]
+            return {"data": {"liveCatalogLots": {"auction": self.auction(full), "liveLots": live_lots, "upcomingLots": [], "__typename": "LiveCatalogLots"}}}
+
+    def _lot(self, index):
+        item_id = self.auction_id * 100000 + index
+        category_id = 700 + index % 25
+        return {
+            "id": item_id + 50000000,
+            "itemId": item_id,
+            "lotNumber": str(index + 1),
+            "lead": f"Lot {index + 1} lead",
+            "description": f"Synthetic lot {index + 1} of auction {self.auction_id}. " * 4,
+            "estimate": f"{index % 50 * 10}-{index % 50 * 10 + 20}",
+            "quantity": 1,
+            "pictureCount": 3,
+            "featuredPicture": {"description": None, "fullSizeLocation": f"https://example.invalid/{item_id}.jpg", "height": 480, "thumbnailLocation": f"https://example.invalid/{item_id}_t.jpg", "width": 640, "__typename": "Picture"},
+            "category": {"id": category_id, "baseCategoryId": 700, "parentCategoryId": 700, "categoryName": f"Category {category_id}", "fullCategory": f"Root > Category {category_id}", "header": None, "description": None, "uRLPath": f"category-{category_id}", "__typename": "Category"},
+            "lotState": {
+                "bidCount": 0,
+                "biddingExtended": False,
+                "highBid": 0,
+                "isClosed": False,
+                "isLive": True,
+                "isNotYetLive": False,
+                "minBid": 5,
+                "priceRealized": 0,
+                "quantitySold": 0,
+                "reserveSatisfied": True,
+                "softCloseSeconds": 0,
+                "status": "OPEN",
+                "timeLeftSeconds": 3600 + index * 30,
+                "timeLeftWithLimboSeconds": 3600 + index * 30,
+                "closesAt": 3600 + index * 30,
+                "__typename": "LotState"
+            },
+            "__typename": "Lot"
+        }
+
+
+class MockHibidServer:
+    """
+    Local stand-in for https://hibid.com/graphql serving synthetic responses, for benchmarks and offline runs.
+
+    Serves `LiveCatalogLots` (both query profiles), `AuctionsByAuctioneerSearch`, `GetLotDetails`,
+    `GetLotDescription` and `BulkLotDescriptions`. Auctions are created on first request.
+
+    Args:
+        lot_count (int, optional): Lots per auction. Defaults to 500.
+        change_rate (float, optional): Fraction of lots that receive a new bid per poll. Defaults to 0.05.
+        auctions_per_auctioneer (int, optional): Auctions returned by `AuctionsByAuctioneerSearch`. Defaults to 3.
+        seed (int, optional): Random seed. Defaults to 0.
+        host (str, optional): Address to bind. Defaults to "127.0.0.1".
+        port (int, optional): Port to listen on; 0 picks a free one. Defaults to 0.
+
+    Example:
+        with MockHibidServer(lot_count=2000) as server:
+            client = GraphQLClient(server.url)
+            update_auction_data(server.auction_id(0), auction_data, item_ids, client=client)
+    """
+
+    def __init__(self, lot_count=500, change_rate=0.05, auctions_per_auctioneer=3, seed=0, host="127.0.0.1", port=0):
+        self.lot_count = lot_count
+        self.change_rate = change_rate
+        self.auctions_per_auctioneer = auctions_per_auctioneer
+        self.rng = random.Random(seed)
+        self.auctions = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    @staticmethod
+    def auction_id(index, auctioneer_id=1):
+        """
+        Returns:
+            int: ID of the index-th auction of an auctioneer.
+        """
+        return auctioneer_id * 1000 + index
+
+    def get_auction(self, auction_id):
+        """
+        Returns:
+            SyntheticAuction: The auction with this ID, created on first use.
+        """
+        with self.lock:
+            auction = self.auctions.get(auction_id)
+            if auction is None:
+                auction = SyntheticAuction(auction_id, auction_id // 1000, self.lot_count, self.change_rate, self.rng)
+                self.auctions[auction_id] = auction
+            return auction
+
+    def handle(self, operation_name, query, variables):
+        """
+        Builds the response to one GraphQL operation.
+
+        Returns:
+            dict or None: The response body, or None for unknown operations.
+        """
+        with self.lock:
+            self.requests += 1
+        if operation_name == "LiveCatalogLots":
+            return self.get_auction(int(variables["auctionId"])).response(full="lotOnly" in query)
+        if operation_name == "AuctionsByAuctioneerSearch":
+            return self._auction_search(int(variables["auctioneerId"]), variables.get("pageNumber") or 1, variables.get("pageLength") or 25)
+        if operation_name in ("GetLotDetails", "GetLotDescription"):
+            return {"data": {"lot": {"lot": self._find_lot(variables["lotId"]), "__typename": "LotResult"}}}
+        if operation_name == "BulkLotDescriptions":
+            return {"data": {alias: {"lot": self._find_lot(lot_id), "__typename": "LotResult"} for alias, lot_id in variables.items()}}
+        return None
+
+    def start(self):
+        """
+        Starts serving from a daemon thread.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-hibid", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving and closes the listening socket.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _auction_search(self, auctioneer_id, page_number, page_length):
+        ids = [self.auction_id(index, auctioneer_id) for index in range(self.auctions_per_auctioneer)]
+        page = ids[(page_number - 1) * page_length:page_number * page_length]
+        results = [{"matchinglotcount": self.lot_count, "auction": self.get_auction(auction_id).auction(), "__typename": "AuctionSearchResult"} for auction_id in page]
+        return {"data": {"auctionSearch": {"pagedResults": {
+            "pageLength": page_length,
+            "pageNumber": page_number,
+            "totalCount": len(ids),
+            "filteredCount": len(ids),
+            "results": results,
+            "__typename": "PagedResults"
+        }, "__typename": "AuctionSearch"}}}
+
+    def _find_lot(self, lot_id):
+        lot_id = int(lot_id)
+        auction = self.get_auction((lot_id - 50000000) // 100000)
+        index = (lot_id - 50000000) % 100000
+        if index >= len(auction.lots):
+            return None
+        lot = auction.lots[index]
+        return {**lot, "lotState": _public_state(lot["lotState"]), "auction": auction.auction()}
+
+    def _handler(self):
+        server = self
+
+        class GraphQLHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                try:
+                    body = server.handle(payload.get("operationName"), payload.get("query", ""), payload.get("variables") or {})
+                except Exception as e:
+                    logging.error(f"Mock server error: {e}")
+                    body = None
+                status = 200 if body is not None else 400
+                data = json.dumps(body if body is not None else {"errors": [{"message": "Unsupported operation"}]}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return GraphQLHandler
+
+
+def _public_state(state):
+    return {key: value for key, value in state.items() if key != "closesAt"}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve synthetic hibid.com GraphQL responses locally.")
+    parser.add_argument("--lots", type=int, default=500, help="lots per auction")
+    parser.add_argument("--change-rate", type=float, default=0.05, help="fraction of lots that change per poll")
+    parser.add_argument("--auctions", type=int, default=3, help="auctions per auctioneer")
+    parser.add_argument("--port", type=int, default=0, help="port to listen on, 0 picks a free one")
+    args = parser.parse_args()
+
+    server = MockHibidServer(args.lots, args.change_rate, args.auctions, port=args.port)
+    # The URL is the first line of output so a parent process can read the chosen port
+    print(server.url, flush=True)
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,275 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import multiprocessing
+import threading
+import random
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. `reserve` always succeeds, letting
+    the balance go negative, and returns how long the caller has to wait before using its token. This
+    lets blocking callers sleep and asyncio callers await the same bucket.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float, optional): Maximum burst size. Defaults to `rate` (one second worth of tokens).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Takes tokens from the bucket.
+
+        Args:
+            tokens (float, optional): Number of tokens to take. Defaults to 1.
+
+        Returns:
+            float: Seconds to wait before the tokens may be used; 0 if they were available.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose balance lives in shared memory, so processes started from the same context draw
+    from one budget.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float, optional): Maximum burst size. Defaults to `rate` (one second worth of tokens).
+        context (multiprocessing context, optional): Context the worker processes are started from. Defaults
+            to the default context.
+
+    Notes:
+        - The bucket must reach the workers as an argument of `Process`, like any other multiprocessing lock.
+        - Refill times use `time.monotonic`, which is shared by all processes of a machine.
+    """
+
+    def __init__(self, rate, capacity=None, context=None):
+        context = context or multiprocessing.get_context()
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        # [tokens, updated_at]
+        self.state = context.RawArray("d", [self.capacity, time.monotonic()])
+        self.lock = context.Lock()
+
+    def reserve(self, tokens=1):
+        with self.lock:
+            now = time.monotonic()
+            balance = min(self.capacity, self.state[0] + (now - self.state[1]) * self.rate) - tokens
+            self.state[0] = balance
+            self.state[1] = now
+            if balance >= 0:
+                return 0.0
+            return -balance / self.rate
+
+
+class RateLimiter:
+    """
+    Global plus per-endpoint token buckets shared by every hibid.com request.
+
+    Args:
+        rate (float, optional): Global requests per second. Defaults to 5.
+        burst (float, optional): Global burst size. Defaults to 10.
+        endpoint_rates (dict, optional): GraphQL operation name -> (rate, burst) for per-endpoint limits,
+            e.g. {"LiveCatalogLots": (2, 5)}. Operations without an entry are only globally limited.
+        context (multiprocessing context, optional): If given, the buckets are `SharedTokenBucket`s and the limiter
+            can be passed to processes started from this context, which then share its budget.
+
+    Example:
+        limiter = RateLimiter(rate=5, endpoint_rates={"GetLotDescription": (1, 3)})
+        limiter.acquire("GetLotDescription")
+
+    Notes:
+        - The request counters of `stats` are kept per process.
+    """
+
+    def __init__(self, rate=5, burst=10, endpoint_rates=None, context=None):
+        if context is not None:
+            def bucket(rate, burst):
+                return SharedTokenBucket(rate, burst, context)
+        else:
+            bucket = TokenBucket
+        self.bucket = bucket(rate, burst)
+        self.endpoint_buckets = {
+            operation: bucket(endpoint_rate, endpoint_burst)
+            for operation, (endpoint_rate, endpoint_burst) in (endpoint_rates or {}).items()
+        }
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def __getstate__(self):
+        # Sent to a worker process: the buckets travel, the thread lock and this process's counters do not
+        return {"bucket": self.bucket, "endpoint_buckets": self.endpoint_buckets}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def reserve(self, operation=None):
+        """
+        Reserves one request for an operation from the global and the endpoint bucket.
+
+        Args:
+            operation (str, optional): GraphQL operation name.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        delay = self.bucket.reserve()
+        endpoint_bucket = self.endpoint_buckets.get(operation)
+        if endpoint_bucket is not None:
+            delay = max(delay, endpoint_bucket.reserve())
+        with self.lock:
+            self.requests += 1
+            if delay > 0:
+                self.throttled += 1
+                self.throttled_seconds += delay
+        return delay
+
+    def acquire(self, operation=None):
+        """
+        Blocks until a request for the operation may be sent.
+
+        Args:
+            operation (str, optional): GraphQL operation name.
+        """
+        delay = self.reserve(operation)
+        if delay > 0:
+            time.sleep(delay)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of requests, how many of them were throttled and the total time spent waiting.
+        """
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "throttled_seconds": round(self.throttled_seconds, 3)
+            }
+
+
+class RetryPolicy:
+    """
+    Retry policy with full-jitter exponential backoff that honours `Retry-After`.
+
+    Args:
+        max_retries (int, optional): Retries after the first attempt. Defaults to 3.
+        base_delay (float, optional): Backoff base in seconds. Defaults to 1.
+        max_delay (float, optional): Upper bound for a single backoff in seconds. Defaults to 60.
+        retry_statuses (iterable, optional): HTTP status codes that are retried. Defaults to 429 and 5xx gateway errors.
+    """
+
+    def __init__(self, max_retries=3, base_delay=1, max_delay=60, retry_statuses=(429, 500, 502, 503, 504)):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.lock = threading.Lock()
+        self.retried = 0
+        self.rate_limited = 0
+        self.gave_up = 0
+
+    def should_retry(self, attempt, status=None):
+        """
+        Decides whether a failed attempt is retried and records it in the counters.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0.
+            status (int, optional): HTTP status code of the response, or None for a connection error or timeout.
+
+        Returns:
+            bool: True if the request should be sent again.
+        """
+        if status is not None and status not in self.retry_statuses:
+            return False
+        with self.lock:
+            if status == 429:
+                self.rate_limited += 1
+            if attempt >= self.max_retries:
+                self.gave_up += 1
+                return False
+            self.retried += 1
+            return True
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Returns how long to wait before the next attempt.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0.
+            retry_after (str, optional): Value of the response's Retry-After header.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            return min(server_delay, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of retries, 429 responses and requests that failed after every retry.
+        """
+        with self.lock:
+            return {
+                "retried": self.retried,
+                "rate_limited": self.rate_limited,
+                "gave_up": self.gave_up
+            }
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header given either as delay seconds or as an HTTP date.
+
+    Args:
+        value (str): The header value.
+
+    Returns:
+        float or None: Seconds to wait, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Process-wide limiter and retry policy used by every client unless one is passed explicitly
+default_limiter = RateLimiter()
+default_retry_policy = RetryPolicy()
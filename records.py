@@ -0,0 +1,321 @@
+from collections.abc import MutableMapping
+from weakref import WeakValueDictionary
+import threading
+import sys
+
+# Strings up to this length are interned: statuses, lot numbers, estimates, URLs and names repeat across
+# lots and polls, while long descriptions are unique and would only bloat the intern table.
+INTERN_MAX_LENGTH = 80
+
+_MISSING = object()
+
+# Every Record subclass, for fast exact-type checks on hot paths
+_record_types = set()
+
+
+class Record(MutableMapping):
+    """
+    Compact, typed replacement for a GraphQL response object.
+
+    Every known field lives in a `__slots__` slot instead of a per-object dict, absent fields hold a shared sentinel,
+    `__typename` is kept in the `typename` slot, and fields the schema does not list yet are kept in `extra`
+    so a record always converts back to the exact dict it was built from.
+
+    Records implement the mapping protocol with the GraphQL field names as keys, so code written against the
+    raw response dicts (`lot["lotState"]["highBid"]`, `lot.get("category")`, `state.update(...)`) works unchanged.
+
+    Subclasses list their fields in FIELDS and map fields holding nested objects to record classes in NESTED.
+    Classes with SHARED set are de-duplicated: equal objects (e.g. the site or category repeated on every lot)
+    are stored once and shared between records.
+    """
+
+    __slots__ = ("typename", "extra")
+    FIELDS = ()
+    NESTED = {}
+    SHARED = False
+    _field_set = frozenset()
+    _all_slots = ("typename",)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        cls._all_slots = ("typename",) + tuple(cls.FIELDS)
+        _record_types.add(cls)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds a record from a GraphQL response object.
+
+        Args:
+            data (dict or Record): The response object, or an existing record which is returned as is.
+
+        Returns:
+            Record: The record, or a shared instance equal to it if the class is SHARED.
+        """
+        if type(data) is cls:
+            return data
+        if cls.SHARED:
+            try:
+                key = (cls, tuple(data.items()))
+                shared = _shared.get(key)
+            except TypeError:
+                key = shared = None
+            if shared is not None:
+                return shared
+
+        record = cls.__new__(cls)
+        # Absent fields hold a sentinel rather than staying unset, since reading an unset slot raises
+        for field in cls._all_slots:
+            setattr(record, field, _MISSING)
+        record.extra = None
+        if cls.SHARED:
+            record._dict = None
+        fields = cls._field_set
+        nested = cls.NESTED
+        extra = None
+        for field, value in data.items():
+            if isinstance(value, str):
+                value = _intern(value)
+            elif value is not None and field in nested:
+                value = _nested(nested[field], value)
+            if field in fields:
+                setattr(record, field, value)
+            elif field == "__typename":
+                record.typename = value
+            else:
+                if extra is None:
+                    extra = {}
+                extra[_intern(field)] = value
+        if extra is not None:
+            record.extra = extra
+
+        if cls.SHARED and key is not None:
+            with _shared_lock:
+                record = _shared.setdefault(key, record)
+        return record
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The record as a plain GraphQL response object, nested records included.
+        """
+        # Reads the slots directly: this runs for every lot on each compaction, so it avoids the mapping protocol
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is _MISSING:
+                continue
+            # Exact type checks: isinstance against an abc.MutableMapping subclass is several times slower
+            value_type = type(value)
+            if value_type in _record_types:
+                value = value.to_dict()
+            elif value_type is tuple:
+                value = [item.to_dict() if type(item) in _record_types else item for item in value]
+            data[field] = value
+        if self.typename is not _MISSING:
+            data["__typename"] = self.typename
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key)
+        elif key == "__typename":
+            value = self.typename
+        else:
+            value = (self.extra or {}).get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if self.SHARED:
+            raise TypeError(f"{type(self).__name__} records are shared between objects and cannot be changed")
+        if isinstance(value, str):
+            value = _intern(value)
+        if key in self._field_set:
+            setattr(self, key, value)
+        elif key == "__typename":
+            self.typename = value
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self._field_set:
+            setattr(self, key, _MISSING)
+        elif key == "__typename":
+            self.typename = _MISSING
+        else:
+            del self.extra[key]
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self.typename is not _MISSING:
+            yield "__typename"
+        yield from self.extra or ()
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __eq__(self, other):
+        # Nested lists are stored as tuples, so compare the plain dict forms rather than item by item
+        if isinstance(other, Record):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (type(self).from_dict, (self.to_dict(),))
+
+
+class SharedRecord(Record):
+    """
+    Base of de-duplicated record classes. Instances are immutable and weakly cached.
+    """
+
+    __slots__ = ("__weakref__", "_dict")
+    SHARED = True
+
+    def to_dict(self):
+        # Shared records are immutable, so their dict form is built once; callers get a copy
+        cached = self._dict
+        if cached is None:
+            cached = self._dict = Record.to_dict(self)
+        return dict(cached)
+
+    def __hash__(self):
+        return id(self)
+
+    def __eq__(self, other):
+        return self is other or Record.__eq__(self, other)
+
+
+class Picture(Record):
+    __slots__ = FIELDS = ("description", "fullSizeLocation", "height", "thumbnailLocation", "width")
+
+
+class Link(Record):
+    __slots__ = FIELDS = ("description", "id", "type", "url", "videoId")
+
+
+class LotNavigator(Record):
+    __slots__ = FIELDS = ("lotCount", "lotPosition", "nextId", "previousId")
+
+
+class Site(SharedRecord):
+    __slots__ = FIELDS = (
+        "currencyExpressUrl", "domain", "fr8StarUrl", "isDomainRequest", "isExtraWWWRequest", "siteType", "subdomain"
+    )
+
+
+class Category(SharedRecord):
+    __slots__ = FIELDS = (
+        "baseCategoryId", "categoryName", "description", "fullCategory", "header", "id", "parentCategoryId", "uRLPath"
+    )
+
+
+class Auctioneer(SharedRecord):
+    __slots__ = FIELDS = (
+        "address", "bidIncrementDisclaimer", "buyerRegNotesCaption", "city", "countryId", "country", "cRMID",
+        "currencyExpressUrl", "email", "fax", "id", "internetAddress", "missingThumbnail", "name",
+        "noMinimumCaption", "phone", "state", "postalCode"
+    )
+
+
+class LotState(Record):
+    __slots__ = FIELDS = (
+        "bidCount", "biddingExtended", "bidMax", "bidMaxTotal", "buyerBidStatus", "buyerHighBid", "buyerHighBidTotal",
+        "buyNow", "choiceType", "highBid", "highBuyerId", "isArchived", "isClosed", "isHidden", "isLive",
+        "isNotYetLive", "isOnLiveCatalog", "isPosted", "isPublicHidden", "isRegistered", "isWatching",
+        "linkedSoftClose", "mayHaveWonStatus", "minBid", "priceRealized", "priceRealizedMessage",
+        "priceRealizedPerEach", "productStatus", "productUrl", "quantitySold", "reserveSatisfied", "sealed",
+        "showBidStatus", "showReserveStatus", "softCloseMinutes", "softCloseSeconds", "status", "timeLeft",
+        "timeLeftLead", "timeLeftSeconds", "timeLeftTitle", "timeLeftWithLimboSeconds", "watchNotes"
+    )
+
+
+class Lot(Record):
+    __slots__ = FIELDS = (
+        "bidAmount", "bidList", "bidQuantity", "description", "estimate", "featuredPicture", "forceLiveCatalog",
+        "fr8StarUrl", "hideLeadWithDescription", "id", "itemId", "lead", "links", "linkTypes", "lotNavigator",
+        "lotNumber", "lotState", "pictureCount", "pictures", "quantity", "ringNumber", "rv", "category",
+        "shippingOffered", "simulcastStatus", "site", "saleOrder"
+    )
+    NESTED = {
+        "featuredPicture": Picture,
+        "links": Link,
+        "lotNavigator": LotNavigator,
+        "lotState": LotState,
+        "pictures": Picture,
+        "category": Category,
+        "site": Site
+    }
+
+
+class Auction(Record):
+    __slots__ = FIELDS = (
+        "id", "altBiddingUrl", "altBiddingUrlCaption", "amexAccepted", "discoverAccepted", "mastercardAccepted",
+        "visaAccepted", "regType", "holdAmount", "termsAndConditions", "auctioneer", "auctionNotice",
+        "auctionOptions", "auctionState", "bidAmountType", "biddingNotice", "bidIncrements", "bidType",
+        "buyerPremium", "buyerPremiumRate", "checkoutDateInfo", "previewDateInfo", "currencyAbbreviation",
+        "description", "eventAddress", "eventCity", "eventDateBegin", "eventDateEnd", "eventDateInfo", "eventName",
+        "eventState", "eventZip", "featuredPicture", "links", "lotCount", "showBuyerPremium", "audioVideoChatInfo",
+        "shippingAndPickupInfo", "paymentInfo", "hidden", "sourceType"
+    )
+    NESTED = {
+        "auctioneer": Auctioneer,
+        "featuredPicture": Picture,
+        "links": Link
+    }
+
+
+def to_records(auction_data):
+    """
+    Converts auction data holding raw response dicts to records, in place.
+
+    Args:
+        auction_data (dict): Auction data with keys "auction" and "lots".
+
+    Returns:
+        dict: The same auction data.
+    """
+    auction_data["auction"] = Auction.from_dict(auction_data["auction"])
+    lots = auction_data["lots"]
+    for item_id, lot in lots.items():
+        lots[item_id] = Lot.from_dict(lot)
+    return auction_data
+
+
+def _intern(value):
+    return sys.intern(value) if len(value) <= INTERN_MAX_LENGTH else value
+
+
+def _nested(cls, value):
+    if isinstance(value, list):
+        return tuple(cls.from_dict(item) if isinstance(item, dict) else item for item in value)
+    if isinstance(value, dict):
+        return cls.from_dict(value)
+    return value
+
+
+# De-duplication table of SharedRecord instances, keyed by class and field values. Entries disappear once
+# no record refers to them any more.
+_shared = WeakValueDictionary()
+_shared_lock = threading.Lock()
@@ -0,0 +1,131 @@
+import logging
+
+
+class PollScheduler:
+    """
+    Adaptive poll schedule for a single auction, driven by the lot states of the last response.
+
+    The scheduler polls quickly while any lot is inside its closing window, aims the next poll at the
+    start of the closing window when the soonest lot is further out, and backs off exponentially while
+    nothing changes between polls.
+
+    Args:
+        base_interval (int, optional): Interval in seconds used while lots are active. Defaults to 60.
+        min_interval (int, optional): Interval in seconds used inside the closing window. Defaults to 2.
+        max_interval (int, optional): Upper bound for the idle back-off in seconds. Defaults to 3600.
+        closing_window (int, optional): Seconds before a lot closes in which fast polling starts. Defaults to 90.
+            The window is widened to a lot's `softCloseSeconds` when that is larger.
+        backoff_factor (float, optional): Multiplier applied to the interval after every idle poll. Defaults to 2.
+
+    Example:
+        scheduler = PollScheduler(base_interval=60)
+        scheduler.observe(live_lots, changed_lots)
+        time.sleep(scheduler.next_delay())
+    """
+
+    def __init__(self, base_interval=60, min_interval=2, max_interval=3600, closing_window=90, backoff_factor=2):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.closing_window = closing_window
+        self.backoff_factor = backoff_factor
+        self.interval = base_interval
+        self.delay = base_interval
+
+    def observe(self, live_lots, changed_lots=0):
+        """
+        Updates the schedule from the lots of the last successful poll.
+
+        Args:
+            live_lots (list): The `liveLots` entries of the last `LiveCatalogLots` response.
+            changed_lots (int, optional): Number of lots that were added or changed by the poll. Defaults to 0.
+
+        Returns:
+            int: The delay in seconds until the next poll.
+        """
+        time_left, window, extended = closing_state(live_lots, self.closing_window)
+
+        if changed_lots or extended:
+            self.interval = self.base_interval
+        else:
+            self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+
+        if time_left is None:
+            # No open lots left; keep backing off until the auction disappears or reopens
+            delay = self.interval
+        elif extended or time_left <= window:
+            delay = self.min_interval
+        else:
+            # Wake up no later than the start of the closing window
+            delay = min(self.interval, time_left - window)
+
+        self.delay = int(max(self.min_interval, min(delay, self.max_interval)))
+        logging.debug(f"Next poll in {self.delay}s (soonest close {time_left}s, interval {self.interval}s)")
+        return self.delay
+
+    def failed(self):
+        """
+        Records a failed poll. The next poll uses the base interval so a transient error is retried promptly.
+
+        Returns:
+            int: The delay in seconds until the next poll.
+        """
+        self.delay = int(min(self.base_interval, self.delay))
+        return self.delay
+
+    def state(self):
+        """
+        Returns:
+            dict: The adaptive part of the schedule, for `restore` after a restart.
+        """
+        return {"interval": self.interval, "delay": self.delay}
+
+    def restore(self, state):
+        """
+        Restores a schedule saved with `state`.
+
+        Args:
+            state (dict): The saved schedule. Missing values keep their defaults.
+        """
+        self.interval = state.get("interval", self.interval)
+        self.delay = state.get("delay", self.delay)
+
+    def next_delay(self):
+        """
+        Returns:
+            int: The delay in seconds until the next poll, as computed by the last `observe` or `failed` call.
+        """
+        return self.delay
+
+
+def closing_state(live_lots, closing_window):
+    """
+    Summarises how close the lots of an auction are to closing.
+
+    Args:
+        live_lots (list): The `liveLots` entries of a `LiveCatalogLots` response.
+        closing_window (int): Minimum closing window in seconds.
+
+    Returns:
+        tuple: (time_left, window, extended) where `time_left` is the smallest positive `timeLeftSeconds`
+        of an open lot (None if every lot is closed), `window` is the closing window widened to the largest
+        `softCloseSeconds` seen, and `extended` is True if any open lot has `biddingExtended` set.
+    """
+    time_left = None
+    window = closing_window
+    extended = False
+
+    for lot in live_lots:
+        state = lot.get("lotState") or {}
+        if state.get("isClosed"):
+            continue
+        seconds = state.get("timeLeftSeconds")
+        if seconds is not None and seconds > 0 and (time_left is None or seconds < time_left):
+            time_left = seconds
+        soft_close = state.get("softCloseSeconds")
+        if soft_close and soft_close > window:
+            window = soft_close
+        if state.get("biddingExtended"):
+            extended = True
+
+    return time_left, window, extended
@@ -0,0 +1,308 @@
+from delta_log import AuctionLog
+import threading
+import logging
+import sqlite3
+import html
+import glob
+import time
+import os
+import re
+
+# Lot text is kept in a plain table and indexed by an external-content FTS5 table, so status updates never
+# touch the index and text is only re-tokenized when it actually changes.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lot_documents (
+    item_id INTEGER PRIMARY KEY,
+    lot_id TEXT,
+    auction_id INTEGER,
+    category_id INTEGER,
+    parent_category_id INTEGER,
+    base_category_id INTEGER,
+    lot_number TEXT,
+    status TEXT,
+    is_closed INTEGER,
+    lead TEXT,
+    description TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_lot_documents_auction ON lot_documents(auction_id);
+CREATE INDEX IF NOT EXISTS idx_lot_documents_category ON lot_documents(category_id);
+CREATE INDEX IF NOT EXISTS idx_lot_documents_lot ON lot_documents(lot_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS lot_text USING fts5(
+    lead, description, content='lot_documents', content_rowid='item_id', tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS lot_documents_insert AFTER INSERT ON lot_documents BEGIN
+    INSERT INTO lot_text (rowid, lead, description) VALUES (new.item_id, new.lead, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS lot_documents_delete AFTER DELETE ON lot_documents BEGIN
+    INSERT INTO lot_text (lot_text, rowid, lead, description) VALUES ('delete', old.item_id, old.lead, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS lot_documents_update AFTER UPDATE OF lead, description ON lot_documents
+WHEN old.lead IS NOT new.lead OR old.description IS NOT new.description BEGIN
+    INSERT INTO lot_text (lot_text, rowid, lead, description) VALUES ('delete', old.item_id, old.lead, old.description);
+    INSERT INTO lot_text (rowid, lead, description) VALUES (new.item_id, new.lead, new.description);
+END;
+"""
+
+# bm25 weights of the lead and description columns: a keyword in the lead says more about the lot
+LEAD_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_tag = re.compile(r"<[^>]+>")
+_query_term = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def plain_text(text):
+    """
+    Returns:
+        str or None: A description with its HTML tags and entities removed and whitespace collapsed.
+    """
+    if text is None:
+        return None
+    return " ".join(html.unescape(_tag.sub(" ", text)).split())
+
+
+def build_query(text):
+    """
+    Turns user input into an FTS5 query: "double quoted" parts are phrases, other words are terms that must all
+    appear, and a trailing * makes a term a prefix. FTS5 operators in the input are searched for as words.
+
+    Example:
+        build_query('dewalt "impact driver" batt*') -> '"dewalt" "impact driver" "batt"*'
+    """
+    terms = []
+    for phrase, word in _query_term.findall(text):
+        if phrase:
+            terms.append('"' + phrase.replace('"', '""') + '"')
+        elif word:
+            prefix = word.endswith("*") and len(word) > 1
+            word = word.rstrip("*")
+            if word:
+                terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    Full-text index of lot leads and descriptions in SQLite FTS5, across tracked and finished auctions.
+
+    The index is kept current by `record_poll`, called by the trackers after every poll like
+    `AuctionDatabase.record_poll`: new lots are indexed and status changes update the lot's row without
+    re-indexing its text. `index_directory` indexes the saved auctions of earlier runs, and descriptions
+    fetched with `get_lot_description` are added by `index_descriptions`.
+
+    Queries are ranked with bm25, leads weighing more than descriptions, and can be filtered by auction,
+    category (including parent categories) and status.
+
+    Args:
+        path (str, optional): Path of the SQLite database file. Defaults to "search.db".
+
+    Example:
+        index = SearchIndex()
+        track_and_update_data(auc_id, file_name, search_index=index)
+        index.search('"impact driver" dewalt', status="OPEN")
+    """
+
+    def __init__(self, path="search.db"):
+        self.path = path
+        # Trackers write from worker threads; access is serialised by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def index_lots(self, auction_id, lots, indexed_at=None):
+        """
+        Adds or updates the documents of lots in one transaction.
+
+        Args:
+            auction_id (int): ID of the auction the lots belong to.
+            lots (iterable): Lots with their descriptive fields. A lot without a description keeps the indexed one.
+            indexed_at (float, optional): Unix timestamp stored with the rows. Defaults to now.
+
+        Returns:
+            int: Number of lots written.
+        """
+        indexed_at = indexed_at if indexed_at is not None else time.time()
+        rows = [_document_row(auction_id, lot, indexed_at) for lot in lots]
+        if rows:
+            with self.lock, self.connection:
+                self.connection.executemany(
+                    "INSERT INTO lot_documents (item_id, lot_id, auction_id, category_id, parent_category_id, base_category_id, "
+                    "lot_number, status, is_closed, lead, description, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(item_id) DO UPDATE SET "
+                    "lot_id = COALESCE(excluded.lot_id, lot_id), auction_id = excluded.auction_id, "
+                    "category_id = COALESCE(excluded.category_id, category_id), "
+                    "parent_category_id = COALESCE(excluded.parent_category_id, parent_category_id), "
+                    "base_category_id = COALESCE(excluded.base_category_id, base_category_id), "
+                    "lot_number = COALESCE(excluded.lot_number, lot_number), "
+                    "status = COALESCE(excluded.status, status), is_closed = COALESCE(excluded.is_closed, is_closed), "
+                    "lead = COALESCE(excluded.lead, lead), description = COALESCE(excluded.description, description), "
+                    "updated_at = excluded.updated_at",
+                    rows)
+        return len(rows)
+
+    def record_poll(self, auction_id, auction_data, events, observed_at=None):
+        """
+        Applies the changes of one poll: indexes new lots and updates the status of changed ones.
+
+        Args:
+            auction_id (int): ID of the polled auction.
+            auction_data (dict): The auction data after the poll, with keys "auction" and "lots".
+            events (list): Event dicts of the poll as collected by `merge_live_catalog`.
+            observed_at (float, optional): Poll time as a Unix timestamp. Defaults to now.
+        """
+        if not events:
+            return
+        observed_at = observed_at if observed_at is not None else time.time()
+        new_lots = []
+        status_rows = []
+        for event in events:
+            if event["type"] == "lot":
+                new_lots.append(event["lot"])
+            elif event["type"] == "state":
+                lot_state = event["lotState"]
+                if "status" in lot_state or "isClosed" in lot_state:
+                    status_rows.append((lot_state.get("status"), lot_state.get("isClosed"), observed_at, event["itemId"]))
+        self.index_lots(auction_id, new_lots, observed_at)
+        if status_rows:
+            with self.lock, self.connection:
+                self.connection.executemany(
+                    "UPDATE lot_documents SET status = COALESCE(?, status), is_closed = COALESCE(?, is_closed), updated_at = ? "
+                    "WHERE item_id = ?",
+                    status_rows)
+
+    def index_descriptions(self, descriptions):
+        """
+        Stores descriptions fetched separately, e.g. by `get_lot_descriptions`, for lots already in the index.
+
+        Args:
+            descriptions (dict): Lot id (the lot's "id", not its itemId) -> description.
+
+        Returns:
+            int: Number of lots whose description changed.
+        """
+        rows = [(plain_text(description), str(lot_id)) for lot_id, description in descriptions.items() if description]
+        if not rows:
+            return 0
+        with self.lock, self.connection:
+            cursor = self.connection.executemany(
+                "UPDATE lot_documents SET description = ? WHERE lot_id = ? AND description IS NOT ?",
+                [(description, lot_id, description) for description, lot_id in rows])
+            return cursor.rowcount
+
+    def index_directory(self, directory="auctions"):
+        """
+        Indexes every auction saved in a directory, e.g. after creating the index or to pick up finished auctions
+        tracked before it existed. Each auction is rebuilt from its JSON file plus its change log.
+
+        Args:
+            directory (str, optional): Directory of the auction JSON files. Defaults to "auctions".
+
+        Returns:
+            int: Number of lots indexed.
+        """
+        indexed = 0
+        for file_path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            try:
+                auction_data = AuctionLog(file_path).load()
+                auction_id = auction_data["auction"].get("id")
+            except (KeyError, TypeError, AttributeError, ValueError, OSError):
+                # Tracker state files and unreadable snapshots share the directory
+                logging.debug(f"Skipping {file_path}, not an auction file")
+                continue
+            indexed += self.index_lots(auction_id, auction_data["lots"].values())
+        logging.info(f"Indexed {indexed} lots from {directory}")
+        return indexed
+
+    def search(self, query, auction_id=None, category_id=None, status=None, limit=20, raw=False):
+        """
+        Finds lots by keywords and phrases, best matches first.
+
+        Args:
+            query (str): Words, "quoted phrases" and prefix* terms, see `build_query`; all must appear in the lead or
+                description. Words are stemmed, so "drills" also finds "drill".
+            auction_id (int or iterable, optional): Only lots of this auction, or of these auctions.
+            category_id (int, optional): Only lots in this category or one of its subcategories.
+            status (str, optional): Only lots with this lotState status, e.g. "OPEN" or "CLOSED".
+            limit (int, optional): Maximum number of results. Defaults to 20.
+            raw (bool, optional): Pass `query` to FTS5 unchanged, for its full syntax (OR, NOT, NEAR, column filters).
+
+        Returns:
+            list[dict]: "item_id", "lot_id", "auction_id", "category_id", "lot_number", "lead", "status", "score"
+            (lower is better) and "snippet", the best matching part of the lead or description with matches in [brackets].
+
+        Raises:
+            ValueError: If a raw query is not valid FTS5 syntax.
+        """
+        match = query if raw else build_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT d.item_id, d.lot_id, d.auction_id, d.category_id, d.lot_number, d.lead, d.status, "
+            f"bm25(lot_text, {LEAD_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score, "
+            "snippet(lot_text, -1, '[', ']', '...', 16) "
+            "FROM lot_text JOIN lot_documents d ON d.item_id = lot_text.rowid WHERE lot_text MATCH ?"
+        )
+        params = [match]
+        if auction_id is not None:
+            auction_ids = [auction_id] if isinstance(auction_id, int) else list(auction_id)
+            sql += f" AND d.auction_id IN ({', '.join('?' * len(auction_ids))})"
+            params.extend(auction_ids)
+        if category_id is not None:
+            sql += " AND ? IN (d.category_id, d.parent_category_id, d.base_category_id)"
+            params.append(category_id)
+        if status is not None:
+            sql += " AND d.status = ?"
+            params.append(status)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        columns = ("item_id", "lot_id", "auction_id", "category_id", "lot_number", "lead", "status", "score", "snippet")
+        try:
+            with self.lock:
+                rows = self.connection.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query {match!r}: {e}") from e
+        return [dict(zip(columns, row)) for row in rows]
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM lot_documents").fetchone()[0]
+
+    def optimize(self):
+        """
+        Merges the index segments left by many small incremental updates, e.g. once a day.
+        """
+        with self.lock, self.connection:
+            self.connection.execute("INSERT INTO lot_text (lot_text) VALUES ('optimize')")
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+
+def _document_row(auction_id, lot, indexed_at):
+    lot_state = lot.get("lotState") or {}
+    category = lot.get("category") or {}
+    lot_id = lot.get("id")
+    return (
+        lot["itemId"],
+        str(lot_id) if lot_id is not None else None,
+        auction_id,
+        category.get("id"),
+        category.get("parentCategoryId"),
+        category.get("baseCategoryId"),
+        lot.get("lotNumber"),
+        lot_state.get("status"),
+        lot_state.get("isClosed"),
+        lot.get("lead"),
+        plain_text(lot.get("description")),
+        indexed_at
+    )
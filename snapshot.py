@@ -0,0 +1,328 @@
+from json_codec import loads, dumps
+from records import Lot, Auction
+import threading
+import tempfile
+import hashlib
+import logging
+import time
+import os
+
+
+class CorruptSnapshotError(ValueError):
+    """
+    Raised when a snapshot does not match its recorded checksum.
+    """
+
+
+def checksum_path(path):
+    return path + ".checksum"
+
+
+def backup_path(path):
+    return path + ".bak"
+
+
+def atomic_write(path, data, keep_backup=False):
+    """
+    Writes a file so that it is either fully replaced or left untouched, and records its checksum.
+
+    The data goes to a temporary file in the same directory, is fsynced and renamed over `path`. Its SHA-256
+    digest is written to `<path>.checksum` before the rename, together with the digest of the file being replaced,
+    so the pair stays consistent whichever step a crash interrupts.
+
+    Args:
+        path (str): Path of the file.
+        data (bytes): The new contents.
+        keep_backup (bool, optional): Keep the replaced file as `<path>.bak`. Defaults to False.
+
+    Returns:
+        str: SHA-256 hex digest of the data.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256(data).hexdigest()
+    previous = _current_digest(path)
+
+    temp_path = _write_temp(directory, data)
+    try:
+        checksum = {"sha256": digest, "size": len(data), "previous": previous, "written_at": time.time()}
+        checksum_temp_path = _write_temp(directory, dumps(checksum))
+        os.replace(checksum_temp_path, checksum_path(path))
+        if keep_backup and os.path.exists(path):
+            _link_backup(path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+    return digest
+
+
+def read_checksum(path):
+    """
+    Returns:
+        dict: The checksum record of a file written by `atomic_write`, or an empty dict if there is none.
+    """
+    try:
+        with open(checksum_path(path), "rb") as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def read_verified(path):
+    """
+    Reads a file written by `atomic_write` and verifies it against its checksum.
+
+    Files without a checksum record, e.g. written before checksums were introduced, are returned unverified.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        bytes: The contents.
+
+    Raises:
+        CorruptSnapshotError: If the contents match neither the recorded digest nor the one of the file it replaced.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    checksum = read_checksum(path)
+    if checksum:
+        digest = hashlib.sha256(data).hexdigest()
+        # The previous digest matches if a crash came between writing the checksum and renaming the file
+        if digest not in (checksum.get("sha256"), checksum.get("previous")):
+            raise CorruptSnapshotError(f"{path} does not match its checksum ({len(data)} bytes, expected {checksum.get('size')})")
+    return data
+
+
+def load_snapshot(path):
+    """
+    Loads a JSON snapshot, falling back to its backup if the snapshot is corrupt.
+
+    Args:
+        path (str): Path of the snapshot.
+
+    Returns:
+        object: The decoded JSON document, or None if no snapshot exists.
+
+    Raises:
+        ValueError: If both the snapshot and its backup are unreadable. The files are left in place for recovery.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return loads(read_verified(path))
+    except ValueError as e:
+        backup = backup_path(path)
+        if not os.path.exists(backup):
+            raise
+        logging.error(f"Snapshot {path} is unreadable ({e}), loading the backup {backup}")
+        with open(backup, "rb") as f:
+            return loads(f.read())
+
+
+def load_auction_data(file_path):
+    """
+    Loads previously saved auction data, or returns an empty structure if the file does not exist.
+
+    Args:
+        file_path (str): Path of the auction JSON file.
+
+    Returns:
+        dict: Auction data with keys "auction" and "lots", holding an `Auction` record and itemId -> `Lot` records.
+
+    Raises:
+        ValueError: If the file and its backup are both corrupt; they are left untouched for recovery.
+
+    Notes:
+        - The file is verified against the checksum written by `save_auction_data`. If it does not match, the
+          previous snapshot kept as `<file>.bak` is loaded instead.
+    """
+    auction_data = load_snapshot(file_path)
+    if auction_data is not None:
+        # JSON object keys are always strings; key lots by their itemId again so they match live responses
+        auction_data["auction"] = Auction.from_dict(auction_data["auction"])
+        auction_data["lots"] = {lot["itemId"]: Lot.from_dict(lot) for lot in auction_data["lots"].values()}
+        return auction_data
+    return {
+        "auction": {},
+        "lots": {}
+    }
+
+
+def save_auction_data(file_path, auction_data, pretty=False):
+    """
+    Writes the auction data to its JSON file.
+
+    Args:
+        file_path (str): Path of the auction JSON file.
+        auction_data (dict): Auction data with keys "auction" and "lots".
+        pretty (bool, optional): Write indented JSON with sorted keys instead of compact JSON. Defaults to False.
+
+    Notes:
+        - The file is replaced atomically with a checksum in `<file>.checksum`, so a crash mid-write leaves the
+          previous snapshot intact. The previous snapshot is also kept as `<file>.bak`.
+    """
+    atomic_write(file_path, dumps(auction_data, pretty), keep_backup=True)
+
+
+class TrackerState:
+    """
+    Small persistent record of the auctions a tracker follows, so a restarted process resumes them right away.
+
+    For every auction it keeps the file name and, as polls happen, the time of the last poll, the time of the
+    next one and the scheduler state. The file is JSON written with `atomic_write`:
+
+        {"auctions": {"481347": {"file_name": "Encore_481347.json", "last_poll": ..., "next_poll": ..., "schedule": {...}}}}
+
+    Args:
+        path (str, optional): Path of the state file. Defaults to "auctions/tracker_state.json".
+        min_save_interval (float, optional): Minimum seconds between writes caused by `update`; adding and removing
+            auctions is always written immediately. Defaults to 5.
+    """
+
+    def __init__(self, path="auctions/tracker_state.json", min_save_interval=5):
+        self.path = path
+        self.min_save_interval = min_save_interval
+        self.auctions = {}
+        self.saved_at = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """
+        Reads the state file, if there is one.
+        """
+        try:
+            state = load_snapshot(self.path) or {}
+        except (OSError, ValueError) as e:
+            logging.error(f"Error loading tracker state from {self.path}: {e}")
+            state = {}
+        # JSON object keys are strings; auction ids are ints everywhere else
+        with self.lock:
+            self.auctions = {int(auction_id): entry for auction_id, entry in state.get("auctions", {}).items()}
+
+    def save(self):
+        """
+        Writes the state file.
+        """
+        # Held while writing, so concurrent saves from several tracker threads cannot interleave their renames
+        with self.lock:
+            self.saved_at = time.time()
+            try:
+                atomic_write(self.path, dumps({"auctions": self.auctions}, pretty=True))
+            except OSError as e:
+                logging.error(f"Error saving tracker state to {self.path}: {e}")
+
+    def track(self, auction_id, file_name, **fields):
+        """
+        Records that an auction is being tracked.
+
+        Args:
+            auction_id (int): ID of the auction.
+            file_name (str): Name of the file under `auctions/` the data is saved to.
+            **fields: Extra values stored with the auction, e.g. auctioneer_id.
+        """
+        with self.lock:
+            entry = self.auctions.setdefault(auction_id, {})
+            entry.update(fields, file_name=file_name)
+        self.save()
+
+    def update(self, auction_id, last_poll=None, next_poll=None, schedule=None):
+        """
+        Records a poll of a tracked auction. Writes are throttled to one per `min_save_interval`.
+
+        Args:
+            auction_id (int): ID of the auction.
+            last_poll (float, optional): Unix time of the poll.
+            next_poll (float, optional): Unix time the next poll is scheduled for.
+            schedule (dict, optional): `PollScheduler.state()`.
+        """
+        with self.lock:
+            entry = self.auctions.get(auction_id)
+            if entry is None:
+                return
+            entry.update({"last_poll": last_poll, "next_poll": next_poll, "schedule": schedule})
+            due = time.time() - self.saved_at >= self.min_save_interval
+        if due:
+            self.save()
+
+    def remove(self, auction_id):
+        """
+        Forgets an auction, e.g. once it is over.
+        """
+        with self.lock:
+            removed = self.auctions.pop(auction_id, None)
+        if removed is not None:
+            self.save()
+
+    def get(self, auction_id):
+        """
+        Returns:
+            dict or None: The stored entry of an auction.
+        """
+        with self.lock:
+            entry = self.auctions.get(auction_id)
+            return dict(entry) if entry is not None else None
+
+    def items(self):
+        """
+        Returns:
+            list: (auction_id, entry) pairs of every tracked auction, soonest next poll first.
+        """
+        with self.lock:
+            items = [(auction_id, dict(entry)) for auction_id, entry in self.auctions.items()]
+        return sorted(items, key=lambda item: item[1].get("next_poll") or 0)
+
+
+def _current_digest(path):
+    if not os.path.exists(path):
+        return None
+    checksum = read_checksum(path)
+    # The recorded digest is stale if a crash came between writing it and renaming the file; the size tells
+    if checksum.get("size") == os.path.getsize(path):
+        return checksum.get("sha256")
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _write_temp(directory, data):
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _link_backup(path):
+    # A hard link keeps the old contents alive under the backup name without copying them
+    backup = backup_path(path)
+    temp_backup = backup + ".tmp"
+    try:
+        if os.path.exists(temp_backup):
+            os.remove(temp_backup)
+        os.link(path, temp_backup)
+        os.replace(temp_backup, backup)
+    except OSError as e:
+        logging.warning(f"Could not keep a backup of {path}: {e}")
+
+
+def _fsync_directory(directory):
+    # Makes the rename itself durable; not supported on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
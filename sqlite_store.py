@@ -0,0 +1,278 @@
+import threading
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS auctioneers (
+    id INTEGER PRIMARY KEY,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS auctions (
+    id INTEGER PRIMARY KEY,
+    auctioneer_id INTEGER REFERENCES auctioneers(id),
+    event_name TEXT,
+    event_date_begin TEXT,
+    event_date_end TEXT,
+    lot_count INTEGER,
+    auction_status TEXT,
+    open_lot_count INTEGER,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_auctions_auctioneer ON auctions(auctioneer_id);
+CREATE INDEX IF NOT EXISTS idx_auctions_end ON auctions(event_date_end);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    parent_id INTEGER,
+    base_id INTEGER,
+    name TEXT,
+    full_category TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_categories_parent ON categories(parent_id);
+
+CREATE TABLE IF NOT EXISTS lots (
+    item_id INTEGER PRIMARY KEY,
+    lot_id INTEGER,
+    auction_id INTEGER REFERENCES auctions(id),
+    category_id INTEGER REFERENCES categories(id),
+    lot_number TEXT,
+    lead TEXT,
+    description TEXT,
+    estimate TEXT,
+    high_bid REAL,
+    bid_count INTEGER,
+    price_realized REAL,
+    status TEXT,
+    is_closed INTEGER,
+    close_time REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_lots_auction ON lots(auction_id);
+CREATE INDEX IF NOT EXISTS idx_lots_category ON lots(category_id);
+CREATE INDEX IF NOT EXISTS idx_lots_close_time ON lots(close_time);
+
+CREATE TABLE IF NOT EXISTS lot_states (
+    item_id INTEGER NOT NULL REFERENCES lots(item_id),
+    observed_at REAL NOT NULL,
+    high_bid REAL,
+    bid_count INTEGER,
+    time_left INTEGER,
+    price_realized REAL,
+    status TEXT,
+    is_closed INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_lot_states_item ON lot_states(item_id, observed_at);
+"""
+
+
+class AuctionDatabase:
+    """
+    Optional SQLite storage backend with normalized auctioneer, auction, category, lot and lot state history tables.
+
+    Every poll is written in a single transaction by `record_poll`. The database runs in WAL mode so
+    analytics queries can read while trackers write, and indexes on auctioneer id, category id and
+    close time keep cross-auction questions from scanning every lot.
+
+    Args:
+        path (str, optional): Path of the SQLite database file. Defaults to "auctions.db".
+
+    Example:
+        database = AuctionDatabase("auctions.db")
+        track_and_update_data(auc_id, file_name, database=database)
+        database.median_price_realized(category_id, since=time.time() - 30 * 86400)
+    """
+
+    def __init__(self, path="auctions.db"):
+        self.path = path
+        # The asyncio engine writes from worker threads; access is serialised by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def record_poll(self, auction_id, auction_data, events, observed_at=None):
+        """
+        Writes the changes of one poll in a single transaction.
+
+        Args:
+            auction_id (int): ID of the polled auction.
+            auction_data (dict): The auction data after the poll, with keys "auction" and "lots".
+            events (list): Event dicts of the poll as collected by `merge_live_catalog`.
+            observed_at (float, optional): Poll time as a Unix timestamp. Defaults to now.
+        """
+        if not events:
+            return
+        observed_at = observed_at if observed_at is not None else time.time()
+
+        auction_rows = []
+        lot_rows = []
+        category_rows = []
+        state_rows = []
+        for event in events:
+            event_type = event["type"]
+            if event_type in ("auction", "auctionState"):
+                auction_rows = [_auction_row(auction_id, auction_data["auction"], observed_at)]
+            elif event_type == "lot":
+                lot = event["lot"]
+                lot_rows.append(_lot_row(auction_id, lot, observed_at))
+                if lot.get("category"):
+                    category_rows.append(_category_row(lot["category"]))
+                state_rows.append(_state_row(lot["itemId"], lot["lotState"], observed_at))
+            elif event_type == "state":
+                stored_lot = auction_data["lots"].get(event["itemId"])
+                if stored_lot is not None:
+                    lot_rows.append(_lot_row(auction_id, stored_lot, observed_at))
+                state_rows.append(_state_row(event["itemId"], event["lotState"], observed_at))
+
+        with self.lock, self.connection:
+            if auction_rows:
+                auctioneer = auction_data["auction"].get("auctioneer") or {}
+                if auctioneer.get("id") is not None:
+                    self.connection.execute(
+                        "INSERT INTO auctioneers (id, name) VALUES (?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET name = excluded.name",
+                        (auctioneer["id"], auctioneer.get("name")))
+                self.connection.executemany(
+                    "INSERT INTO auctions (id, auctioneer_id, event_name, event_date_begin, event_date_end, lot_count, "
+                    "auction_status, open_lot_count, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET "
+                    "auctioneer_id = COALESCE(excluded.auctioneer_id, auctioneer_id), "
+                    "event_name = COALESCE(excluded.event_name, event_name), "
+                    "event_date_begin = COALESCE(excluded.event_date_begin, event_date_begin), "
+                    "event_date_end = COALESCE(excluded.event_date_end, event_date_end), "
+                    "lot_count = COALESCE(excluded.lot_count, lot_count), "
+                    "auction_status = excluded.auction_status, open_lot_count = excluded.open_lot_count, "
+                    "updated_at = excluded.updated_at",
+                    auction_rows)
+            if category_rows:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO categories (id, parent_id, base_id, name, full_category) VALUES (?, ?, ?, ?, ?)",
+                    category_rows)
+            if lot_rows:
+                self.connection.executemany(
+                    "INSERT INTO lots (item_id, lot_id, auction_id, category_id, lot_number, lead, description, estimate, "
+                    "high_bid, bid_count, price_realized, status, is_closed, close_time, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(item_id) DO UPDATE SET "
+                    "high_bid = excluded.high_bid, bid_count = excluded.bid_count, "
+                    "price_realized = excluded.price_realized, status = excluded.status, "
+                    "is_closed = excluded.is_closed, close_time = COALESCE(excluded.close_time, close_time), "
+                    "updated_at = excluded.updated_at",
+                    lot_rows)
+            if state_rows:
+                self.connection.executemany(
+                    "INSERT INTO lot_states (item_id, observed_at, high_bid, bid_count, time_left, price_realized, status, is_closed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    state_rows)
+
+    def median_price_realized(self, category_id, since=None):
+        """
+        Computes the median realized price of closed lots in a category.
+
+        Args:
+            category_id (int): ID of the category.
+            since (float, optional): Only include lots that closed after this Unix timestamp.
+
+        Returns:
+            float or None: The median priceRealized, or None if no closed lot matched.
+        """
+        query = "SELECT price_realized FROM lots WHERE category_id = ? AND is_closed = 1 AND price_realized > 0"
+        params = [category_id]
+        if since is not None:
+            query += " AND close_time >= ?"
+            params.append(since)
+        query += " ORDER BY price_realized"
+
+        with self.lock:
+            prices = [row[0] for row in self.connection.execute(query, params)]
+        if not prices:
+            return None
+        middle = len(prices) // 2
+        if len(prices) % 2:
+            return prices[middle]
+        return (prices[middle - 1] + prices[middle]) / 2
+
+    def query(self, sql, params=()):
+        """
+        Runs a read-only query against the database.
+
+        Args:
+            sql (str): The SQL query.
+            params (tuple, optional): Query parameters.
+
+        Returns:
+            list: The result rows as tuples.
+        """
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+
+def _auction_row(auction_id, auction, observed_at):
+    auction_state = auction.get("auctionState") or {}
+    auctioneer = auction.get("auctioneer") or {}
+    return (
+        auction_id,
+        auctioneer.get("id"),
+        auction.get("eventName"),
+        auction.get("eventDateBegin"),
+        auction.get("eventDateEnd"),
+        auction.get("lotCount"),
+        auction_state.get("auctionStatus"),
+        auction_state.get("openLotCount"),
+        observed_at
+    )
+
+
+def _category_row(category):
+    return (
+        category["id"],
+        category.get("parentCategoryId"),
+        category.get("baseCategoryId"),
+        category.get("categoryName"),
+        category.get("fullCategory")
+    )
+
+
+def _lot_row(auction_id, lot, observed_at):
+    lot_state = lot.get("lotState") or {}
+    category = lot.get("category") or {}
+    time_left = lot_state.get("timeLeftSeconds")
+    return (
+        lot["itemId"],
+        lot.get("id"),
+        auction_id,
+        category.get("id"),
+        lot.get("lotNumber"),
+        lot.get("lead"),
+        lot.get("description"),
+        lot.get("estimate"),
+        lot_state.get("highBid"),
+        lot_state.get("bidCount"),
+        lot_state.get("priceRealized"),
+        lot_state.get("status"),
+        lot_state.get("isClosed"),
+        observed_at + time_left if time_left and time_left > 0 else None,
+        observed_at
+    )
+
+
+def _state_row(item_id, lot_state, observed_at):
+    return (
+        item_id,
+        observed_at,
+        lot_state.get("highBid"),
+        lot_state.get("bidCount"),
+        lot_state.get("timeLeftSeconds"),
+        lot_state.get("priceRealized"),
+        lot_state.get("status"),
+        lot_state.get("isClosed")
+    )
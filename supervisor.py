@@ -0,0 +1,424 @@
+from main import track_and_update_data, iter_auctions, select_auctions
+from graphql_client import default_client
+from rate_limit import RateLimiter
+from metrics import registry, start_from_environment
+from snapshot import TrackerState
+from bisect import bisect
+import multiprocessing
+import threading
+import hashlib
+import logging
+import queue
+import time
+import sys
+import os
+
+# Messages sent from workers to the supervisor, as (kind, worker name, ...) tuples
+FINISHED = "finished"
+RELEASED = "released"
+FAILED = "failed"
+METRICS = "metrics"
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping auction ids to worker names.
+
+    Each worker is placed on the ring at `replicas` points, so auctions spread evenly and adding or removing
+    a worker only moves the auctions between it and its neighbours, about 1/N of them.
+
+    Args:
+        nodes (iterable, optional): Initial worker names.
+        replicas (int, optional): Points per worker on the ring. Defaults to 100.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self.points = []
+        self.owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """
+        Places a worker on the ring.
+        """
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            self.owners[point] = node
+        self.points = sorted(self.owners)
+
+    def remove(self, node):
+        """
+        Takes a worker off the ring.
+        """
+        self.owners = {point: owner for point, owner in self.owners.items() if owner != node}
+        self.points = sorted(self.owners)
+
+    def get(self, key):
+        """
+        Returns:
+            str or None: The worker owning the key, or None if the ring is empty.
+        """
+        if not self.points:
+            return None
+        index = bisect(self.points, _hash(str(key))) % len(self.points)
+        return self.owners[self.points[index]]
+
+    def __len__(self):
+        return len(set(self.owners.values()))
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+def run_worker(name, commands, reports, limiter, track_options, url=None, metrics_interval=15):
+    """
+    Entry point of a worker process: tracks the auctions the supervisor assigns to it, one thread per auction.
+
+    Args:
+        name (str): Name of the worker on the hash ring.
+        commands (multiprocessing.Queue): ("track", auction_id, file_name), ("release", auction_id) and ("stop",)
+            commands from the supervisor.
+        reports (multiprocessing.Queue): Queue the worker reports finished, failed and released auctions to, and
+            a snapshot of its metrics every metrics_interval seconds.
+        limiter (RateLimiter): Limiter with shared buckets, installed on the process's default client.
+        track_options (dict): Extra keyword arguments of `track_and_update_data`.
+        url (str, optional): GraphQL endpoint to poll instead of hibid.com.
+        metrics_interval (float, optional): Seconds between metrics snapshots. Defaults to 15.
+    """
+    default_client.limiter = limiter
+    if url is not None:
+        default_client.url = url
+    trackers = {}
+    lock = threading.Lock()
+    stopped = threading.Event()
+
+    def track(auction_id, file_name, stop_event):
+        finished = False
+        try:
+            finished = track_and_update_data(auction_id, file_name, stop_event=stop_event, **track_options)
+        except Exception as e:
+            logging.error(f"Worker {name} failed tracking auction {auction_id}: {e}")
+        with lock:
+            trackers.pop(auction_id, None)
+        # A released auction has been compacted and may now be picked up by another worker; one that stopped
+        # before it was over, after too many failed polls or an exception, is tracked again later
+        if stop_event.is_set():
+            kind = RELEASED
+        else:
+            kind = FINISHED if finished else FAILED
+        reports.put((kind, name, auction_id, finished))
+
+    def report_metrics():
+        # The supervisor serves the metrics, so workers only send theirs over; see `MetricsRegistry.merge`
+        while not stopped.wait(metrics_interval):
+            reports.put((METRICS, name, registry.snapshot()))
+
+    threading.Thread(target=report_metrics, name="metrics-report", daemon=True).start()
+
+    while True:
+        command = commands.get()
+        if command[0] == "track":
+            _, auction_id, file_name = command
+            with lock:
+                if auction_id in trackers:
+                    continue
+                stop_event = threading.Event()
+                thread = threading.Thread(target=track, args=(auction_id, file_name, stop_event), name=f"auction-{auction_id}", daemon=True)
+                trackers[auction_id] = (thread, stop_event)
+            thread.start()
+            logging.info(f"Worker {name} tracking auction {auction_id}")
+        elif command[0] == "release":
+            with lock:
+                tracker = trackers.get(command[1])
+            if tracker is not None:
+                tracker[1].set()
+        elif command[0] == "stop":
+            with lock:
+                running = list(trackers.values())
+            for _, stop_event in running:
+                stop_event.set()
+            for thread, _ in running:
+                thread.join()
+            stopped.set()
+            reports.put((METRICS, name, registry.snapshot()))
+            return
+
+
+class Worker:
+    """
+    Supervisor-side handle of a worker process.
+    """
+
+    def __init__(self, name, process, commands):
+        self.name = name
+        self.process = process
+        self.commands = commands
+        self.auctions = set()
+
+
+class Supervisor:
+    """
+    Shards auctions across worker processes, so JSON parsing and diffing scale with the number of cores.
+
+    Auctions are assigned to workers by consistent hashing. Every worker tracks its auctions with
+    `track_and_update_data`, one thread each, and all workers draw from one shared rate-limit budget.
+    Workers report finished and failed auctions over a queue; dead workers are replaced and their auctions
+    reassigned. A failed auction, e.g. one that hit max_retries during an upstream outage, is tracked again
+    after retry_delay seconds. Workers also send their metrics over the queue, which are merged into this
+    process's `metrics.registry`, so the supervisor's metrics endpoint covers every worker.
+
+    Args:
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        rate (float, optional): Requests per second shared by all workers. Defaults to 5.
+        burst (float, optional): Burst size of the shared budget. Defaults to 10.
+        endpoint_rates (dict, optional): Per-operation (rate, burst) limits, see `RateLimiter`.
+        replicas (int, optional): Points per worker on the hash ring. Defaults to 100.
+        restart_workers (bool, optional): Whether a dead worker is replaced by a new one. Defaults to True.
+        url (str, optional): GraphQL endpoint the workers poll instead of hibid.com, e.g. a `mock_server`.
+        retry_delay (float, optional): Seconds before a failed auction is assigned again. Defaults to 60.
+        state (TrackerState, optional): Persistent record of the tracked auctions. Auctions in it are resumed on
+            `start`, and finished ones are removed. Poll times are not recorded, since workers poll independently.
+        **track_options: Extra keyword arguments of `track_and_update_data`, e.g. sleep_time.
+
+    Example:
+        supervisor = Supervisor(workers=4)
+        supervisor.add_auction(481347, "Encore_481347.json")
+        supervisor.run()
+
+    Notes:
+        - An auction only moves to another worker after its current worker has stopped tracking it and compacted its
+          log, so two processes never write the same auction files.
+    """
+
+    def __init__(self, workers=None, rate=5, burst=10, endpoint_rates=None, replicas=100, restart_workers=True, url=None, state=None, retry_delay=60, **track_options):
+        self.context = multiprocessing.get_context("spawn")
+        self.worker_count = workers or os.cpu_count() or 1
+        self.limiter = RateLimiter(rate, burst, endpoint_rates, context=self.context)
+        self.ring = HashRing(replicas=replicas)
+        self.restart_workers = restart_workers
+        self.track_options = track_options
+        self.url = url
+        self.state = state
+        self.retry_delay = retry_delay
+        self.retry_at = {}
+        self.reports = self.context.Queue()
+        self.workers = {}
+        self.auctions = {}
+        self.owners = {}
+        self.moving = set()
+        self.finished = set()
+        self._next_worker = 0
+
+    def add_auction(self, auction_id, file_name):
+        """
+        Registers an auction to be tracked by one of the workers. Finished auctions are not added again.
+
+        Args:
+            auction_id (int): ID of the auction to track.
+            file_name (str): Name of the file under `auctions/` the data is saved to.
+        """
+        if auction_id in self.auctions or auction_id in self.finished:
+            return
+        self.auctions[auction_id] = file_name
+        if self.state is not None:
+            self.state.track(auction_id, file_name)
+        if self.workers:
+            self.rebalance()
+
+    def start(self):
+        """
+        Starts the worker processes and assigns the registered auctions, including those resumed from the state.
+        """
+        os.makedirs("auctions", exist_ok=True)
+        if self.state is not None:
+            for auction_id, entry in self.state.items():
+                self.auctions.setdefault(auction_id, entry["file_name"])
+        while len(self.workers) < self.worker_count:
+            self._spawn()
+        self.rebalance()
+
+    def rebalance(self):
+        """
+        Moves every auction towards the worker the hash ring assigns it to.
+
+        Unassigned auctions are sent to their worker right away. Auctions held by another live worker are first
+        released there; they are sent on once that worker reports them released. Failed auctions wait until their
+        retry time.
+        """
+        now = time.time()
+        for auction_id, file_name in self.auctions.items():
+            if auction_id in self.retry_at:
+                if self.retry_at[auction_id] > now:
+                    continue
+                del self.retry_at[auction_id]
+            target = self.ring.get(auction_id)
+            owner = self.owners.get(auction_id)
+            if target is None or owner == target:
+                continue
+            if owner is None:
+                self.owners[auction_id] = target
+                self.workers[target].auctions.add(auction_id)
+                self.workers[target].commands.put(("track", auction_id, file_name))
+            elif auction_id not in self.moving:
+                self.moving.add(auction_id)
+                self.workers[owner].commands.put(("release", auction_id))
+
+    def handle(self, report):
+        """
+        Applies one worker report.
+
+        Args:
+            report (tuple): (kind, worker name, auction id, finished), or (METRICS, worker name, snapshot), as sent
+                by `run_worker`.
+        """
+        if report[0] == METRICS:
+            registry.merge(report[1], report[2])
+            return
+        kind, name, auction_id, finished = report
+        worker = self.workers.get(name)
+        if worker is not None:
+            worker.auctions.discard(auction_id)
+        if self.owners.get(auction_id) == name:
+            del self.owners[auction_id]
+        self.moving.discard(auction_id)
+        if kind == FINISHED or finished:
+            self.auctions.pop(auction_id, None)
+            self.finished.add(auction_id)
+            if self.state is not None:
+                self.state.remove(auction_id)
+            logging.info(f"Auction {auction_id} stopped on worker {name}{' (over)' if finished else ''}")
+        elif kind == FAILED and auction_id in self.auctions:
+            self.retry_at[auction_id] = time.time() + self.retry_delay
+            logging.warning(f"Auction {auction_id} failed on worker {name}, tracking it again in {self.retry_delay}s")
+        self.rebalance()
+
+    def check_workers(self):
+        """
+        Replaces dead workers and reassigns their auctions.
+
+        Returns:
+            list: Names of the workers found dead.
+        """
+        dead = [worker for worker in self.workers.values() if not worker.process.is_alive()]
+        for worker in dead:
+            logging.error(f"Worker {worker.name} died with exit code {worker.process.exitcode}, reassigning {len(worker.auctions)} auctions")
+            del self.workers[worker.name]
+            self.ring.remove(worker.name)
+            registry.retire(worker.name)
+            for auction_id in worker.auctions:
+                if self.owners.get(auction_id) == worker.name:
+                    del self.owners[auction_id]
+                self.moving.discard(auction_id)
+        if dead:
+            if self.restart_workers:
+                while len(self.workers) < self.worker_count:
+                    self._spawn()
+            self.rebalance()
+        return [worker.name for worker in dead]
+
+    def run(self, discover=None, discover_interval=600, check_interval=1):
+        """
+        Supervises the workers until every auction has finished, or forever when discovering new auctions.
+
+        Args:
+            discover (callable, optional): Returns (auction_id, file_name) pairs of auctions to track; called
+                every discover_interval seconds.
+            discover_interval (float, optional): Seconds between discoveries. Defaults to 600.
+            check_interval (float, optional): Seconds between checks for dead workers. Defaults to 1.
+        """
+        if not self.workers:
+            self.start()
+        next_discovery = 0
+        try:
+            while discover is not None or self.auctions:
+                if discover is not None and time.time() >= next_discovery:
+                    try:
+                        for auction_id, file_name in discover():
+                            self.add_auction(auction_id, file_name)
+                    except Exception as e:
+                        logging.error(f"Error discovering auctions: {e}")
+                    next_discovery = time.time() + discover_interval
+                try:
+                    self.handle(self.reports.get(timeout=check_interval))
+                except queue.Empty:
+                    pass
+                self.check_workers()
+                if self.retry_at:
+                    self.rebalance()
+        finally:
+            self.stop()
+
+    def stop(self, timeout=120):
+        """
+        Stops every worker; each compacts the logs of its auctions before exiting.
+        """
+        for worker in self.workers.values():
+            worker.commands.put(("stop",))
+        for worker in self.workers.values():
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self.workers = {}
+
+    def stats(self):
+        """
+        Returns:
+            dict: Worker name -> number of auctions assigned to it.
+        """
+        return {name: len(worker.auctions) for name, worker in self.workers.items()}
+
+    def _spawn(self):
+        name = f"worker-{self._next_worker}"
+        self._next_worker += 1
+        commands = self.context.Queue()
+        process = self.context.Process(
+            target=run_worker, args=(name, commands, self.reports, self.limiter, self.track_options, self.url), name=name, daemon=True)
+        process.start()
+        self.workers[name] = Worker(name, process, commands)
+        self.ring.add(name)
+        return name
+
+
+def main(auctioneer_ids, workers=None):
+    """
+    Tracks every open auction of every given auctioneer, sharded across worker processes.
+
+    Args:
+        auctioneer_ids (list): IDs of the auctioneers whose auctions are to be tracked.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+
+    Notes:
+        - Auctions are rediscovered every 10 minutes, so auctions published later are picked up as well.
+        - Tracked auctions are recorded in "auctions/supervisor_state.json" and resumed after a restart.
+    """
+    def discover():
+        for auction in select_auctions(iter_auctions(auctioneer_ids)):
+            auctioneer_name = auction["auctioneer"]["name"].replace(" ", "_")
+            yield auction["id"], f"{auctioneer_name}_{auction['id']}.json"
+
+    Supervisor(workers, state=TrackerState("auctions/supervisor_state.json")).run(discover)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        logging.error("Usage: python supervisor.py [--workers N] <auctioneer_id> [<auctioneer_id> ...]")
+        sys.exit(1)
+
+    try:
+        workers = None
+        if args[0] == "--workers":
+            workers = int(args[1])
+            args = args[2:]
+        auctioneer_ids = [int(arg) for arg in args]
+        start_from_environment()
+        main(auctioneer_ids, workers)
+    except (ValueError, IndexError):
+        logging.error("Please provide valid integers for the worker count and auctioneer ids.")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        logging.info("Interrupted by user. Exiting...")
+        sys.exit(0)
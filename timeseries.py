@@ -0,0 +1,232 @@
+from snapshot import atomic_write
+from array import array
+import logging
+import json
+import time
+import os
+
+# Column name -> array typecode. Every column holds one value per recorded row. Only fixed-size typecodes are
+# used ("l" is 4 bytes on Windows and 8 elsewhere), so the column files read back the same on every platform.
+COLUMNS = {
+    "auction_id": "q",
+    "item_id": "q",
+    "timestamp": "d",
+    "high_bid": "d",
+    "bid_count": "q",
+    "time_left": "q",
+    "status": "H"
+}
+
+
+class BidHistory:
+    """
+    Compact, array-backed time series of lot states across all tracked auctions.
+
+    Every row is one observation of a lot: (auction_id, item_id, timestamp, high_bid, bid_count,
+    time_left, status). Values are stored in typed `array` columns, 50 bytes per row, and
+    `status` strings are interned into a small code table. A per-lot index of row numbers makes
+    `price_curve` a direct lookup instead of a scan.
+
+    Rows are fed from the change events collected by `merge_live_catalog`, so a row is written
+    whenever a lot is first seen or its lotState changes, not for every unchanged poll.
+
+    Args:
+        directory (str, optional): Directory the columns are persisted to by `flush`. If it already
+            holds a history, it is loaded. Defaults to None, which keeps the history in memory only.
+
+    Example:
+        history = BidHistory("history")
+        history.record_events(auction_id, events)
+        history.flush()
+        history.price_curve(item_id)  # [(timestamp, high_bid), ...]
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self.statuses = []
+        self.status_codes = {}
+        self.lot_rows = {}
+        self.auction_lots = {}
+        self.flushed_rows = 0
+
+        if directory and os.path.exists(os.path.join(directory, "statuses.json")):
+            self.load()
+
+    def __len__(self):
+        return len(self.columns["item_id"])
+
+    def record(self, auction_id, item_id, lot_state, timestamp=None):
+        """
+        Appends one observation of a lot.
+
+        Args:
+            auction_id (int): ID of the auction the lot belongs to.
+            item_id (int): The lot's itemId.
+            lot_state (dict): The lot's lotState. Missing fields are stored as 0 or an empty status.
+            timestamp (float, optional): Observation time as a Unix timestamp. Defaults to now.
+        """
+        status = lot_state.get("status") or ""
+        code = self.status_codes.get(status)
+        if code is None:
+            code = self.status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+
+        row = len(self)
+        columns = self.columns
+        columns["auction_id"].append(int(auction_id))
+        columns["item_id"].append(int(item_id))
+        columns["timestamp"].append(timestamp if timestamp is not None else time.time())
+        columns["high_bid"].append(float(lot_state.get("highBid") or 0))
+        columns["bid_count"].append(int(lot_state.get("bidCount") or 0))
+        columns["time_left"].append(int(lot_state.get("timeLeftSeconds") or 0))
+        columns["status"].append(code)
+
+        rows = self.lot_rows.get(item_id)
+        if rows is None:
+            rows = self.lot_rows[item_id] = array("L")
+            self.auction_lots.setdefault(auction_id, set()).add(item_id)
+        rows.append(row)
+
+    def record_events(self, auction_id, events, timestamp=None):
+        """
+        Appends one row per "lot" and "state" event of a poll.
+
+        Args:
+            auction_id (int): ID of the auction the events belong to.
+            events (list): Event dicts as collected by `merge_live_catalog`.
+            timestamp (float, optional): Poll time as a Unix timestamp. Defaults to now.
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        for event in events:
+            if event["type"] == "lot":
+                lot = event["lot"]
+                self.record(auction_id, lot["itemId"], lot["lotState"], timestamp)
+            elif event["type"] == "state":
+                self.record(auction_id, event["itemId"], event["lotState"], timestamp)
+
+    def history(self, item_id):
+        """
+        Returns every recorded observation of a lot.
+
+        Args:
+            item_id (int): The lot's itemId.
+
+        Returns:
+            list: One dict per row with keys "timestamp", "high_bid", "bid_count", "time_left" and "status", oldest first.
+        """
+        columns = self.columns
+        return [
+            {
+                "timestamp": columns["timestamp"][row],
+                "high_bid": columns["high_bid"][row],
+                "bid_count": columns["bid_count"][row],
+                "time_left": columns["time_left"][row],
+                "status": self.statuses[columns["status"][row]]
+            }
+            for row in self.lot_rows.get(item_id, ())
+        ]
+
+    def price_curve(self, item_id):
+        """
+        Returns the high bid progression of a lot.
+
+        Args:
+            item_id (int): The lot's itemId.
+
+        Returns:
+            list: (timestamp, high_bid) tuples, oldest first.
+        """
+        timestamps = self.columns["timestamp"]
+        high_bids = self.columns["high_bid"]
+        return [(timestamps[row], high_bids[row]) for row in self.lot_rows.get(item_id, ())]
+
+    def auction_curves(self, auction_id):
+        """
+        Returns the high bid progression of every lot of an auction.
+
+        Args:
+            auction_id (int): ID of the auction.
+
+        Returns:
+            dict: itemId -> list of (timestamp, high_bid) tuples.
+        """
+        return {item_id: self.price_curve(item_id) for item_id in self.auction_lots.get(auction_id, ())}
+
+    def flush(self):
+        """
+        Appends the rows recorded since the last flush to the column files in `directory`.
+        """
+        # Rows may still be appended from another thread; only write rows that are complete in every column
+        start = self.flushed_rows
+        end = min(len(column) for column in self.columns.values())
+        if not self.directory or start == end:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+
+        for name, column in self.columns.items():
+            with open(os.path.join(self.directory, f"{name}.bin"), "ab") as f:
+                column[start:end].tofile(f)
+        # Replaced atomically: a crash mid-flush must not leave a truncated code table that `load` cannot read
+        atomic_write(os.path.join(self.directory, "statuses.json"), json.dumps(list(self.statuses)).encode("utf-8"))
+        self.flushed_rows = end
+
+    def load(self):
+        """
+        Loads the columns persisted in `directory` and rebuilds the lot and auction indexes.
+        """
+        with open(os.path.join(self.directory, "statuses.json"), "r") as f:
+            self.statuses = json.load(f)
+        self.status_codes = {status: code for code, status in enumerate(self.statuses)}
+
+        for name, typecode in COLUMNS.items():
+            column = array(typecode)
+            path = os.path.join(self.directory, f"{name}.bin")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+                column.frombytes(data[:len(data) - len(data) % column.itemsize])
+            self.columns[name] = column
+
+        # A crash between column appends can leave columns of unequal length; drop the incomplete tail
+        rows = min(len(column) for column in self.columns.values())
+        for name, column in self.columns.items():
+            if len(column) > rows:
+                del column[rows:]
+            if os.path.exists(os.path.join(self.directory, f"{name}.bin")):
+                with open(os.path.join(self.directory, f"{name}.bin"), "r+b") as f:
+                    f.truncate(rows * column.itemsize)
+
+        for row, (auction_id, item_id) in enumerate(zip(self.columns["auction_id"], self.columns["item_id"])):
+            lot_rows = self.lot_rows.get(item_id)
+            if lot_rows is None:
+                lot_rows = self.lot_rows[item_id] = array("L")
+                self.auction_lots.setdefault(auction_id, set()).add(item_id)
+            lot_rows.append(row)
+
+        self.flushed_rows = rows
+        logging.info(f"Loaded {rows} bid history rows from {self.directory}")
+
+    def to_arrow(self):
+        """
+        Returns the history as a `pyarrow.Table`, with status codes decoded. Requires pyarrow.
+
+        Returns:
+            pyarrow.Table: One column per field.
+        """
+        import pyarrow as pa
+
+        data = {name: column for name, column in self.columns.items() if name != "status"}
+        data["status"] = pa.DictionaryArray.from_arrays(pa.array(self.columns["status"], pa.int32()), pa.array(self.statuses))
+        return pa.table(data)
+
+    def to_parquet(self, path):
+        """
+        Writes the history to a Parquet file. Requires pyarrow.
+
+        Args:
+            path (str): Path of the Parquet file.
+        """
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path, compression="zstd")
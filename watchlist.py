@@ -0,0 +1,285 @@
+from lot_diff import ChangeEvent, WATCH_MATCH
+from json_codec import loads
+import threading
+import logging
+import time
+import re
+
+# Lot fields searched for keywords
+TEXT_FIELDS = ("lead", "description")
+
+# Category fields compared with a rule's category ids, so a parent category also matches its subcategories
+CATEGORY_FIELDS = ("id", "parentCategoryId", "baseCategoryId")
+
+_word = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Returns:
+        list: The lowercase words of a text, the unit keywords are matched on.
+    """
+    return _word.findall(text.lower()) if text else []
+
+
+class KeywordAutomaton:
+    """
+    Matches many keywords and phrases against a text in one pass over its words.
+
+    Phrases are indexed by their first word, so scanning a text costs one dict lookup per word and a slice
+    comparison only where a phrase can start. Matching is case-insensitive and on whole words: "drill" matches
+    "Cordless DRILL," but not "drills".
+
+    Args:
+        keywords (dict): keyword or phrase -> value, e.g. the indexes of the rules using it.
+    """
+
+    def __init__(self, keywords):
+        self.phrases = {}
+        for keyword, value in keywords.items():
+            words = tuple(tokenize(keyword))
+            if words:
+                self.phrases.setdefault(words[0], []).append((words, value))
+
+    def __bool__(self):
+        return bool(self.phrases)
+
+    def scan(self, words):
+        """
+        Args:
+            words (list): Tokenized text, see `tokenize`.
+
+        Returns:
+            list: The values of every keyword found, once per keyword.
+        """
+        # Most texts contain no keyword at all; a set intersection rules them out without a Python-level loop
+        first_words = self.phrases.keys() & set(words)
+        if not first_words:
+            return []
+        found = {}
+        for i, word in enumerate(words):
+            if word not in first_words:
+                continue
+            for phrase, value in self.phrases[word]:
+                if len(phrase) == 1 or tuple(words[i:i + len(phrase)]) == phrase:
+                    found[phrase] = value
+        return list(found.values())
+
+
+class Rule:
+    """
+    One declarative watchlist rule. A lot matches when every condition given matches.
+
+    Args:
+        name (str): Name reported with matches.
+        keywords (iterable, optional): Words or phrases of which at least one must appear in `lead` or `description`.
+        categories (iterable, optional): Category ids of which one must be the lot's category or one of its parents.
+        min_high_bid (float, optional): Lowest matching highBid.
+        max_high_bid (float, optional): Highest matching highBid.
+        closing_within (float, optional): Minutes; only open lots with at most this much time left match.
+        auctions (iterable, optional): Auction ids the rule is limited to.
+    """
+
+    def __init__(self, name, keywords=(), categories=(), min_high_bid=None, max_high_bid=None, closing_within=None, auctions=()):
+        self.name = name
+        self.keywords = tuple(keywords)
+        self.categories = frozenset(int(category) for category in categories)
+        self.min_high_bid = min_high_bid
+        self.max_high_bid = max_high_bid
+        self.closing_within = closing_within
+        self.auctions = frozenset(int(auction_id) for auction_id in auctions)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        return f"Rule({self.name})"
+
+    def compile(self, index):
+        """
+        Compiles the rule's non-keyword conditions into a predicate, cheapest condition first.
+
+        Args:
+            index (int): Index of the rule in its watchlist, looked up in the lot's keyword hits.
+
+        Returns:
+            callable: predicate(auction_id, lot_state, category_ids, keyword_hits) -> bool.
+        """
+        checks = []
+        if self.auctions:
+            auctions = self.auctions
+            checks.append(lambda auction_id, lot_state, category_ids, hits: auction_id in auctions)
+        if self.min_high_bid is not None or self.max_high_bid is not None:
+            low = self.min_high_bid if self.min_high_bid is not None else float("-inf")
+            high = self.max_high_bid if self.max_high_bid is not None else float("inf")
+            checks.append(lambda auction_id, lot_state, category_ids, hits: lot_state.get("highBid") is not None and low <= lot_state["highBid"] <= high)
+        if self.closing_within is not None:
+            seconds = self.closing_within * 60
+            checks.append(lambda auction_id, lot_state, category_ids, hits: not lot_state.get("isClosed") and 0 < (lot_state.get("timeLeftSeconds") or 0) <= seconds)
+        if self.categories:
+            categories = self.categories
+            checks.append(lambda auction_id, lot_state, category_ids, hits: not categories.isdisjoint(category_ids))
+        if self.keywords:
+            checks.append(lambda auction_id, lot_state, category_ids, hits: index in hits)
+
+        if len(checks) == 1:
+            return checks[0]
+        return lambda auction_id, lot_state, category_ids, hits: all(check(auction_id, lot_state, category_ids, hits) for check in checks)
+
+
+class Watchlist:
+    """
+    Set of rules evaluated against every lot of every poll, inside `merge_live_catalog`.
+
+    The rules are compiled once: keywords of all rules into one `KeywordAutomaton`, categories and auctions
+    into frozensets and bid and time limits into closures. Descriptions and categories do not change, so the
+    keyword hits and category ids of a lot are computed the first time it is seen and cached; every later poll
+    only re-checks the numeric conditions against the incoming lotState. A lot whose matched rules change is
+    logged and reported as a WATCH_MATCH `ChangeEvent`.
+
+    Args:
+        rules (iterable): `Rule`s, or dicts of `Rule` arguments.
+
+    Example:
+        watchlist = Watchlist.from_file("watchlist.json")
+        track_and_update_data(auction_id, file_name, bus=bus, watchlist=watchlist)
+
+    With watchlist.json:
+        {"rules": [{"name": "cheap tools", "keywords": ["dewalt", "impact driver"], "max_high_bid": 50},
+                   {"name": "closing coins", "categories": [705], "closing_within": 10}]}
+    """
+
+    def __init__(self, rules):
+        self.rules = [rule if isinstance(rule, Rule) else Rule.from_dict(rule) for rule in rules]
+        self.predicates = [rule.compile(index) for index, rule in enumerate(self.rules)]
+        keywords = {}
+        for index, rule in enumerate(self.rules):
+            for keyword in rule.keywords:
+                keywords.setdefault(" ".join(tokenize(keyword)), set()).add(index)
+        self.automaton = KeywordAutomaton({keyword: frozenset(indexes) for keyword, indexes in keywords.items()})
+        self.lots = {}
+        self.matched = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a watchlist from a JSON file holding {"rules": [...]} with the arguments of `Rule`.
+        """
+        with open(path, "rb") as f:
+            return cls(loads(f.read())["rules"])
+
+    def __getstate__(self):
+        # The lock and compiled predicates cannot be pickled, e.g. when passed to a `supervisor` worker process
+        state = self.__dict__.copy()
+        del state["lock"], state["predicates"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.predicates = [rule.compile(index) for index, rule in enumerate(self.rules)]
+        self.lock = threading.Lock()
+
+    def match(self, auction_id, lot, lot_state=None):
+        """
+        Evaluates the rules against one lot, without recording the match.
+
+        Args:
+            auction_id (int): ID of the auction the lot belongs to.
+            lot (dict): The stored lot, with its descriptive fields.
+            lot_state (dict, optional): Current lotState, e.g. from a trimmed "state-only" response. Defaults to the lot's.
+
+        Returns:
+            tuple: Names of the rules the lot matches, in rule order.
+        """
+        lots = self._auction(auction_id)[0]
+        return self._match(auction_id, lots, lot, lot_state if lot_state is not None else lot.get("lotState") or {})
+
+    def evaluate(self, auction_id, live_lots, stored_lots, timestamp=None):
+        """
+        Evaluates the rules against the lots of one poll.
+
+        Args:
+            auction_id (int): ID of the auction.
+            live_lots (list): Lots of the response, whose lotState is current.
+            stored_lots (dict): itemId -> stored lot, holding the descriptive fields a trimmed response lacks.
+            timestamp (float, optional): Poll time. Defaults to now.
+
+        Returns:
+            list: A WATCH_MATCH `ChangeEvent` for every lot whose matched rules changed.
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        lots, matched = self._auction(auction_id)
+        events = []
+        for live_lot in live_lots:
+            item_id = live_lot["itemId"]
+            lot = stored_lots.get(item_id)
+            if lot is None:
+                continue
+            names = self._match(auction_id, lots, lot, live_lot.get("lotState") or {})
+            previous = matched.get(item_id, ())
+            if names == previous:
+                continue
+            if names:
+                matched[item_id] = names
+                logging.info(f"Lot {item_id} of auction {auction_id} matches watchlist rules: {', '.join(names)}")
+            else:
+                del matched[item_id]
+            events.append(ChangeEvent(WATCH_MATCH, auction_id, item_id, lot, {"rules": (previous, names)}, timestamp))
+        return events
+
+    def matches(self, auction_id=None):
+        """
+        Returns:
+            dict: (auction_id, itemId) -> names of the matched rules, for every currently matching lot of one
+            auction or of all auctions being tracked.
+        """
+        with self.lock:
+            auctions = [auction_id] if auction_id is not None else list(self.matched)
+            return {(auction, item_id): names for auction in auctions for item_id, names in self.matched.get(auction, {}).copy().items()}
+
+    def forget(self, auction_id):
+        """
+        Drops the cached lots and matches of an auction, e.g. once it is over.
+        """
+        with self.lock:
+            self.lots.pop(auction_id, None)
+            self.matched.pop(auction_id, None)
+
+    def _auction(self, auction_id):
+        with self.lock:
+            lots = self.lots.get(auction_id)
+            if lots is None:
+                lots = self.lots[auction_id] = {}
+                self.matched[auction_id] = {}
+            return lots, self.matched[auction_id]
+
+    def _match(self, auction_id, lots, lot, lot_state):
+        item_id = lot["itemId"]
+        cached = lots.get(item_id)
+        if cached is None:
+            cached = lots[item_id] = self._static_fields(lot)
+        category_ids, hits = cached
+        return tuple(rule.name for rule, predicate in zip(self.rules, self.predicates) if predicate(auction_id, lot_state, category_ids, hits))
+
+    def _static_fields(self, lot):
+        # Category ids and keyword hits never change for a lot, so they are computed once
+        category = lot.get("category") or {}
+        category_ids = frozenset(_as_int(category.get(field)) for field in CATEGORY_FIELDS) - {None}
+        hits = frozenset()
+        if self.automaton:
+            words = []
+            for field in TEXT_FIELDS:
+                words.extend(tokenize(lot.get(field)))
+                # Keeps phrases from matching across the end of one field and the start of the next
+                words.append("")
+            hits = frozenset().union(*self.automaton.scan(words))
+        return category_ids, hits
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None